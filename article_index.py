@@ -0,0 +1,170 @@
+# article_index.py
+import os
+import re
+import sqlite3
+from contextlib import closing
+
+# A user-typed article: optional 'CRR' / 'Article' / 'Art.' words around the number.
+_ARTICLE_WORDS_PATTERN = re.compile(r'^\s*(?:crr\s+)?(?:articles?|art\.?)?\s*(.*?)\s*(?:crr)?\s*$', re.IGNORECASE)
+# Paragraph forms rewritten to '92(1)', as generate_crr_report._format_article_point does.
+_POINT_PATTERNS = (re.compile(r'^(\d+[a-z]?)\s*-\s*(\d+|[a-z])$', re.IGNORECASE), re.compile(r'^(\d+)\.(\d+)$'))
+# Upper bound appended to a prefix for range scans over the article column.
+_PREFIX_END = '\U0010ffff'
+# Digit runs in natural sort keys: zero-padded to this width, after a marker that sorts before any text.
+_SORT_NUMBER_WIDTH = 10
+_SORT_NUMBER_MARK = '\x01'
+
+
+class ArticleIndexUnavailable(Exception):
+    """Raised when the report file has no article index (no pipeline run yet, or an older report)."""
+
+
+def normalize_article(text):
+    """
+    Turns a user-typed article ('Article 92', 'art. 92.1', '47a-2 CRR') into the form the index
+    uses: the main article ('92') or its paragraph form ('92(1)', '47a(2)').
+    """
+    article = _ARTICLE_WORDS_PATTERN.match(text).group(1).replace(' ', '')
+    for pattern in _POINT_PATTERNS:
+        match = pattern.match(article)
+        if match:
+            return f"{match.group(1)}({match.group(2)})"
+    return article
+
+
+def write_article_index(conn, jira_references=()):
+    """
+    Writes the inverted article index into the SQLite report, after its reference tables (see
+    reference_table.write_reference_tables). jira_references holds (issue_type, DataFrame) pairs
+    with generate_crr_report.JIRA_REFERENCE_COLUMNS. Every main article and paragraph form is a
+    key of the 'article_index' table, whose rows point to a file reference (ref_hits) or to an
+    issue of the 'jira_issues' table; keys compare case-insensitively. The 'article_keys' table
+    holds every distinct key once, with its natural sort key and its numbers of referencing files
+    and issues, for prefix searches.
+    """
+    conn.executescript("""
+        CREATE TABLE jira_issues (issue_id INTEGER PRIMARY KEY, issue_type TEXT NOT NULL, issue_key TEXT NOT NULL, summary TEXT);
+        CREATE TABLE article_index (article TEXT NOT NULL COLLATE NOCASE, hit_id INTEGER, issue_id INTEGER);
+        INSERT INTO article_index (article, hit_id) SELECT article, hit_id FROM ref_hits;
+        INSERT INTO article_index (article, hit_id) SELECT point, hit_id FROM ref_points;
+    """)
+    issue_ids, entries = {}, set()
+    for issue_type, df in jira_references:
+        for article, issue_key, summary, point in df[['Article', 'Issue_key', 'Summary', 'Point']].itertuples(index=False, name=None):
+            issue_id = issue_ids.get((issue_type, issue_key))
+            if issue_id is None:
+                issue_id = issue_ids[(issue_type, issue_key)] = len(issue_ids)
+                conn.execute("INSERT INTO jira_issues VALUES (?, ?, ?, ?)", (issue_id, issue_type, issue_key, summary))
+            entries.add((article, issue_id))
+            entries.add((point, issue_id))
+    conn.executemany("INSERT INTO article_index (article, issue_id) VALUES (?, ?)", sorted(entries))
+    conn.execute("CREATE INDEX article_index_by_article ON article_index (article)")
+    conn.execute("""
+        CREATE TABLE article_keys (
+            article TEXT PRIMARY KEY COLLATE NOCASE,
+            sort_key TEXT NOT NULL,
+            files INTEGER NOT NULL,
+            issues INTEGER NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO article_keys VALUES (?, ?, ?, ?)", [
+        (article, _natural_sort_key(article), files, issues)
+        for article, files, issues in conn.execute("""
+            SELECT a.article, COUNT(DISTINCT h.file_id), COUNT(DISTINCT a.issue_id)
+            FROM article_index a LEFT JOIN ref_hits h ON h.hit_id = a.hit_id
+            GROUP BY a.article
+        """)
+    ])
+
+
+class ArticleIndex:
+    """
+    Answers article lookups from the inverted index of the pipeline's SQLite report. Every call
+    opens the file read-only, so a report replaced by a new pipeline run is picked up at once.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def references(self, article):
+        """
+        Returns where an article is referenced: {'article', 'points', 'sas', 'txt', 'jira'}.
+        sas and txt list one {file, lines[, section, subsection, texts]} entry per file, jira one
+        {type, key, summary} entry per issue. points lists the paragraph forms of a main article
+        that have references of their own.
+        """
+        article = normalize_article(article)
+        with self._connect() as conn:
+            files = {'.sas': [], '.txt': []}
+            rows = conn.execute("""
+                SELECT f.extension, f.path, h.line, t.text, s.text, ss.text
+                FROM article_index a
+                JOIN ref_hits h ON h.hit_id = a.hit_id
+                JOIN ref_files f ON f.file_id = h.file_id
+                LEFT JOIN ref_strings t ON t.string_id = h.text_id
+                LEFT JOIN ref_strings s ON s.string_id = h.section_id
+                LEFT JOIN ref_strings ss ON ss.string_id = h.subsection_id
+                WHERE a.article = ?
+                ORDER BY h.hit_id
+            """, (article,))
+            for extension, path, line, text, section, subsection in rows:
+                entries = files.setdefault(extension, [])
+                if not entries or entries[-1]['file'] != path:
+                    entries.append({'file': path, 'lines': []})
+                entry = entries[-1]
+                if entry['lines'] and entry['lines'][-1] == line:
+                    continue  # Hits of articles differing only in case ('495a', '495A') on one line.
+                entry['lines'].append(line)
+                if extension == '.txt':
+                    entry.setdefault('texts', []).append(text or '')
+                    entry['section'], entry['subsection'] = section or '', subsection or ''
+            jira = [{'type': issue_type, 'key': issue_key, 'summary': summary} for issue_type, issue_key, summary in conn.execute("""
+                SELECT DISTINCT i.issue_type, i.issue_key, i.summary
+                FROM article_index a JOIN jira_issues i ON i.issue_id = a.issue_id
+                WHERE a.article = ?
+                ORDER BY i.issue_type, i.issue_key
+            """, (article,))]
+            points = [point for (point,) in conn.execute(
+                "SELECT DISTINCT article FROM article_index WHERE article >= ? AND article < ?",
+                (article + '(', article + '(' + _PREFIX_END)
+            )] if '(' not in article else []
+        return {'article': article, 'points': sorted(points, key=_natural_key), 'sas': files['.sas'],
+                'txt': files['.txt'], 'jira': jira}
+
+    def search(self, prefix, limit=20):
+        """
+        Returns up to limit indexed articles starting with prefix, in natural order, as
+        {'article', 'files', 'issues'} with the number of referencing files and Jira issues.
+        """
+        prefix = _ARTICLE_WORDS_PATTERN.match(prefix).group(1).replace(' ', '')
+        with self._connect('article_keys') as conn:
+            rows = conn.execute("""
+                SELECT article, files, issues FROM article_keys
+                WHERE article >= ? AND article < ?
+                ORDER BY sort_key
+                LIMIT ?
+            """, (prefix, prefix + _PREFIX_END, limit)).fetchall()
+        return [{'article': article, 'files': files, 'issues': issues} for article, files, issues in rows]
+
+    def _connect(self, table='article_index'):
+        if not os.path.exists(self.db_path):
+            raise ArticleIndexUnavailable("No report has been generated yet.")
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is None:
+            conn.close()
+            raise ArticleIndexUnavailable("The report has no article index; run the pipeline to build it.")
+        return closing(conn)
+
+
+def _natural_sort_key(article):
+    """
+    A string that sorts like _natural_key: text is lowercased and every digit run becomes a
+    marker plus the zero-padded number, so that plain string (SQL) order is natural order.
+    """
+    return ''.join(f"{_SORT_NUMBER_MARK}{part:0>{_SORT_NUMBER_WIDTH}}" if part.isdigit() else part.lower()
+                   for part in re.split(r'(\d+)', article))
+
+
+def _natural_key(article):
+    """Sorts '9' < '92' < '92(1)' < '100' rather than by string."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', article)]
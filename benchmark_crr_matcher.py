@@ -0,0 +1,216 @@
+# benchmark_crr_matcher.py
+"""
+Equivalence check and throughput benchmark for the compiled CRR article matcher.
+
+Generates a reproducible corpus of SAS/TXT-like lines (plus adversarial token soup around the
+edge cases of the six PATTERNS), verifies that the single-pass matcher in generate_crr_report.py
+returns exactly what the original per-pattern re.findall loop returned, and reports lines per
+second for both implementations.
+
+Usage:
+    python benchmark_crr_matcher.py [--lines 300000] [--seed 7] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import generate_crr_report as crr
+
+# --- Corpus Generation ---
+SAS_LINES = [
+    "  data work.part_{n}; set in.exposures_{n}; run;",
+    "%let start_dt = {n};",
+    "  if pd_value > 0.{n} then do;",
+    "/* compute RWA for exposure class {n} */",
+    "  proc sql; create table t{n} as select * from a; quit;",
+    "  retain artefact_{n};",
+    "* See CRR Article {n}(2) for details;",
+    "/* As per CRR articles {n}, 153 and 154 */",
+    "/* Art. {n} CRR */",
+    "/* CRR Art. {n}.3(1) */",
+    "/* Implements Art. {n}a-2 and Article {n}b */",
+]
+SAS_WEIGHTS = [30, 20, 20, 15, 10, 2, 1, 0.5, 0.5, 0.5, 0.5]
+
+TXT_LINES = [
+    "\\section sec{n} Credit risk mitigation",
+    "\\subsection sub{n} Eligible collateral",
+    "The exposure value is computed as described below.",
+    "According to CRR Article {n}(1), institutions shall apply the formula.",
+    "See CRR articles {n}, {m} and {k} for the treatment of equity exposures.",
+    "Parts of this page were started before the reporting date.",
+]
+TXT_WEIGHTS = [2, 3, 60, 5, 3, 27]
+
+EDGE_TOKENS = [
+    'CRR', 'crr', 'article', 'Article', 'articles', 'Articles', 'Art.', 'art.', 'ART.', 'Art',
+    'and', ',', ' ', '  ', '\t', '92', '92(1)', '125b', '47a', '-', '2', 'a', 'b', '.', '3.4',
+    '(4)', 'x', 'part', 'startArt.', '_Art.', 'CRR Art. 12.3.4(5)',
+]
+
+
+def generate_corpus(num_lines, seed):
+    """Returns a reproducible list of text lines mixing SAS code, TXT pages and edge-case soup."""
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(num_lines):
+        kind = rng.random()
+        if kind < 0.60:
+            template = rng.choices(SAS_LINES, SAS_WEIGHTS)[0]
+        elif kind < 0.95:
+            template = rng.choices(TXT_LINES, TXT_WEIGHTS)[0]
+        else:
+            tokens = rng.choices(EDGE_TOKENS, k=rng.randint(1, 14))
+            lines.append(''.join(token + rng.choice(['', '', ' ']) for token in tokens))
+            continue
+        lines.append(template.format(n=rng.randint(1, 520), m=rng.randint(1, 520), k=rng.randint(1, 520)))
+    return lines
+
+
+# --- Reference Implementation ---
+def _legacy_extract_raw_articles(text, pattern_counts=None):
+    """The original extraction loop: one re.findall per entry in PATTERNS."""
+    found_articles = set()
+    for name, pattern in crr.PATTERNS.items():
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if not matches:
+            continue
+        if name == 'p2':
+            for match_list in matches:
+                found_articles.update(crr._split_article_list(match_list[0] if isinstance(match_list, tuple) else match_list))
+        else:
+            processed = [m[0] if isinstance(m, tuple) else m for m in matches if (m[0] if isinstance(m, tuple) else m)]
+            found_articles.update(processed)
+    return found_articles
+
+
+@contextmanager
+def _patched_extractor(extractor):
+    """Temporarily swaps the extractor used by the pipeline functions."""
+    original = crr._extract_raw_articles
+    crr._extract_raw_articles = extractor
+    try:
+        yield
+    finally:
+        crr._extract_raw_articles = original
+
+
+# --- Equivalence Checks ---
+def check_lines(lines):
+    """Compares raw article sets line by line. Returns the list of mismatching lines."""
+    mismatches = []
+    for line in lines:
+        if _legacy_extract_raw_articles(line) != set(crr._extract_raw_articles(line)):
+            mismatches.append(line)
+    return mismatches
+
+
+def check_file_scan(lines, files=40):
+    """Writes the corpus into .sas and .txt files and compares find_references_in_files outputs."""
+    chunk = max(1, len(lines) // files)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index in range(files):
+            extension = '.sas' if index % 2 == 0 else '.txt'
+            with open(os.path.join(tmp_dir, f"file_{index}{extension}"), 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines[index * chunk:(index + 1) * chunk]))
+        for extension in ('.sas', '.txt'):
+            expected = _run_quietly(crr.find_references_in_files, tmp_dir, extension, extractor=_legacy_extract_raw_articles)
+            actual = _run_quietly(crr.find_references_in_files, tmp_dir, extension)
+            if not _sorted_by_article(expected).equals(_sorted_by_article(actual)):
+                return False
+    return True
+
+
+def _sorted_by_article(df):
+    """Row order of the scan output follows set iteration order, which depends on string hashing."""
+    return df.sort_values('Article').reset_index(drop=True)
+
+
+def check_jira_extraction(lines, issues=500):
+    """Builds a page of fake Jira REST issues from the corpus and compares the per-page extraction outputs."""
+    chunk = max(1, len(lines) // issues)
+    page = [{
+        'key': f"RRMCR-{index}",
+        'fields': {
+            'summary': lines[index * chunk],
+            'description': '\n'.join(lines[index * chunk + 1:(index + 1) * chunk]) if index % 3 else None,
+            'comment': {'comments': []},
+        },
+    } for index in range(issues)]
+    expected = _run_quietly(crr._page_article_references, page, extractor=_legacy_extract_raw_articles)
+    actual = _run_quietly(crr._page_article_references, page)
+    return expected.equals(actual)
+
+
+def _run_quietly(func, *args, extractor=None):
+    """Runs a pipeline function with its _log output suppressed, optionally with another extractor."""
+    original_log = crr._log
+    crr._log = lambda *a, **k: None
+    try:
+        if extractor is None:
+            return func(*args)
+        with _patched_extractor(extractor):
+            return func(*args)
+    finally:
+        crr._log = original_log
+
+
+# --- Throughput ---
+def measure(extractor, lines, repeat=3):
+    """Returns the best lines-per-second figure over several runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            extractor(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lines', type=int, default=300000, help="Number of corpus lines to generate.")
+    parser.add_argument('--seed', type=int, default=7, help="Random seed for the corpus.")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repetitions (best run is reported).")
+    parser.add_argument('--json', help="Optional path to write the results as JSON for tracking over time.")
+    args = parser.parse_args()
+
+    lines = generate_corpus(args.lines, args.seed)
+    print(f"Generated {len(lines)} lines (seed={args.seed}).")
+
+    mismatches = check_lines(lines)
+    files_ok = check_file_scan(lines)
+    jira_ok = check_jira_extraction(lines)
+    print(f"Line-level mismatches:          {len(mismatches)}")
+    print(f"find_references_in_files equal: {files_ok}")
+    print(f"Jira page extraction equal:     {jira_ok}")
+    for line in mismatches[:10]:
+        print(f"  MISMATCH: {line!r}")
+
+    legacy_lps = measure(_legacy_extract_raw_articles, lines, args.repeat)
+    compiled_lps = measure(crr._extract_raw_articles, lines, args.repeat)
+    print(f"Legacy per-pattern findall: {legacy_lps:>12,.0f} lines/s")
+    print(f"Compiled single pass:       {compiled_lps:>12,.0f} lines/s")
+    print(f"Speedup:                    {compiled_lps / legacy_lps:>12.2f}x")
+
+    identical = not mismatches and files_ok and jira_ok
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'lines': len(lines),
+                'seed': args.seed,
+                'identical': identical,
+                'legacy_lines_per_second': legacy_lps,
+                'compiled_lines_per_second': compiled_lps,
+            }, f, indent=2)
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmark_jira_extraction.py
+"""
+Equivalence check and benchmark for the Jira extraction and grouping.
+
+Builds reproducible pages of Jira REST issues with long comment threads (text drawn from the
+same corpus as benchmark_crr_matcher.py), runs the original extraction (issues flattened into a
+DataFrame, then iterrows) and groupby(...).apply(...) grouping alongside the pipeline's per-page
+extraction (_page_article_references, as fetch_jira_references runs it) and group_jira_references,
+checks that the outputs are identical and reports the time taken by each.
+
+Usage:
+    python benchmark_jira_extraction.py [--issues 5000] [--comments 20] [--seed 11]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+import generate_crr_report as crr
+from benchmark_crr_matcher import _legacy_extract_raw_articles, _patched_extractor, generate_corpus
+from fake_jira import issue_json, make_issue
+
+PAGE_SIZE = 100
+
+
+def generate_issues(num_issues, comments_per_issue, seed):
+    """Returns pages of Jira REST issues as the fetcher yields them, with some empty descriptions."""
+    rng = random.Random(seed)
+    lines = generate_corpus(num_issues * (comments_per_issue + 4), seed)
+    line_iter = iter(lines)
+    fields = crr.JIRA_FETCH_FIELDS.split(',')
+    issues = [issue_json(make_issue(
+        f"RRMCR-{index + 1}",
+        next(line_iter),
+        description="" if index % 7 == 0 else "\n".join(next(line_iter) for _ in range(3)),
+        comments=[(f"Analyst {rng.randint(1, 40)}", next(line_iter)) for _ in range(rng.randint(0, comments_per_issue * 2))],
+    ), fields) for index in range(num_issues)]
+    return [issues[i:i + PAGE_SIZE] for i in range(0, len(issues), PAGE_SIZE)]
+
+
+# --- Reference Implementation ---
+def legacy_extract_from_jira_df(pages):
+    """The original extraction: all issues flattened into one DataFrame, then processed row by row."""
+    df = pd.DataFrame([crr._issue_to_record(issue_json) for page in pages for issue_json in page])
+    results = []
+    text_columns = ['Summary', 'Description', 'Comments']
+    for _, row in df.iterrows():
+        search_text = " ".join([str(row.get(col, '')) for col in text_columns])
+        for raw_article in sorted(crr._extract_raw_articles(search_text)):
+            if not raw_article: continue
+            main_article_match = re.match(r'(\d+[a-zA-Z]*)', str(raw_article))
+            main_article = main_article_match.group(1) if main_article_match else raw_article
+            results.append({'Article': main_article, 'Issue_Info': f"{row['Issue_key']}: {row['Summary']}"})
+    return pd.DataFrame(results)
+
+
+def original_extract_from_jira_df(pages):
+    """The original extraction with the original per-pattern re.findall matcher."""
+    with _patched_extractor(_legacy_extract_raw_articles):
+        return legacy_extract_from_jira_df(pages)
+
+
+def per_issue_extract(pages):
+    """The per-page extraction as one loop over the issues, building a dict per reference row."""
+    rows = []
+    for page in pages:
+        for issue_json in page:
+            record = crr._issue_to_record(issue_json)
+            for raw_article in sorted(crr._extract_raw_articles(crr._issue_search_text(record))):
+                if raw_article:
+                    rows.append({'Article': crr._main_article(raw_article),
+                                 'Issue_Info': f"{record['Issue_key']}: {record['Summary']}",
+                                 'Issue_key': record['Issue_key'], 'Summary': str(record['Summary']),
+                                 'Point': crr._format_article_point(raw_article)})
+    return pd.DataFrame(rows, columns=crr.JIRA_REFERENCE_COLUMNS)
+
+
+def page_extract(pages):
+    """The pipeline's extraction: each page reduced to its rows as fetch_jira_references does."""
+    return pd.concat([crr._page_article_references(page) for page in pages], ignore_index=True)
+
+
+def legacy_group(df, column_name):
+    """The original per-group lambda aggregation from main()."""
+    return df.groupby('Article')['Issue_Info'].apply(lambda x: '; '.join(sorted(set(x)))).reset_index().rename(columns={'Issue_Info': column_name})
+
+
+def timed(func, *args, repeat=3):
+    """Returns (best elapsed seconds, result of the last call)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=5000, help="Number of issues to generate.")
+    parser.add_argument('--comments', type=int, default=20, help="Average number of comments per issue.")
+    parser.add_argument('--seed', type=int, default=11, help="Random seed.")
+    parser.add_argument('--repeat', type=int, default=3, help="Timing repetitions (best run is reported).")
+    args = parser.parse_args()
+
+    crr._log = lambda *a, **k: None
+    pages = generate_issues(args.issues, args.comments, args.seed)
+    text_mb = sum(len(crr._issue_search_text(crr._issue_to_record(issue_json))) for page in pages for issue_json in page) / 1e6
+    print(f"Generated {sum(map(len, pages))} issues in {len(pages)} pages ({text_mb:.1f} MB of text).")
+
+    original_extract_s, original_rows = timed(original_extract_from_jira_df, pages, repeat=1)
+    legacy_extract_s, legacy_rows = timed(legacy_extract_from_jira_df, pages, repeat=args.repeat)
+    loop_extract_s, loop_rows = timed(per_issue_extract, pages, repeat=args.repeat)
+    page_extract_s, page_rows = timed(page_extract, pages, repeat=args.repeat)
+    legacy_group_s, legacy_grouped = timed(legacy_group, legacy_rows, 'Referenced_In_Defects', repeat=args.repeat)
+    vector_group_s, vector_grouped = timed(crr.group_jira_references, page_rows, 'Referenced_In_Defects', repeat=args.repeat)
+
+    rows_equal = (legacy_rows.equals(page_rows[['Article', 'Issue_Info']]) and original_rows.equals(legacy_rows)
+                  and loop_rows.equals(page_rows))
+    grouped_equal = legacy_grouped.equals(vector_grouped)
+    print(f"Extraction rows equal: {rows_equal} ({len(page_rows)} rows)")
+    print(f"Grouped output equal:  {grouped_equal} ({len(vector_grouped)} articles)")
+    print(f"{'':24}{'legacy':>10}{'current':>12}{'speedup':>10}")
+    print(f"{'per-page extraction':24}{legacy_extract_s:>9.3f}s{page_extract_s:>11.3f}s{legacy_extract_s / page_extract_s:>9.2f}x")
+    print(f"{'  vs per-issue row loop':24}{loop_extract_s:>9.3f}s{page_extract_s:>11.3f}s{loop_extract_s / page_extract_s:>9.2f}x")
+    print(f"{'  vs per-pattern findall':24}{original_extract_s:>9.3f}s{page_extract_s:>11.3f}s{original_extract_s / page_extract_s:>9.2f}x")
+    print(f"{'grouping':24}{legacy_group_s:>9.3f}s{vector_group_s:>11.3f}s{legacy_group_s / vector_group_s:>9.2f}x")
+    return 0 if rows_equal and grouped_equal else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
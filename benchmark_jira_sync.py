@@ -0,0 +1,137 @@
+# benchmark_jira_sync.py
+"""
+Equivalence check and benchmark for the incremental Jira sync against the fake Jira.
+
+Serves generated Defects / Requirements issue sets from fake_jira.FakeJira and syncs them into a
+fresh JiraIssueStore (sync_jira_issues) over several rounds. Between rounds the issue sets change
+the way they do on a live server:
+    initial     first sync into an empty store: every issue is downloaded
+    unchanged   nothing changed since the last sync
+    changed     issues edited (summary and description) or commented on, new issues created,
+                issues removed from the result set, and issues that entered the result set
+                without a recent update (found through the key listing, not the updated filter)
+After every round the references built from the store must equal those of a full fetch
+(fetch_jira_references) of the same result set, and the store must hold exactly the issues of the
+result set. Prints the time, Jira requests and new / updated / removed counts of every round.
+
+Usage:
+    python benchmark_jira_sync.py [--issues 2000] [--changes 40] [--seed 5]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import generate_crr_report as crr
+from benchmark_pipeline import DEFECT_SHARE, generate_issues
+from fake_jira import FakeJira, make_issue
+from jira_fetch import JiraPageFetcher
+from jira_store import JiraIssueStore
+from run_metrics import RunMetrics
+
+QUERIES = ((crr.JQL_DEFECTS, 'Defects', 'RRMCR'), (crr.JQL_REQTS, 'Requirements', 'PMRRM'))
+# Article numbers referenced by the generated issues.
+NUM_ARTICLES = 600
+
+
+def change_issues(fake, jql, project, issues, changes, rng, now, stale):
+    """
+    Applies changes edits, comment additions, removals, new issues and late entries (issues last
+    updated at stale, before the previous sync) to one query's issues ({key: issue}) and the fake.
+    """
+    keys = rng.sample(sorted(issues), changes * 3)
+    for key in keys[:changes]:
+        issue = issues[key]
+        issues[key] = make_issue(key, f"CRR Article {rng.randint(1, NUM_ARTICLES)}: edited", f"See Art. {rng.randint(1, NUM_ARTICLES)} CRR.",
+                                 [(c['author'], c['body'], c['updated']) for c in issue['comments']], now)
+    for key in keys[changes:changes * 2]:
+        issue = issues[key]
+        comments = [(c['author'], c['body'], c['updated']) for c in issue['comments']]
+        comments.append(("reviewer", f"Also affects CRR Article {rng.randint(1, NUM_ARTICLES)}.", now))
+        issues[key] = make_issue(key, issue['summary'], issue['description'], comments, now)
+    for key in keys[changes * 2:]:
+        del issues[key]
+        fake.remove_issue(jql, key)
+    next_number = max(int(key.partition('-')[2]) for key in issues) + 1
+    for offset, updated in enumerate([now] * changes + [stale] * changes):
+        key = f"{project}-{next_number + offset}"
+        issues[key] = make_issue(key, f"New finding on CRR Article {rng.randint(1, NUM_ARTICLES)}",
+                                 f"Related: Article {rng.randint(1, NUM_ARTICLES)}(1).", (), updated)
+    for key in keys[:changes * 2] + [f"{project}-{next_number + offset}" for offset in range(changes * 2)]:
+        fake.update_issue(jql, issues[key])
+
+
+def sync_round(fetcher, store):
+    """Syncs every query; returns (seconds, requests, metrics counters, {jql: references DataFrame})."""
+    metrics = RunMetrics()
+    fetcher.take_request_timings()
+    start = time.perf_counter()
+    results = {jql: crr.sync_jira_issues(fetcher, store, jql, issue_type, metrics) for jql, issue_type, _ in QUERIES}
+    elapsed = time.perf_counter() - start
+    return elapsed, len(fetcher.take_request_timings()), metrics.counters, results
+
+
+def matches_full_fetch(fetcher, store, fake, results):
+    """Whether each query's synced references and stored issues equal a full fetch of its result set."""
+    for jql, issue_type, _ in QUERIES:
+        expected = _sorted_rows(crr.fetch_jira_references(fetcher, jql, issue_type))
+        if not expected.equals(_sorted_rows(results[jql])) or set(store.revisions(jql)) != set(fake.issue_sets[jql]):
+            return False
+    return True
+
+
+def _sorted_rows(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--issues', type=int, default=2000, help="Number of issues over both queries.")
+    parser.add_argument('--changes', type=int, default=40, help="Issues of each kind of change, per query.")
+    parser.add_argument('--comments', type=int, default=5, help="Maximum number of comments per issue.")
+    parser.add_argument('--seed', type=int, default=5, help="Random seed.")
+    args = parser.parse_args()
+
+    crr._log = lambda *a, **k: None
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    # Last updated well before the first sync, as issues in an established project are.
+    created = now - timedelta(days=30)
+    issue_sets = {}
+    num_defects = round(args.issues * DEFECT_SHARE)
+    work_dir = tempfile.mkdtemp(prefix='crr_jira_sync_')
+    fake = FakeJira().start()
+    fetcher = JiraPageFetcher(fake.url, 'benchmark-token', page_size=crr.JIRA_PAGE_SIZE, max_workers=crr.JIRA_FETCH_WORKERS)
+    store = JiraIssueStore(os.path.join(work_dir, 'store.sqlite'), crr._extraction_signature())
+    try:
+        for (jql, _, project), count in zip(QUERIES, (num_defects, args.issues - num_defects)):
+            issues = generate_issues(project, count, NUM_ARTICLES, args.comments, rng, created)
+            issue_sets[jql] = {issue['key']: issue for issue in issues}
+            fake.set_issues(jql, issues)
+
+        print(f"{'round':12}{'time':>9}{'requests':>10}{'new/upd.':>10}{'removed':>9}  equal to full fetch")
+        all_equal = True
+        for round_name in ('initial', 'unchanged', 'changed'):
+            if round_name == 'changed':
+                for jql, _, project in QUERIES:
+                    change_issues(fake, jql, project, issue_sets[jql], args.changes, rng, datetime.now(timezone.utc), created)
+            elapsed, requests, counters, results = sync_round(fetcher, store)
+            equal = matches_full_fetch(fetcher, store, fake, results)
+            all_equal = all_equal and equal
+            changed = sum(counters.get(f"jira.{issue_type}.issues_changed", 0) for _, issue_type, _ in QUERIES)
+            removed = sum(counters.get(f"jira.{issue_type}.issues_removed", 0) for _, issue_type, _ in QUERIES)
+            print(f"{round_name:12}{elapsed:>8.2f}s{requests:>10}{changed:>10}{removed:>9}  {equal}")
+        return 0 if all_equal else 1
+    finally:
+        store.close()
+        fetcher.close()
+        fake.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
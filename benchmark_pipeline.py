@@ -0,0 +1,258 @@
+# benchmark_pipeline.py
+"""
+End-to-end scaling benchmark of the pipeline on synthetic inputs, with a local fake Jira.
+
+For every scale point (--files and --issues take comma-separated lists of the same length) it
+generates a SAS and a TXT source tree, a TOC workbook and the Defects / Requirements issue sets,
+serves the issues from fake_jira.FakeJira and runs generate_crr_report.py on them in a fresh
+process, twice:
+    cold    no scan cache, Jira store, TOC cache or previous report: everything is scanned,
+            downloaded and parsed
+    warm    the same inputs again: files come from the scan cache, issues from the Jira store
+It prints the time and peak RSS of every stage, taken from the runs' run records (run_metrics.py),
+and the scan and Jira counters. The peak RSS is that of the pipeline process; scan workers are
+separate processes and not included. --trace-memory adds the peak Python allocations of each
+stage, at the cost of a several times slower run.
+
+Results can be saved with --json and compared with a saved file with --compare (run with the same
+options and on the same machine): a stage that is slower than the baseline by more than
+--tolerance (and by more than 0.1s) is reported as a regression, and the exit status is 1.
+
+Usage:
+    python benchmark_pipeline.py [--files 1000,10000] [--issues 100,1000] [--articles 600]
+                                 [--work-dir DIR] [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import generate_crr_report as crr
+from benchmark_crr_matcher import SAS_LINES, SAS_WEIGHTS, TXT_LINES, TXT_WEIGHTS, generate_corpus
+from benchmark_report_output import generate_report
+from fake_jira import FakeJira, make_issue
+from run_metrics import load_run_records
+
+PIPELINE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate_crr_report.py')
+# Share of the generated files that are SAS programs; the rest are TXT pages.
+SAS_SHARE = 0.7
+# Files per generated directory, so that large trees are nested as real ones are.
+FILES_PER_DIRECTORY = 200
+# Share of the issues that are Defects; the rest are Requirements.
+DEFECT_SHARE = 0.6
+TOC_COLUMNS = ['Article', 'Part Name', 'Title Name', 'Chapter Name', 'Section Name', 'Article Name',
+               'Article Content', 'Out of scope']
+# Stages slower than the baseline by less than this many seconds are not reported as regressions.
+REGRESSION_MIN_SECONDS = 0.1
+
+
+# --- Input Generation ---
+def generate_tree(root, extension, num_files, num_articles, lines_per_file, rng):
+    """Writes num_files source files of the given extension under root, in nested directories."""
+    templates, weights = (SAS_LINES, SAS_WEIGHTS) if extension == '.sas' else (TXT_LINES, TXT_WEIGHTS)
+    for index in range(num_files):
+        directory = os.path.join(root, f"group_{index // (FILES_PER_DIRECTORY * FILES_PER_DIRECTORY):03d}",
+                                 f"module_{index // FILES_PER_DIRECTORY:05d}")
+        os.makedirs(directory, exist_ok=True)
+        num_lines = rng.randint(lines_per_file // 2, lines_per_file * 3 // 2)
+        lines = [template.format(n=rng.randint(1, num_articles), m=rng.randint(1, num_articles), k=rng.randint(1, num_articles))
+                 for template in rng.choices(templates, weights, k=num_lines)]
+        with open(os.path.join(directory, f"file_{index:06d}{extension}"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+
+def generate_issues(project, count, num_articles, comments, rng, updated):
+    """Returns count fake Jira issues whose texts reference articles like the real ones do."""
+    texts = iter(generate_corpus(count * (comments + 4), rng.randint(0, 2 ** 31)))
+    issues = []
+    for number in range(1, count + 1):
+        summary = f"CRR Article {rng.randint(1, num_articles)}: {next(texts)[:60]}"
+        description = '\n'.join(next(texts) for _ in range(3))
+        issue_comments = [(f"user{rng.randint(1, 50)}", next(texts)) for _ in range(rng.randint(0, comments))]
+        issues.append(make_issue(f"{project}-{number}", summary, description, issue_comments, updated))
+    return issues
+
+
+def prepare_inputs(directory, num_files, num_issues, args):
+    """Generates (or reuses, when its manifest matches) the inputs of one scale point in directory."""
+    manifest = {'files': num_files, 'issues': num_issues, 'articles': args.articles, 'lines': args.lines,
+                'comments': args.comments, 'seed': args.seed}
+    manifest_path = os.path.join(directory, 'manifest.json')
+    paths = {name: os.path.join(directory, name) for name in ('sas', 'txt', 'toc_with_content.xlsx', 'token.txt', 'issues.json')}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            if json.load(f) == manifest:
+                return paths
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    num_sas = round(num_files * SAS_SHARE)
+    generate_tree(paths['sas'], '.sas', num_sas, args.articles, args.lines, rng)
+    generate_tree(paths['txt'], '.txt', num_files - num_sas, args.articles, args.lines, rng)
+    generate_report(args.articles, args.content_chars, args.seed)[TOC_COLUMNS].to_excel(paths['toc_with_content.xlsx'], index=False)
+    with open(paths['token.txt'], 'w', encoding='utf-8') as f:
+        f.write('benchmark-token\n')
+    num_defects = round(num_issues * DEFECT_SHARE)
+    with open(paths['issues.json'], 'w', encoding='utf-8') as f:
+        json.dump({'defects': [num_defects, rng.randint(0, 2 ** 31)],
+                   'requirements': [num_issues - num_defects, rng.randint(0, 2 ** 31)]}, f)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    print(f"  generated {num_sas} .sas and {num_files - num_sas} .txt files, {args.articles} TOC articles "
+          f"in {time.perf_counter() - start:.1f}s")
+    return paths
+
+
+def start_fake_jira(paths, args):
+    """Serves the issue sets of a scale point under the pipeline's JQL queries."""
+    with open(paths['issues.json'], encoding='utf-8') as f:
+        issue_sets = json.load(f)
+    # Last updated well before the runs, so the warm run's incremental sync finds no changes.
+    updated = datetime.now(timezone.utc) - timedelta(days=30)
+    fake = FakeJira(latency=args.jira_latency)
+    for jql, project, (count, seed) in ((crr.JQL_DEFECTS, 'RRMCR', issue_sets['defects']),
+                                        (crr.JQL_REQTS, 'PMRRM', issue_sets['requirements'])):
+        fake.set_issues(jql, generate_issues(project, count, args.articles, args.comments, random.Random(seed), updated))
+    return fake.start()
+
+
+# --- Pipeline Runs ---
+def run_pipeline(paths, output_dir, jira_url, trace_memory):
+    """Runs the pipeline in a fresh process and returns (wall seconds, its run record)."""
+    command = [sys.executable, PIPELINE_SCRIPT, '--toc', paths['toc_with_content.xlsx'], '--token-file', paths['token.txt'],
+               '--sas-dir', paths['sas'], '--txt-dir', paths['txt'], '--output-dir', output_dir, '--jira-server', jira_url]
+    if trace_memory:
+        command.append('--trace-memory')
+    log_path = os.path.join(output_dir, 'pipeline.log')
+    start = time.perf_counter()
+    with open(log_path, 'a', encoding='utf-8') as log:
+        returncode = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    records = load_run_records(os.path.join(output_dir, 'run_metrics'), 1)
+    if returncode != 0 or not records or records[0]['status'] != 'succeeded':
+        with open(log_path, encoding='utf-8') as log:
+            tail = log.readlines()[-15:]
+        raise RuntimeError(f"The pipeline failed (exit status {returncode}):\n{''.join(tail)}")
+    return elapsed, records[0]
+
+
+def summarize(elapsed, record):
+    """The figures of one run kept in the results: wall time, stages, and the main counters and row counts."""
+    counters = record['counters']
+    return {
+        'wall_seconds': round(elapsed, 3),
+        'duration_seconds': record['duration_seconds'],
+        'stages': {stage['name']: {key: value for key, value in stage.items() if key != 'name'} for stage in record['stages']},
+        'files_read': sum(counters.get(f'scan.{kind}.files_read', 0) for kind in ('sas', 'txt')),
+        'mb_read': round(sum(counters.get(f'scan.{kind}.bytes_read', 0) for kind in ('sas', 'txt')) / 1e6, 2),
+        'lines_scanned': sum(counters.get(f'scan.{kind}.lines_scanned', 0) for kind in ('sas', 'txt')),
+        'jira_issues': sum(value for name, value in counters.items() if name.endswith('.issues') and name.startswith('jira.')),
+        'jira_requests': counters.get('jira.requests', 0),
+        'report_rows': record['rows'].get('final'),
+    }
+
+
+def print_scale_point(runs):
+    stage_names = list(dict.fromkeys(stage for run in runs.values() for stage in run['stages']))
+    header = f"  {'stage':20}" + ''.join(f"{run_name + ' s':>10}{'RSS MB':>9}" for run_name in runs)
+    traced = any('peak_memory_mb' in stage for run in runs.values() for stage in run['stages'].values())
+    if traced:
+        header += ''.join(f"{run_name + ' py MB':>13}" for run_name in runs)
+    print(header)
+    for stage in stage_names + ['total']:
+        line = f"  {stage:20}"
+        for run in runs.values():
+            entry = run['stages'].get(stage, {}) if stage != 'total' else {'seconds': run['duration_seconds']}
+            line += f"{entry.get('seconds', float('nan')):>10.3f}{entry.get('max_rss_mb', ''):>9}"
+        if traced:
+            line += ''.join(f"{run['stages'].get(stage, {}).get('peak_memory_mb', ''):>13}" for run in runs.values())
+        print(line)
+    for run_name, run in runs.items():
+        print(f"  {run_name}: {run['files_read']} files read ({run['mb_read']} MB, {run['lines_scanned']} lines), "
+              f"{run['jira_issues']} issues in {run['jira_requests']} Jira requests, {run['report_rows']} report rows")
+
+
+def find_regressions(results, baseline, tolerance):
+    """Returns a description of every stage that is slower than in baseline beyond the tolerance."""
+    regressions = []
+    for point, runs in results.items():
+        for run_name, run in runs.items():
+            previous = baseline.get(point, {}).get(run_name)
+            if not previous:
+                continue
+            for stage, entry in run['stages'].items():
+                before = previous['stages'].get(stage, {}).get('seconds')
+                if before is None:
+                    continue
+                now = entry['seconds']
+                if now > before * (1 + tolerance) and now - before > REGRESSION_MIN_SECONDS:
+                    regressions.append(f"{point} {run_name} {stage}: {before:.3f}s -> {now:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', default='1000', help="Comma-separated numbers of source files, one per scale point.")
+    parser.add_argument('--issues', default='100', help="Comma-separated numbers of Jira issues, one per scale point.")
+    parser.add_argument('--articles', type=int, default=600, help="Number of TOC articles (and referenced article numbers).")
+    parser.add_argument('--lines', type=int, default=60, help="Average number of lines per source file.")
+    parser.add_argument('--comments', type=int, default=5, help="Maximum number of comments per issue.")
+    parser.add_argument('--content-chars', type=int, default=1500, help="Average length of the TOC article contents.")
+    parser.add_argument('--jira-latency', type=float, default=0.0, help="Seconds the fake Jira waits before every response.")
+    parser.add_argument('--seed', type=int, default=17, help="Random seed.")
+    parser.add_argument('--trace-memory', action='store_true', help="Also record the peak Python allocations per stage (slower).")
+    parser.add_argument('--work-dir', help="Keep the generated inputs here and reuse them on the next run (default: a temporary directory).")
+    parser.add_argument('--json', help="Write the results to this file.")
+    parser.add_argument('--compare', help="Compare the stage timings with the results in this file.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown against --compare (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    files = [int(value) for value in args.files.split(',')]
+    issues = [int(value) for value in args.issues.split(',')]
+    if len(files) != len(issues):
+        parser.error("--files and --issues need the same number of values.")
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='crr_benchmark_')
+    results = {}
+    try:
+        for num_files, num_issues in zip(files, issues):
+            point = f"{num_files} files, {num_issues} issues"
+            print(f"{point}:")
+            directory = os.path.join(work_dir, f"{num_files}_files_{num_issues}_issues")
+            paths = prepare_inputs(directory, num_files, num_issues, args)
+            output_dir = os.path.join(directory, 'output')
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.makedirs(output_dir)
+            fake = start_fake_jira(paths, args)
+            try:
+                runs = {run_name: summarize(*run_pipeline(paths, output_dir, fake.url, args.trace_memory))
+                        for run_name in ('cold', 'warm')}
+            finally:
+                fake.stop()
+            print_scale_point(runs)
+            results[point] = runs
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        print("Regressions against the baseline:" if regressions else "No regressions against the baseline.")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
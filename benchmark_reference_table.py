@@ -0,0 +1,182 @@
+# benchmark_reference_table.py
+"""
+Benchmark of the file reference store: the compact ReferenceTable against the original nested
+{article: {file: {'lines': set, 'line_texts': {...}, ...}}} aggregation.
+
+Generates reproducible per-file scan hits for a large source tree and measures, with tracemalloc,
+the memory held by each representation once all files are merged, the memory of the exported
+Referenced_In_* DataFrame, and the time of both steps. It also checks that
+ReferenceTable.to_frame() formats exactly the DataFrame of the original aggregation, and that a
+table updated as watch mode does (ReferenceTable.updated() with files added, changed and deleted)
+is identical to one built from scratch from the same files.
+
+Usage:
+    python benchmark_reference_table.py [--files 4000] [--hits-per-file 60] [--articles 900] [--seed 11]
+"""
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from reference_table import ReferenceTable
+
+WORDS = ("institution", "exposure", "capital", "requirement", "shall", "own funds", "risk", "the", "of")
+
+
+def generate_hits(num_files, hits_per_file, num_articles, seed):
+    """Returns [(file_path, hits)] as _scan_file_contents would for .txt files, in walk order."""
+    rng = random.Random(seed)
+    files = []
+    for number in range(num_files):
+        file_path = (f"C:\\Users\\dev\\Documents\\fa_rrm\\irm\\source\\doc\\pages\\area_{number % 40}"
+                     f"\\topic_{number // 40}\\page_{number}.txt")
+        section, subsection, hits, line_num = "", "", [], 0
+        for _ in range(rng.randint(hits_per_file // 2, hits_per_file * 3 // 2)):
+            line_num += rng.randint(1, 20)
+            if rng.random() < 0.05:
+                section, subsection = f"Section {rng.randint(1, 30)} {rng.choice(WORDS)}", ""
+            if rng.random() < 0.1:
+                subsection = f"Subsection {rng.randint(1, 9)}"
+            articles = {str(rng.randint(1, num_articles)) for _ in range(rng.choice((1, 1, 1, 2, 3)))}
+            line_text = f"See CRR Article {' and '.join(sorted(articles))} for the {rng.choice(WORDS)} {rng.choice(WORDS)}."
+            hits.extend((article, line_num, line_text, section, subsection, ()) for article in sorted(articles))
+        files.append((file_path, hits))
+    return files
+
+
+def legacy_aggregate(files):
+    """The original per-file results, merged into {article: {file_path: details}}."""
+    aggregated_results = {}
+    for file_path, hits in files:
+        file_results = {}
+        for article, line_num, line_text, section, subsection, _ in _with_fresh_line_texts(hits):
+            details = file_results.get(article)
+            if details is None:
+                details = file_results[article] = {'lines': set(), 'line_texts': {}}
+            details['lines'].add(line_num)
+            details['line_texts'][line_num] = line_text
+            details['section'] = section
+            details['subsection'] = subsection
+        for article, details in file_results.items():
+            aggregated_results.setdefault(article, {})[file_path] = details
+    return aggregated_results
+
+
+def legacy_format(aggregated_results):
+    """The original formatting of the aggregation into the Referenced_In_TXT DataFrame."""
+    output_data = []
+    for article, file_details in aggregated_results.items():
+        ref_parts = []
+        for file_path, details in file_details.items():
+            sorted_lines = sorted(details['lines'])
+            line_texts_str = '[NL]'.join(details['line_texts'][ln] for ln in sorted_lines)
+            ref_parts.append(f"{file_path}|{details['section']}|{details['subsection']}|"
+                             f"{', '.join(map(str, sorted_lines))}|{line_texts_str}")
+        output_data.append({'Article': article, 'Referenced_In_TXT': "; ".join(ref_parts)})
+    return pd.DataFrame(output_data)
+
+
+def build_table(files):
+    references = ReferenceTable(".txt")
+    for file_path, hits in files:
+        references.add_file(file_path, list(_with_fresh_line_texts(hits)))
+    return references
+
+
+def check_updated(files, seed):
+    """
+    Applies the watch-mode update to a table of files: a file added before all others, one added
+    in the middle, some changed and some deleted. Returns True when the result equals a table
+    built from scratch from the new file list, in all of its columns and interned values.
+    """
+    rng = random.Random(seed)
+    references = build_table(files)
+    deleted = set(rng.sample(range(len(files)), max(1, len(files) // 50)))
+    changed = set(rng.sample(sorted(set(range(len(files))) - deleted), max(1, len(files) // 50)))
+    changed_hits = {}
+    new_files = []
+    for index, (file_path, hits) in enumerate(files):
+        if index in deleted:
+            continue
+        if index in changed:
+            hits = [(article, line_num + 1, f"{line_text} (edited)", section, subsection, points)
+                    for article, line_num, line_text, section, subsection, points in hits]
+            changed_hits[file_path] = hits
+        new_files.append((file_path, hits))
+    for position, (file_path, hits) in ((0, files[-1]), (len(new_files) // 2, files[len(files) // 3])):
+        new_path = file_path.replace('page_', 'aaa_new_page_')
+        new_hits = [(str(int(article) + 1), *hit) for article, *hit in hits]
+        new_files.insert(position, (new_path, new_hits))
+        changed_hits[new_path] = new_hits
+
+    updated = references.updated([file_path for file_path, _ in new_files], changed_hits)
+    rebuilt = build_table(new_files)
+    columns = ('articles', 'files', 'strings', 'points', 'article_ids', 'file_ids', 'lines', 'text_ids',
+               'section_ids', 'subsection_ids', 'point_rows', 'point_ids')
+    return (all(getattr(updated, column) == getattr(rebuilt, column) for column in columns)
+            and updated.to_frame().equals(rebuilt.to_frame()))
+
+
+def _with_fresh_line_texts(hits):
+    """
+    Yields the hits with a new copy of every line's text, as the scanner creates one per line
+    (line.strip()), so interning in the ReferenceTable is measured against real duplicates.
+    """
+    previous_line, line_copy = None, None
+    for article, line_num, line_text, section, subsection, points in hits:
+        if line_num != previous_line:
+            previous_line, line_copy = line_num, ''.join(list(line_text))
+        yield article, line_num, line_copy, section, subsection, points
+
+
+def measure(func, *args):
+    """
+    Returns (result, seconds, MB still allocated by the result). The time is taken on a separate
+    run without tracemalloc, which slows down allocation-heavy code unevenly.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = func(*args)
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, held / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=4000, help="Number of scanned files.")
+    parser.add_argument('--hits-per-file', type=int, default=60, help="Average number of referencing lines per file.")
+    parser.add_argument('--articles', type=int, default=900, help="Number of distinct articles.")
+    parser.add_argument('--seed', type=int, default=11, help="Random seed.")
+    args = parser.parse_args()
+
+    files = generate_hits(args.files, args.hits_per_file, args.articles, args.seed)
+    hit_count = sum(len(hits) for _, hits in files)
+
+    aggregated, legacy_s, legacy_mb = measure(legacy_aggregate, files)
+    legacy_df, legacy_format_s, legacy_df_mb = measure(legacy_format, aggregated)
+    del aggregated
+    references, table_s, table_mb = measure(build_table, files)
+    table_df, table_format_s, table_df_mb = measure(references.to_frame)
+    identical = legacy_df.equals(table_df)
+    updated_identical = check_updated(files, args.seed)
+
+    print(f"Scan results: {args.files} files, {hit_count} hits, {args.articles} articles (seed={args.seed}).")
+    print(f"to_frame() output identical to the original formatting: {identical}")
+    print(f"updated() table identical to a full rebuild:            {updated_identical}")
+    print(f"{'representation':22}{'build':>9}{'held':>10}{'export':>9}{'strings':>10}")
+    print(f"{'nested dicts (orig.)':22}{legacy_s:>8.2f}s{legacy_mb:>8.1f}MB{legacy_format_s:>8.2f}s{legacy_df_mb:>8.1f}MB")
+    print(f"{'ReferenceTable':22}{table_s:>8.2f}s{table_mb:>8.1f}MB{table_format_s:>8.2f}s{table_df_mb:>8.1f}MB")
+    return 0 if identical and updated_identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
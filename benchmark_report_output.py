@@ -0,0 +1,179 @@
+# benchmark_report_output.py
+"""
+Benchmark of the report output step and the TOC load.
+
+Builds a reproducible, article-content-heavy report DataFrame shaped like main()'s df_final and
+measures, each in a fresh process, the time and peak RSS of:
+    to_excel        the original df.to_excel(engine='openpyxl')
+    report_db       write_report_db (the SQLite report, now the primary output)
+    excel_stream    write_excel_report (the optional streaming Excel export)
+    both            write_report_db + write_excel_report, as main() runs them by default
+It also checks that the streamed workbook and the SQLite report hold exactly the rows that
+to_excel writes, and times parsing the TOC workbook against loading it through the TOC cache.
+
+Usage:
+    python benchmark_report_output.py [--articles 1500] [--content-chars 6000] [--seed 5]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import generate_crr_report as crr
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported.
+    resource = None
+
+MODES = ('to_excel', 'report_db', 'excel_stream', 'both')
+WORDS = ("institution", "exposure", "capital", "requirement", "shall", "own funds", "risk", "the", "of",
+         "competent authority", "in accordance with", "Article", "paragraph", "referred to in", "and")
+
+
+def generate_report(num_articles, content_chars, seed):
+    """Returns a DataFrame with the columns and value shapes of the final report."""
+    rng = random.Random(seed)
+
+    def text(length):
+        words = []
+        while sum(map(len, words)) + len(words) < length:
+            words.append(rng.choice(WORDS))
+        return " ".join(words)
+
+    rows = []
+    for number in range(1, num_articles + 1):
+        sas_refs = "; ".join(
+            f"C:\\Users\\dev\\Documents\\fa_rrm\\irm\\source\\sas\\macro_{rng.randint(1, 400)}.sas|"
+            + ", ".join(str(rng.randint(1, 3000)) for _ in range(rng.randint(1, 6)))
+            for _ in range(rng.randint(0, 12))
+        )
+        txt_refs = "; ".join(
+            f"C:\\Users\\dev\\Documents\\fa_rrm\\irm\\source\\doc\\pages\\page_{rng.randint(1, 300)}.txt|"
+            f"Section {rng.randint(1, 20)}|Subsection {rng.randint(1, 9)}|{rng.randint(1, 500)}|{text(200)}"
+            for _ in range(rng.randint(0, 8))
+        )
+        defects = "; ".join(f"RRMCR-{rng.randint(1, 9000)}: {text(60)}" for _ in range(rng.randint(0, 3)))
+        rows.append({
+            'Article': f"Article {number}",
+            'Part Name': f"PART {rng.randint(1, 10)}",
+            'Title Name': f"TITLE {rng.randint(1, 8)}",
+            'Chapter Name': f"CHAPTER {rng.randint(1, 6)}",
+            'Section Name': f"Section {rng.randint(1, 5)}" if number % 3 else None,
+            'Article Name': text(60),
+            'Article Content': text(rng.randint(content_chars // 2, content_chars * 3 // 2)),
+            'Out of scope': "Out of scope" if number % 19 == 0 else None,
+            'Referenced_In_SAS': sas_refs or "Not found in sas scan",
+            'Referenced_In_TXT': txt_refs or "Not found in txt scan",
+            'Referenced_In_Defects': defects or "Not found in defects scan",
+            'Referenced_In_Reqts': "Not found in reqts scan",
+        })
+    return pd.DataFrame(rows)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_mode(mode, out_dir):
+    """Runs one output mode in this process and returns its measurements."""
+    # The report is generated once by the parent and loaded here, so the peak RSS before writing
+    # is that of the report data itself rather than of generating it.
+    df = pd.read_pickle(os.path.join(out_dir, 'report.pickle'))
+    baseline = _peak_rss_mb()
+    excel_path = os.path.join(out_dir, f"{mode}.xlsx")
+    db_path = os.path.join(out_dir, f"{mode}.sqlite")
+    start = time.perf_counter()
+    if mode == 'to_excel':
+        df.to_excel(excel_path, index=False, engine='openpyxl')
+    if mode in ('report_db', 'both'):
+        crr.write_report_db(df, db_path)
+    if mode in ('excel_stream', 'both'):
+        crr.write_excel_report(df, excel_path)
+    elapsed = time.perf_counter() - start
+    peak = _peak_rss_mb()
+    return {'mode': mode, 'seconds': elapsed, 'baseline_rss_mb': baseline, 'peak_rss_mb': peak}
+
+
+def check_outputs(out_dir):
+    """True when the streamed workbook and the SQLite report hold the same rows as the to_excel workbook."""
+    expected = pd.read_excel(os.path.join(out_dir, 'to_excel.xlsx'), dtype=str)
+    streamed = pd.read_excel(os.path.join(out_dir, 'excel_stream.xlsx'), dtype=str)
+    from report_store import ReportIndex
+    from_db = ReportIndex.from_sqlite(os.path.join(out_dir, 'report_db.sqlite'))
+    from_excel = ReportIndex(expected)
+    return expected.equals(streamed) and from_db.rows == from_excel.rows
+
+
+def measure_toc(args, out_dir):
+    """Returns (parse seconds, cached load seconds, re-validated load seconds) for a synthetic TOC."""
+    report = pd.read_pickle(os.path.join(out_dir, 'report.pickle'))
+    toc_path = os.path.join(out_dir, 'toc_with_content.xlsx')
+    report[['Article', 'Part Name', 'Title Name', 'Chapter Name', 'Section Name', 'Article Name',
+            'Article Content', 'Out of scope']].to_excel(toc_path, index=False)
+    crr.TOC_FILE = toc_path
+    crr.TOC_CACHE_FILE = os.path.join(out_dir, 'crr_toc_cache.pickle')
+    crr._log = lambda *a, **k: None
+
+    start = time.perf_counter()
+    parsed = crr.load_toc()  # Cold: parses the workbook and writes the cache.
+    parse_s = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = crr.load_toc()  # Size and mtime match.
+    cached_s = time.perf_counter() - start
+    os.utime(toc_path)
+    start = time.perf_counter()
+    rehashed = crr.load_toc()  # Touched: the hash is checked, the workbook is not parsed.
+    rehashed_s = time.perf_counter() - start
+    assert parsed.equals(cached) and parsed.equals(rehashed)
+    return parse_s, cached_s, rehashed_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--articles', type=int, default=1500, help="Number of report rows to generate.")
+    parser.add_argument('--content-chars', type=int, default=6000, help="Average article content length.")
+    parser.add_argument('--seed', type=int, default=5, help="Random seed.")
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--out-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.out_dir)))
+        return 0
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        generate_report(args.articles, args.content_chars, args.seed).to_pickle(os.path.join(out_dir, 'report.pickle'))
+        results = []
+        for mode in MODES:
+            child = subprocess.run([sys.executable, __file__, '--mode', mode, '--out-dir', out_dir],
+                                   capture_output=True, text=True, check=True)
+            results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+        identical = check_outputs(out_dir)
+        sizes = {mode: sum(os.path.getsize(os.path.join(out_dir, f"{mode}{ext}"))
+                           for ext in ('.xlsx', '.sqlite') if os.path.exists(os.path.join(out_dir, f"{mode}{ext}")))
+                 for mode in MODES}
+        parse_s, cached_s, rehashed_s = measure_toc(args, out_dir)
+
+    print(f"Report: {args.articles} articles, ~{args.content_chars} chars of content each (seed={args.seed}).")
+    print(f"Outputs hold identical rows: {identical}")
+    print(f"{'mode':14}{'time':>9}{'peak RSS':>11}{'over baseline':>15}{'file size':>11}")
+    for result in results:
+        peak, baseline = result['peak_rss_mb'], result['baseline_rss_mb']
+        rss = f"{peak:>9.0f}MB{peak - baseline:>13.0f}MB" if peak is not None else f"{'n/a':>11}{'n/a':>15}"
+        print(f"{result['mode']:14}{result['seconds']:>8.2f}s{rss}{sizes[result['mode']] / 1e6:>9.1f}MB")
+    print(f"TOC: parse {parse_s:.3f}s, cached load {cached_s:.3f}s, touched (re-hashed) load {rehashed_s:.3f}s")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+# benchmark_server.py
+"""
+Benchmark of the viewer server under concurrent viewers, with and without HTTP caching.
+
+Starts server.py's production server (serve_production) in a separate process for each mode:
+    uncached    HTTP_CACHING = False: every request is answered in full, uncompressed
+    cached      HTTP_CACHING = True: ETags, 304s, precompressed assets, cached report responses
+and lets --viewers threads act as browsers: each opens the viewer (index.html, its stylesheet and
+script, the report facets, the first table page and the dashboard summary), exports the report
+once (/report/rows?limit=0) and then reloads the page --reloads times. Like a browser, a viewer
+keeps what it received: it revalidates with If-None-Match and does not request immutable
+(versioned) assets again. Viewers accept gzip. Reports requests/s, latency percentiles and the
+bytes sent per mode.
+
+Usage:
+    python benchmark_server.py [--viewers 20] [--reloads 5] [--report CRR_Full_Combined_Report.sqlite]
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+MODES = ('uncached', 'cached')
+# Number of report columns requested for a table page, as the viewer's default column set would.
+PAGE_COLUMNS = 8
+
+
+class Viewer:
+    """A browser: fetches URLs, keeping ETags and immutable responses as its HTTP cache."""
+
+    def __init__(self, base_url, stats):
+        self.base_url = base_url
+        self.stats = stats
+        self.etags = {}
+        self.immutable = set()
+
+    def get(self, path, phase):
+        if path in self.immutable:
+            self.stats.record(phase, 0.0, 0, cached=True)
+            return None
+        request = urllib.request.Request(self.base_url + path, headers={'Accept-Encoding': 'gzip'})
+        if path in self.etags:
+            request.add_header('If-None-Match', self.etags[path])
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                body, headers, status = response.read(), response.headers, response.status
+        except urllib.error.HTTPError as e:
+            body, headers, status = e.read(), e.headers, e.code
+        self.stats.record(phase, time.perf_counter() - start, len(body), cached=status == 304)
+        if headers.get('ETag'):
+            self.etags[path] = headers['ETag']
+        if 'immutable' in headers.get('Cache-Control', ''):
+            self.immutable.add(path)
+        if status != 200:
+            return None
+        return gzip.decompress(body) if headers.get('Content-Encoding') == 'gzip' else body
+
+    def open_viewer(self, phase, page_query):
+        html = self.get('/', phase)
+        if html is not None:
+            self.assets = re.findall(r'(?:src|href)="(?!https?:|data:|//)([^"]+)"', html.decode('utf-8'))
+        for asset in self.assets:
+            self.get('/' + asset, phase)
+        self.get('/report/facets', phase)
+        self.get(f'/report/rows?{page_query}', phase)
+        self.get('/report/summary', phase)
+
+
+class Stats:
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds, size, cached):
+        with self._lock:
+            self.samples.setdefault(phase, []).append((seconds, size, cached))
+
+
+def run_viewers(base_url, num_viewers, reloads, page_query):
+    stats = Stats()
+
+    def browse():
+        viewer = Viewer(base_url, stats)
+        viewer.open_viewer('first load', page_query)
+        viewer.get('/report/rows?limit=0', 'export')
+        for _ in range(reloads):
+            viewer.open_viewer('reload', page_query)
+
+    threads = [threading.Thread(target=browse) for _ in range(num_viewers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.perf_counter() - start
+
+
+def serve(port, report, caching):
+    """Runs the production server on port, serving report (the --serve mode of this script)."""
+    import server
+    from report_store import ReportStore
+    server.HTTP_CACHING = caching
+    server.report_store = ReportStore([report])
+    server.pipeline_worker = None
+    server.serve_production(port=port)
+
+
+def start_server(port, report, caching):
+    process = subprocess.Popen([sys.executable, __file__, '--serve', str(port), '--report', report, '--caching', str(int(caching))],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/report/facets') as response:
+                return process, json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("The server did not start.")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, default=20, help="Number of concurrent viewers.")
+    parser.add_argument('--reloads', type=int, default=5, help="Page reloads per viewer after the first load.")
+    parser.add_argument('--report', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'CRR_Full_Combined_Report.sqlite'),
+                        help="The SQLite report to serve.")
+    parser.add_argument('--port', type=int, default=5081)
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--caching', type=int, default=1, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        serve(args.serve, args.report, bool(args.caching))
+        return 0
+    if not os.path.exists(args.report):
+        print(f"No report at {args.report}; run the pipeline first or pass --report.")
+        return 1
+
+    import server
+    print(f"Server: {'waitress' if server.waitress is not None else 'Werkzeug threaded'}; "
+          f"{args.viewers} viewers, 1 load + 1 export + {args.reloads} reloads each.")
+    print(f"{'mode':10}{'phase':12}{'requests':>9}{'304/cache':>10}{'req/s':>8}{'p50 ms':>8}{'p95 ms':>8}{'max ms':>8}{'MB sent':>9}")
+    for mode in MODES:
+        process, facets = start_server(args.port, args.report, mode == 'cached')
+        try:
+            page_query = urllib.parse.urlencode(
+                [('offset', 0), ('limit', 50), ('structured', 1)] + [('columns', c) for c in facets['columns'][:PAGE_COLUMNS]])
+            stats, elapsed = run_viewers(f'http://127.0.0.1:{args.port}', args.viewers, args.reloads, page_query)
+        finally:
+            process.terminate()
+            process.wait()
+        total_requests = 0
+        for phase, samples in stats.samples.items():
+            sent = [s for s in samples if s[0] > 0 or not s[2]]
+            latencies = [seconds * 1000 for seconds, _, _ in sent]
+            total_requests += len(sent)
+            print(f"{mode:10}{phase:12}{len(sent):>9}{sum(cached for _, _, cached in samples):>10}{'':>8}"
+                  f"{percentile(latencies, 0.5):>8.1f}{percentile(latencies, 0.95):>8.1f}{max(latencies, default=0):>8.1f}"
+                  f"{sum(size for _, size, _ in samples) / 1e6:>9.2f}")
+        print(f"{mode:10}{'total':12}{total_requests:>9}{'':>10}{total_requests / elapsed:>8.0f}   in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# fake_jira.py
+"""
+A local stand-in for the Jira REST API (v2), used to exercise the pipeline's Jira fetch and
+sync code without a live server.
+
+It serves only what the pipeline calls: serverInfo, field and a paginated search endpoint.
+Each JQL query the pipeline uses is registered with its issue set; the search endpoint
+understands that exact query plus the two derived forms the pipeline sends:
+    (<registered jql>) AND updated >= "yyyy/MM/dd HH:mm"
+    key in (KEY-1, KEY-2, ...)
+Timestamps are treated as UTC.
+"""
+import json
+import re
+import threading
+import zlib
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DELTA_JQL_PATTERN = re.compile(r'^\((?P<base>.*)\) AND updated >= "(?P<since>[^"]+)"$', re.DOTALL)
+KEYS_JQL_PATTERN = re.compile(r'^key in \((?P<keys>[^)]*)\)$', re.IGNORECASE)
+JIRA_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.000+0000"
+
+
+def jira_timestamp(moment):
+    """Formats a datetime the way Jira returns 'created' / 'updated' values."""
+    return moment.astimezone(timezone.utc).strftime(JIRA_TIME_FORMAT)
+
+
+def make_issue(key, summary, description="", comments=(), updated=None):
+    """
+    Builds an issue in the fake's storage format. comments is a sequence of
+    (author, body) or (author, body, updated) tuples.
+    """
+    updated = updated or datetime.now(timezone.utc)
+    return {
+        'key': key,
+        'summary': summary,
+        'description': description,
+        'updated': updated,
+        'comments': [{
+            'id': str(index + 1),
+            'author': comment[0],
+            'body': comment[1],
+            'created': comment[2] if len(comment) > 2 else updated,
+            'updated': comment[2] if len(comment) > 2 else updated,
+        } for index, comment in enumerate(comments)],
+    }
+
+
+def issue_json(issue, fields):
+    """Renders an issue of make_issue as Jira REST JSON, restricted to the requested fields (a list)."""
+    all_fields = '*all' in fields or '*navigable' in fields
+    rendered = {}
+    if all_fields or 'summary' in fields:
+        rendered['summary'] = issue['summary']
+    if all_fields or 'description' in fields:
+        rendered['description'] = issue['description']
+    if all_fields or 'updated' in fields:
+        rendered['updated'] = jira_timestamp(issue['updated'])
+    if all_fields or 'comment' in fields:
+        comments = [{
+            'id': comment['id'],
+            'author': {'name': comment['author'], 'displayName': comment['author']},
+            'body': comment['body'],
+            'created': jira_timestamp(comment['created']),
+            'updated': jira_timestamp(comment['updated']),
+        } for comment in issue['comments']]
+        rendered['comment'] = {'comments': comments, 'startAt': 0, 'maxResults': len(comments), 'total': len(comments)}
+    return {'id': str(zlib.crc32(issue['key'].encode('utf-8'))), 'key': issue['key'],
+            'self': f"/rest/api/2/issue/{issue['key']}", 'fields': rendered}
+
+
+class FakeJira:
+    """
+    Serves registered issue sets over HTTP on a background thread.
+
+    Usage:
+        fake = FakeJira()
+        fake.set_issues(JQL_DEFECTS, [make_issue("RRMCR-1", "CRR Article 92 check")])
+        fake.start()
+        ... JiraPageFetcher(fake.url, "any") ...
+        fake.stop()
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, max_page_size=100, latency=0.0):
+        self.host = host
+        self.port = port
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.issue_sets = {}
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def set_issues(self, jql, issues):
+        """Registers (or replaces) the issues returned for a JQL query."""
+        with self._lock:
+            self.issue_sets[jql] = {issue['key']: issue for issue in issues}
+
+    def update_issue(self, jql, issue):
+        """Adds or replaces a single issue in a registered query."""
+        with self._lock:
+            self.issue_sets.setdefault(jql, {})[issue['key']] = issue
+
+    def remove_issue(self, jql, key):
+        """Removes an issue from a registered query's result set."""
+        with self._lock:
+            self.issue_sets.get(jql, {}).pop(key, None)
+
+    def start(self):
+        fake = self
+
+        class Handler(_FakeJiraHandler):
+            jira = fake
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def search(self, jql, start_at, max_results, fields):
+        """Evaluates a search request against the registered issue sets."""
+        with self._lock:
+            matched = self._match(jql)
+        if matched is None:
+            return None
+        matched.sort(key=lambda issue: _key_sort(issue['key']), reverse=True)
+        page_size = min(max_results, self.max_page_size)
+        page = matched[start_at:start_at + page_size]
+        return {
+            'startAt': start_at,
+            'maxResults': page_size,
+            'total': len(matched),
+            'issues': [issue_json(issue, fields) for issue in page],
+        }
+
+    def _match(self, jql):
+        jql = jql.strip()
+        if jql in self.issue_sets:
+            return list(self.issue_sets[jql].values())
+        delta = DELTA_JQL_PATTERN.match(jql)
+        if delta and delta.group('base') in self.issue_sets:
+            since = datetime.strptime(delta.group('since'), "%Y/%m/%d %H:%M").replace(tzinfo=timezone.utc)
+            return [issue for issue in self.issue_sets[delta.group('base')].values() if issue['updated'] >= since]
+        keys = KEYS_JQL_PATTERN.match(jql)
+        if keys:
+            wanted = {key.strip().strip('"') for key in keys.group('keys').split(',') if key.strip()}
+            found = {}
+            for issues in self.issue_sets.values():
+                found.update({key: issue for key, issue in issues.items() if key in wanted})
+            return list(found.values())
+        return None
+
+
+class _FakeJiraHandler(BaseHTTPRequestHandler):
+    jira = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        # Lists (such as the jira client's 'fields') arrive as repeated parameters.
+        params = {key: ','.join(values) for key, values in parse_qs(parsed.query).items()}
+        self.jira.requests.append(parsed.path)
+        if self.jira.latency:
+            threading.Event().wait(self.jira.latency)
+
+        if parsed.path == '/rest/api/2/serverInfo':
+            self._send_json({'baseUrl': self.jira.url, 'version': '9.4.0', 'versionNumbers': [9, 4, 0],
+                             'deploymentType': 'Server', 'serverTitle': 'Fake Jira'})
+        elif parsed.path == '/rest/api/2/field':
+            self._send_json([{'id': name, 'name': name, 'custom': False}
+                             for name in ('summary', 'description', 'comment', 'updated')])
+        elif parsed.path == '/rest/api/2/search':
+            fields = set(params.get('fields', '*all').split(','))
+            result = self.jira.search(params.get('jql', ''), int(params.get('startAt', 0)),
+                                      int(params.get('maxResults', 50)), fields)
+            if result is None:
+                self._send_json({'errorMessages': [f"Unsupported JQL: {params.get('jql')}"]}, status=400)
+            else:
+                self._send_json(result)
+        else:
+            self._send_json({'errorMessages': [f"Not found: {parsed.path}"]}, status=404)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _key_sort(key):
+    project, _, number = key.partition('-')
+    return project, int(number) if number.isdigit() else 0
@@ -1,31 +1,132 @@
 # generate_crr_report.py
+import argparse
+import cProfile
+import hashlib
+import io
+import json
 import os
+import pickle
+import queue
 import re
+import sqlite3
 import sys
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from jira import JIRA
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from jira_fetch import JiraPageFetcher
+from article_index import write_article_index
+from jira_store import JiraIssueStore
+from reference_table import ReferenceTable, write_reference_tables
+from report_delta import compute_report_delta, write_report_delta
+from run_metrics import RunMetrics
+from scan_cache import ScanCache
+from source_watcher import SourceWatcher
 
 # --- Configuration ---
 # Get the absolute path of the directory where the script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# --- Inputs and Outputs ---
+# The locations below can be overridden with environment variables (CRR_TOC_FILE, CRR_TOKEN_FILE,
+# CRR_SAS_DIR, CRR_TXT_DIR, CRR_OUTPUT_DIR, CRR_JIRA_SERVER), which also reach the server's warm
+# worker, or on the command line (see configure()).
+
 # --- Input Files ---
-TOC_FILE = os.path.join(SCRIPT_DIR, "toc_with_content.xlsx")
-TOKEN_FILE_PATH = r"C:\Users\sinjav\Password.txt" # IMPORTANT: Hardcoded path
+TOC_FILE = os.environ.get("CRR_TOC_FILE", os.path.join(SCRIPT_DIR, "toc_with_content.xlsx"))
+TOKEN_FILE_PATH = os.environ.get("CRR_TOKEN_FILE", r"C:\Users\sinjav\Password.txt")
 
 # --- Source Code Directories ---
-SAS_SEARCH_DIRECTORY = r"C:\Users\sinjav\Documents\fa_rrm\irm\source\sas"
-TXT_SEARCH_DIRECTORY = r"C:\Users\sinjav\Documents\fa_rrm\irm\source\doc\pages"
+SAS_SEARCH_DIRECTORY = os.environ.get("CRR_SAS_DIR", r"C:\Users\sinjav\Documents\fa_rrm\irm\source\sas")
+TXT_SEARCH_DIRECTORY = os.environ.get("CRR_TXT_DIR", r"C:\Users\sinjav\Documents\fa_rrm\irm\source\doc\pages")
+
+# --- Parallel Scanning ---
+# Number of worker processes used to scan the SAS and TXT trees. 1 scans in-process on a single core.
+SCAN_WORKERS = os.cpu_count() or 1
+# Each tree is split into SCAN_WORKERS * SCAN_CHUNKS_PER_WORKER contiguous chunks to balance the load.
+SCAN_CHUNKS_PER_WORKER = 4
+
+# --- Output Files ---
+# The report, its exports and the caches below are written to OUTPUT_DIR (the server's directory by default).
+OUTPUT_DIR = os.environ.get("CRR_OUTPUT_DIR", SCRIPT_DIR)
+# The report is written to a SQLite file (a 'report' table in report order) that the server reads.
+OUTPUT_REPORT_DB = os.path.join(OUTPUT_DIR, "CRR_Full_Combined_Report.sqlite")
+# The Excel report is an optional export, streamed row by row with openpyxl's write-only mode.
+OUTPUT_EXCEL_FILE = os.path.join(OUTPUT_DIR, "CRR_Full_Combined_Report.xlsx")
+WRITE_EXCEL_REPORT = True
+# What changed since the previous report (coverage per article, changed rows), served to the viewer
+# so it can update in place. Computed from the previous SQLite report before it is replaced; None disables it.
+OUTPUT_DELTA_FILE = os.path.join(OUTPUT_DIR, "CRR_Full_Combined_Report.delta.json")
+
+# --- TOC Cache ---
+# The parsed TOC workbook is kept in a binary (pickle) file next to the report and reused while
+# the workbook's size and mtime, or failing that its content hash, are unchanged. None disables it.
+TOC_CACHE_FILE = os.path.join(os.path.dirname(OUTPUT_EXCEL_FILE), "crr_toc_cache.pickle")
+
+# --- Scan Cache ---
+# Per-file extraction results are kept next to the report so unchanged files are not re-scanned.
+# Set to None to always scan every file.
+SCAN_CACHE_FILE = os.path.join(os.path.dirname(OUTPUT_EXCEL_FILE), "crr_scan_cache.sqlite")
+# Bump when the per-file result structure changes, to discard previously cached results.
+SCAN_CACHE_VERSION = 3
 
-# --- Output File ---
-OUTPUT_EXCEL_FILE = os.path.join(SCRIPT_DIR, "CRR_Full_Combined_Report.xlsx")
+# --- Run Metrics ---
+# Every run writes a JSON run record (time and peak memory per stage, scan and Jira counters, Jira
+# request latencies, row counts at each merge) to RUN_METRICS_DIR, keeping the newest
+# RUN_METRICS_KEEP records. Set RUN_METRICS_DIR to None to disable the records.
+RUN_METRICS_DIR = os.path.join(os.path.dirname(OUTPUT_EXCEL_FILE), "run_metrics")
+RUN_METRICS_KEEP = 50
+# Set to True (or pass --trace-memory) to also record the peak memory of each stage. It is measured
+# with tracemalloc (Python allocations of the pipeline process, not of the scan workers), which makes
+# allocation-heavy stages several times slower, so it is meant for investigations only.
+TRACE_STAGE_MEMORY = False
+# Set to a file path to write a cProfile dump of every run; `--profile PATH` does so for one run.
+PROFILE_OUTPUT_FILE = None
+
+# --- Watch Mode ---
+# `python generate_crr_report.py --watch` (or the server's warm worker, see server.WATCH_SOURCE_FILES)
+# keeps the report up to date as .sas / .txt files change: after a burst of changes has been quiet
+# for WATCH_DEBOUNCE_SECONDS (at most WATCH_MAX_DELAY_SECONDS after its first change) only the
+# changed files are re-scanned and the report is rewritten, reusing the last run's Jira references.
+# Changes are reported by watchdog when it is installed, otherwise the trees are polled every
+# WATCH_POLL_SECONDS after a change, backing off to WATCH_POLL_MAX_SECONDS while nothing changes.
+# WATCH_WRITE_EXCEL = False leaves the Excel export to the next full run.
+WATCH_DEBOUNCE_SECONDS = 1.0
+WATCH_MAX_DELAY_SECONDS = 10.0
+WATCH_POLL_SECONDS = 2.0
+WATCH_POLL_MAX_SECONDS = 30.0
+WATCH_WRITE_EXCEL = True
 
 # --- Jira Configuration ---
-JIRA_SERVER = 'https://rndjira.sas.com'
+JIRA_SERVER = os.environ.get('CRR_JIRA_SERVER', 'https://rndjira.sas.com')
 JQL_DEFECTS = "project in (RRMCR) and issuetype in (Bug) and status not in (closed,'Accepted & Closed','Accepted and Close(Q)')"
 JQL_REQTS = "project = PMRRM and issuetype in ('Feature Request', Requirement) and statusCategory != Done"
 
+# --- Jira Fetching ---
+# Result pages are requested in parallel over a pooled HTTP session and processed as they arrive.
+# Jira may cap the page size below JIRA_PAGE_SIZE; the size it returns is used for the other pages.
+JIRA_PAGE_SIZE = 100
+JIRA_FETCH_WORKERS = 8
+JIRA_MAX_RETRIES = 3
+JIRA_RETRY_BACKOFF = 1.0  # Seconds before the first retry; doubled on every further attempt.
+JIRA_FETCH_FIELDS = "summary,description,comment"
+# Columns of the per-reference Jira tables: the report groups Issue_Info per Article, the article
+# index uses the issue key, summary and paragraph form (Point) of every reference.
+JIRA_REFERENCE_COLUMNS = ['Article', 'Issue_Info', 'Issue_key', 'Summary', 'Point']
+
+# --- Incremental Jira Sync ---
+# Issues and their extracted references are kept in a local store so each run only downloads
+# issues updated since the previous run. Set to None to re-download every issue on every run.
+JIRA_STORE_FILE = os.path.join(os.path.dirname(OUTPUT_EXCEL_FILE), "crr_jira_store.sqlite")
+# Re-fetch window before the last sync, covering the Jira user's time zone and clock skew.
+JIRA_SYNC_OVERLAP = timedelta(days=1)
+JIRA_SYNC_FIELDS = "summary,description,comment,updated"
+JIRA_KEY_BATCH_SIZE = 100
+
 # --- Regular Expression Patterns for CRR Articles ---
 # This single set of patterns will be used across all extraction functions
 PATTERNS = {
@@ -43,6 +144,22 @@ PATTERNS = {
     'p7': r'\bArt\.\s*(\d+(?:\.\d+)?(?:[a-z])?(?:\(\d+\))?)\s*CRR'
 }
 
+# --- Compiled Single-Pass Matcher ---
+# All PATTERNS are folded into one regex so every line is scanned once instead of once per pattern.
+# Each pattern sits in its own optional lookahead with an outer group for the full match span, so a
+# single finditer reports every pattern that matches at a given position. Every pattern needs the
+# literal "art" ("Article" / "Art."), which makes it a safe prefilter for lines that cannot match.
+PATTERN_NAMES = tuple(PATTERNS)
+CRR_MATCHER = re.compile(
+    r'(?=crr|art)' + ''.join(f'(?=({pattern})?)' for pattern in PATTERNS.values()) + r'\w',
+    re.IGNORECASE
+)
+MAIN_ARTICLE_PATTERN = re.compile(r'(\d+[a-zA-Z]*)')
+SECTION_PATTERN = re.compile(r'\\section\s+\S+\s+(.*)', re.IGNORECASE)
+SUBSECTION_PATTERN = re.compile(r'\\subsection\s+\S+\s+(.*)', re.IGNORECASE)
+_LIST_PATTERN_INDEX = PATTERN_NAMES.index('p2')
+_NO_ARTICLES = frozenset()
+
 # =====================================================================================
 # --- HELPER FUNCTIONS ---
 # =====================================================================================
@@ -67,6 +184,48 @@ def _split_article_list(list_string):
                 cleaned_articles.add(simple_num_match.group(0))
     return list(cleaned_articles)
 
+@lru_cache(maxsize=65536)
+def _split_article_list_cached(list_string):
+    """Memoized _split_article_list; article lists repeat heavily across lines and issues."""
+    return tuple(_split_article_list(list_string))
+
+@lru_cache(maxsize=65536)
+def _main_article(raw_article):
+    """Reduces a raw article reference like '92(1)' or '47a-2' to its main article ('92', '47a')."""
+    main_article_match = MAIN_ARTICLE_PATTERN.match(str(raw_article))
+    return main_article_match.group(1) if main_article_match else raw_article
+
+def _extract_raw_articles(text, pattern_counts=None):
+    """
+    Returns the set of raw CRR article references in text using a single pass of CRR_MATCHER.
+    The result is identical to running re.findall for each entry of PATTERNS separately.
+    When a pattern_counts list is given, the count of every pattern that matched is incremented.
+    """
+    if 'art' not in text.lower():
+        return _NO_ARTICLES
+    found_articles = set()
+    # re.findall never returns overlapping matches of the same pattern, so track where the last
+    # accepted match of each pattern ended and ignore matches starting inside it.
+    match_ends = [0] * len(PATTERN_NAMES)
+    for match in CRR_MATCHER.finditer(text):
+        start = match.start()
+        groups = match.groups()
+        for index in range(len(PATTERN_NAMES)):
+            article = groups[2 * index + 1]
+            if article is None or start < match_ends[index]:
+                continue
+            match_ends[index] = match.end(2 * index + 1)
+            if index == _LIST_PATTERN_INDEX:
+                found_articles.update(_split_article_list_cached(article))
+            elif article:
+                found_articles.add(article)
+    if pattern_counts is not None:
+        for index, end in enumerate(match_ends):
+            if end:
+                pattern_counts[index] += 1
+    return found_articles
+
+@lru_cache(maxsize=65536)
 def _format_article_point(raw_article):
     """Formats raw article strings like '255-6' or '281.3' into '255(6)' and '281(3)'."""
     s = str(raw_article).strip()
@@ -84,185 +243,948 @@ def _format_article_point(raw_article):
 # --- DATA FETCHING AND EXTRACTION ---
 # =====================================================================================
 
-def fetch_jira_data(jira_conn, jql, issue_type):
-    """Fetches data from Jira for a given JQL query."""
+def _issue_to_record(issue_json):
+    """Flattens a Jira REST issue (or jira.Issue.raw) into the Issue_key / Summary / Description / Comments record."""
+    fields = issue_json.get('fields', {})
+    comments_text = ""
+    comment_field = fields.get('comment') or {}
+    for comment in comment_field.get('comments') or []:
+        comments_text += f"Author: {comment['author']['displayName']}\nCreated: {comment['created']}\nComment: {comment['body']}\n---\n"
+    return {
+        'Issue_key': issue_json['key'],
+        'Summary': fields.get('summary'),
+        'Description': fields.get('description'),
+        'Comments': comments_text
+    }
+
+def _issue_search_text(record):
+    """Joins the Summary, Description and Comments of an issue record into the text searched for articles."""
+    return " ".join([str(record.get(col, '')) for col in ['Summary', 'Description', 'Comments']])
+
+def _issue_revision(issue_json):
+    """Identifies an issue revision by its 'updated' timestamp and the id/updated pair of every comment."""
+    fields = issue_json.get('fields', {})
+    comments = (fields.get('comment') or {}).get('comments') or []
+    comment_revisions = ','.join(f"{comment['id']}@{comment.get('updated', comment['created'])}" for comment in comments)
+    return f"{fields.get('updated')}|{hashlib.sha1(comment_revisions.encode('utf-8')).hexdigest()}"
+
+def _article_references(issue_keys, summaries, raw_articles):
+    """
+    Builds the JIRA_REFERENCE_COLUMNS table from parallel per-issue sequences of issue keys,
+    summaries and raw article reference sets. The sorted references of all issues are laid out
+    as one long column, the issue columns are repeated to match, and Article, Point ('92(1)')
+    and Issue_Info are derived column-wise.
+    """
+    raw_lists = [sorted(raw_article for raw_article in articles if raw_article) for articles in raw_articles]
+    counts = np.fromiter(map(len, raw_lists), dtype=np.int64, count=len(raw_lists))
+    raw = pd.Series([raw_article for raw_list in raw_lists for raw_article in raw_list], dtype=object)
+    keys = np.repeat(np.asarray(issue_keys, dtype=object), counts)
+    summary = np.repeat(np.asarray([str(value) for value in summaries], dtype=object), counts)
+    return pd.DataFrame({
+        'Article': raw.map(_main_article).to_numpy(),
+        'Issue_Info': keys + ': ' + summary if len(keys) else keys,
+        'Issue_key': keys,
+        'Summary': summary,
+        'Point': raw.map(_format_article_point).to_numpy(),
+    }, columns=JIRA_REFERENCE_COLUMNS)
+
+def _page_article_references(page):
+    """
+    Reduces one page of Jira REST issues to its JIRA_REFERENCE_COLUMNS table. The Summary,
+    Description and Comments of the page's issues are joined column-wise and matched as one batch.
+    """
+    records = [_issue_to_record(issue_json) for issue_json in page]
+    columns = {col: np.asarray([str(record[col]) for record in records], dtype=object)
+               for col in ('Summary', 'Description', 'Comments')}
+    search_text = columns['Summary'] + ' ' + columns['Description'] + ' ' + columns['Comments'] if records else []
+    return _article_references([record['Issue_key'] for record in records], [record['Summary'] for record in records],
+                               map(_extract_raw_articles, search_text))
+
+def connect_jira_fetcher(api_token):
+    """Creates the pooled page fetcher for JIRA_SERVER and verifies the connection."""
+    fetcher = JiraPageFetcher(JIRA_SERVER, api_token, page_size=JIRA_PAGE_SIZE, max_workers=JIRA_FETCH_WORKERS,
+                              max_retries=JIRA_MAX_RETRIES, retry_backoff=JIRA_RETRY_BACKOFF)
+    try:
+        fetcher.server_info()
+    except Exception:
+        fetcher.close()
+        raise
+    return fetcher
+
+def fetch_jira_references(fetcher, jql, issue_type, metrics=None):
+    """
+    Fetches every issue of a JQL query and returns its CRR references as JIRA_REFERENCE_COLUMNS
+    rows (Article, Issue_Info, Issue_key, Summary and Point). Pages are fetched in parallel and
+    each one is reduced to its article rows as soon as it arrives, so the issues themselves are
+    never all held in memory. The issue count is added to metrics (a RunMetrics), when given.
+    """
     _log(f"Fetching {issue_type} from Jira...")
+    results = []
+    issue_count = 0
     try:
-        issues = jira_conn.search_issues(jql, maxResults=False, fields="summary,description,comment")
-        _log(f"Found {len(issues)} {issue_type}.")
-        issue_data = []
-        for issue in issues:
-            comments_text = ""
-            if issue.fields.comment and issue.fields.comment.comments:
-                for comment in issue.fields.comment.comments:
-                    comments_text += f"Author: {comment.author.displayName}\nCreated: {comment.created}\nComment: {comment.body}\n---\n"
-            
-            issue_data.append({
-                'Issue_key': issue.key,
-                'Summary': issue.fields.summary,
-                'Description': issue.fields.description,
-                'Comments': comments_text
-            })
-        return pd.DataFrame(issue_data)
+        for page in fetcher.iter_pages(jql, JIRA_FETCH_FIELDS):
+            results.append(_page_article_references(page))
+            issue_count += len(page)
+        _log(f"Found {issue_count} {issue_type}.")
+        if metrics is not None:
+            metrics.count(f"jira.{issue_type}.issues", issue_count)
     except Exception as e:
         _log(f"Failed to fetch {issue_type}. Error: {e}", level="ERROR")
-        return pd.DataFrame()
+        results = []
+    _log(f"Extraction from {issue_type} complete.")
+    if not results:
+        return pd.DataFrame(columns=JIRA_REFERENCE_COLUMNS)
+    return pd.concat(results, ignore_index=True)
 
-def extract_from_jira_df(df, issue_type):
-    """Extracts CRR article references from a DataFrame of Jira issues."""
-    _log(f"Extracting CRR references from {issue_type} data...")
-    results = []
-    text_columns = ['Summary', 'Description', 'Comments']
-    
-    for _, row in df.iterrows():
-        search_text = " ".join([str(row.get(col, '')) for col in text_columns])
-        found_articles_raw = set()
+def open_jira_store():
+    """Opens the local Jira issue store, or returns None when incremental sync is disabled or unavailable."""
+    if not JIRA_STORE_FILE:
+        return None
+    try:
+        return JiraIssueStore(JIRA_STORE_FILE, _extraction_signature())
+    except Exception as e:
+        _log(f"Could not open Jira issue store at {JIRA_STORE_FILE}, fetching all issues instead. Error: {e}", level="WARNING")
+        return None
 
-        for name, pattern in PATTERNS.items():
-            matches = re.findall(pattern, search_text, re.IGNORECASE)
-            if not matches:
-                continue
-            
-            if name == 'p2':
-                for match_list in matches:
-                    articles = _split_article_list(match_list[0] if isinstance(match_list, tuple) else match_list)
-                    found_articles_raw.update(articles)
-            else:
-                processed = [m[0] if isinstance(m, tuple) else m for m in matches if (m[0] if isinstance(m, tuple) else m)]
-                found_articles_raw.update(processed)
-
-        for raw_article in sorted(list(found_articles_raw)):
-            if not raw_article: continue
-            main_article_match = re.match(r'(\d+[a-zA-Z]*)', str(raw_article))
-            main_article = main_article_match.group(1) if main_article_match else raw_article
-            
-            results.append({
-                'Article': main_article,
-                'Issue_Info': f"{row['Issue_key']}: {row['Summary']}"
-            })
-            
+def sync_jira_issues(fetcher, store, jql, issue_type, metrics=None):
+    """
+    Incrementally syncs the local issue store for a JQL query and returns its CRR references in
+    the same JIRA_REFERENCE_COLUMNS shape as fetch_jira_references.
+
+    The first sync downloads the full result set. Later syncs only fetch issues updated since the
+    last sync (minus JIRA_SYNC_OVERLAP, which absorbs the Jira profile's time zone and clock skew)
+    plus a keys-only listing of the query, used to drop issues that left the result set and to pick
+    up any that entered it without being updated. Article references are only re-extracted for
+    issues whose revision (issue and comment timestamps) changed, and each page is written to the
+    store as it arrives. If Jira cannot be reached, the last synced state is reported.
+    The issue, changed and removed counts are added to metrics (a RunMetrics), when given.
+    """
+    _log(f"Syncing {issue_type} from Jira...")
+    sync_started = datetime.now(timezone.utc)
+    try:
+        last_sync = store.last_sync(jql)
+        stored_revisions = store.revisions(jql)
+        changed_count = 0
+
+        def store_changed(pages, current_keys=None):
+            """Writes the new or updated issues of each page to the store; returns the keys seen."""
+            nonlocal changed_count
+            seen_keys = set()
+            for page in pages:
+                changed_issues = []
+                for issue_json in page:
+                    seen_keys.add(issue_json['key'])
+                    revision = _issue_revision(issue_json)
+                    if (current_keys is not None and issue_json['key'] not in current_keys) or stored_revisions.get(issue_json['key']) == revision:
+                        continue
+                    record = _issue_to_record(issue_json)
+                    record['Revision'] = revision
+                    record['Articles'] = sorted(_extract_raw_articles(_issue_search_text(record)))
+                    changed_issues.append(record)
+                store.upsert(jql, changed_issues)
+                changed_count += len(changed_issues)
+            return seen_keys
+
+        if last_sync is None:
+            current_keys = store_changed(fetcher.iter_pages(jql, JIRA_SYNC_FIELDS))
+        else:
+            current_keys = {issue_json['key'] for page in fetcher.iter_pages(jql, "key") for issue_json in page}
+            since = (last_sync - JIRA_SYNC_OVERLAP).astimezone(timezone.utc).strftime("%Y/%m/%d %H:%M")
+            fetched_keys = store_changed(fetcher.iter_pages(f'({jql}) AND updated >= "{since}"', JIRA_SYNC_FIELDS), current_keys)
+            missing_keys = sorted(key for key in current_keys if key not in stored_revisions and key not in fetched_keys)
+            for i in range(0, len(missing_keys), JIRA_KEY_BATCH_SIZE):
+                batch = missing_keys[i:i + JIRA_KEY_BATCH_SIZE]
+                store_changed(fetcher.iter_pages(f"key in ({', '.join(batch)})", JIRA_SYNC_FIELDS), current_keys)
+
+        removed_keys = [key for key in stored_revisions if key not in current_keys]
+        store.remove(jql, removed_keys)
+        store.set_articles(jql, {record['Issue_key']: sorted(_extract_raw_articles(_issue_search_text(record)))
+                                 for record in store.unextracted(jql)})
+        store.set_last_sync(jql, sync_started)
+        _log(f"Found {len(current_keys)} {issue_type} ({changed_count} new or updated, {len(removed_keys)} removed).")
+        if metrics is not None:
+            metrics.count(f"jira.{issue_type}.issues", len(current_keys))
+            metrics.count(f"jira.{issue_type}.issues_changed", changed_count)
+            metrics.count(f"jira.{issue_type}.issues_removed", len(removed_keys))
+    except Exception as e:
+        _log(f"Failed to sync {issue_type}, using the last synced issues. Error: {e}", level="ERROR")
+
+    issue_keys, summaries, raw_articles = [], [], []
+    for issue_key, summary, articles in store.article_references(jql):
+        issue_keys.append(issue_key)
+        summaries.append(summary)
+        raw_articles.append(articles)
     _log(f"Extraction from {issue_type} complete.")
-    return pd.DataFrame(results)
+    return _article_references(issue_keys, summaries, raw_articles)
 
-def find_references_in_files(search_dir, file_extension):
-    """Finds CRR references in files with a given extension (.sas or .txt)."""
-    _log(f"Scanning for {file_extension} files in {search_dir}...")
-    # Structure: {article: {file_path: {'lines': set(), 'line_texts': {line_num: text}, 'section': '', 'subsection': ''}}}
-    aggregated_results = defaultdict(lambda: defaultdict(lambda: {'lines': set(), 'line_texts': {}}))
+def fetch_all_jira_references(fetcher, store, queries, metrics=None):
+    """
+    Runs the Jira fetch (or incremental sync, when a store is given) for several (jql, issue_type)
+    queries concurrently. All queries share the fetcher's page pool. Returns one DataFrame per query.
+    With metrics (a RunMetrics), the requests made and their latencies are recorded as well.
+    """
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix='jira-query') as executor:
+        if store:
+            futures = [executor.submit(sync_jira_issues, fetcher, store, jql, issue_type, metrics) for jql, issue_type in queries]
+        else:
+            futures = [executor.submit(fetch_jira_references, fetcher, jql, issue_type, metrics) for jql, issue_type in queries]
+        results = [future.result() for future in futures]
+    if metrics is not None:
+        for seconds, attempt in fetcher.take_request_timings():
+            metrics.count("jira.requests")
+            metrics.count("jira.retries", attempt > 0)
+            metrics.observe("jira.request_seconds", seconds)
+        for (_, issue_type), df in zip(queries, results):
+            metrics.count(f"jira.{issue_type}.references", len(df))
+    return results
 
-    section_pattern = re.compile(r'\\section\s+\S+\s+(.*)', re.IGNORECASE)
-    subsection_pattern = re.compile(r'\\subsection\s+\S+\s+(.*)', re.IGNORECASE)
+def group_jira_references(df, column_name):
+    """
+    Collapses (Article, Issue_Info) rows into one row per article whose column_name holds the
+    distinct, sorted Issue_Info values joined with '; '. Deduplication and ordering are done
+    with vectorized operations before a single join per article.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['Article', column_name])
+    distinct = df[['Article', 'Issue_Info']].drop_duplicates().sort_values(['Article', 'Issue_Info'])
+    grouped = distinct.groupby('Article', sort=True)['Issue_Info'].agg('; '.join)
+    return grouped.reset_index().rename(columns={'Issue_Info': column_name})
 
-    for root, _, files in os.walk(search_dir):
-        for file in files:
+def _list_source_files(search_dir, file_extension):
+    """Returns every file under search_dir with the given extension, in a stable (sorted) walk order."""
+    file_paths = []
+    for root, dirs, files in os.walk(search_dir):
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith(file_extension):
-                file_path = os.path.join(root, file)
-                current_section = ""
-                current_subsection = ""
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if file_extension == ".txt":
-                                sec_match = section_pattern.match(line)
-                                if sec_match:
-                                    current_section = sec_match.group(1).strip()
-                                    current_subsection = ""  # Reset on new section
-                                subsec_match = subsection_pattern.match(line)
-                                if subsec_match:
-                                    current_subsection = subsec_match.group(1).strip()
-
-                            found_articles = set()
-                            for name, pattern in PATTERNS.items():
-                                matches = re.findall(pattern, line, re.IGNORECASE)
-                                if not matches: continue
-                                
-                                if name == 'p2':
-                                    for match_list in matches:
-                                        found_articles.update(_split_article_list(match_list))
-                                else:
-                                    processed = [m[0] if isinstance(m, tuple) else m for m in matches if (m[0] if isinstance(m, tuple) else m)]
-                                    found_articles.update(processed)
-                            
-                            for article in found_articles:
-                                if article:
-                                    main_article_match = re.match(r'(\d+[a-zA-Z]*)', str(article))
-                                    main_article = main_article_match.group(1) if main_article_match else article
-                                    
-                                    agg_file = aggregated_results[main_article][file_path]
-                                    agg_file['lines'].add(line_num)
-                                    if file_extension == ".txt":
-                                        agg_file['line_texts'][line_num] = line.strip()
-                                        agg_file['section'] = current_section
-                                        agg_file['subsection'] = current_subsection
-                except Exception as e:
-                    _log(f"Error processing file {file_path}: {e}", level="WARNING")
-
-    # Format the results into a DataFrame
-    output_data = []
-    for article, file_details in aggregated_results.items():
-        ref_parts = []
-        for file_path, details in file_details.items():
-            sorted_lines = sorted(list(details['lines']))
-            line_numbers_str = ', '.join(map(str, sorted_lines))
-            
-            if file_extension == ".sas":
-                # Format: filepath|line1,line2
-                ref_parts.append(f"{file_path}|{line_numbers_str}")
-            elif file_extension == ".txt":
-                # Format: filepath|section|subsection|line1,line2|linetext1[NL]linetext2
-                line_texts_str = '[NL]'.join([details['line_texts'][ln] for ln in sorted_lines])
-                section = details.get('section', '')
-                subsection = details.get('subsection', '')
-                ref_parts.append(f"{file_path}|{section}|{subsection}|{line_numbers_str}|{line_texts_str}")
-
-        ref_string = "; ".join(ref_parts)
-        output_data.append({'Article': article, f'Referenced_In_{file_extension.upper()[1:]}': ref_string})
-
-    _log(f"Finished scanning {file_extension} files.")
-    return pd.DataFrame(output_data)
+                file_paths.append(os.path.join(root, file))
+    return file_paths
+
+def _scan_file_contents(f, file_extension, stats=None):
+    """
+    Scans an open text file for CRR references and returns its hits in line order, as
+    (article, line_num, line_text, section, subsection, points) tuples with one hit per article
+    and line. line_text, section and subsection are only recorded for .txt files (None for .sas);
+    points holds the paragraph forms ('92(1)') of the article referenced on the line.
+    When a stats dict (see _new_scan_stats) is given, the lines scanned and matched are counted in it.
+    """
+    hits = []
+    current_section = ""
+    current_subsection = ""
+    pattern_counts = stats['pattern_lines'] if stats is not None else None
+    line_num = lines_matched = 0
+    for line_num, line in enumerate(f, 1):
+        if file_extension == ".txt":
+            sec_match = SECTION_PATTERN.match(line)
+            if sec_match:
+                current_section = sec_match.group(1).strip()
+                current_subsection = ""  # Reset on new section
+            subsec_match = SUBSECTION_PATTERN.match(line)
+            if subsec_match:
+                current_subsection = subsec_match.group(1).strip()
+
+        found_articles = _extract_raw_articles(line, pattern_counts)
+        if not found_articles: continue
+
+        lines_matched += 1
+        line_articles = {}
+        for article in sorted(found_articles):
+            if article:
+                main_article = _main_article(article)
+                points = line_articles.setdefault(main_article, [])
+                point = _format_article_point(article)
+                if point != main_article and point not in points:
+                    points.append(point)
+        if file_extension == ".txt":
+            line_text = line.strip()
+            hits.extend((article, line_num, line_text, current_section, current_subsection, tuple(points))
+                        for article, points in line_articles.items())
+        else:
+            hits.extend((article, line_num, None, None, None, tuple(points)) for article, points in line_articles.items())
+    if stats is not None:
+        stats['lines'] += line_num
+        stats['lines_matched'] += lines_matched
+    return hits
+
+def _new_scan_stats():
+    """Counters of a file scan: files and bytes read, lines scanned and matched, and matched lines per pattern."""
+    return {'files': 0, 'bytes': 0, 'lines': 0, 'lines_matched': 0, 'pattern_lines': [0] * len(PATTERN_NAMES)}
+
+def _scan_files(file_jobs, file_extension):
+    """
+    Scans a chunk of files and returns the worker's partial results as a list of
+    (file_path, size, mtime_ns, sha1, hits) tuples, in the order of file_jobs, together with the
+    chunk's scan stats. Each job is (file_path, size, mtime_ns, known_sha1). When the content hash
+    equals known_sha1 the file is not scanned and hits is None. Runs inside the scan worker processes.
+    """
+    scanned = []
+    stats = _new_scan_stats()
+    for file_path, size, mtime_ns, known_sha1 in file_jobs:
+        try:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            stats['files'] += 1
+            stats['bytes'] += len(data)
+            sha1 = hashlib.sha1(data).hexdigest()
+            if sha1 == known_sha1:
+                scanned.append((file_path, size, mtime_ns, sha1, None))
+                continue
+            # Decode exactly as open(file_path, 'r', encoding='utf-8', errors='ignore') would.
+            with io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore') as f:
+                scanned.append((file_path, size, mtime_ns, sha1, _scan_file_contents(f, file_extension, stats)))
+        except Exception as e:
+            _log(f"Error processing file {file_path}: {e}", level="WARNING")
+    return scanned, stats
+
+def _chunk_files(file_paths, num_chunks):
+    """Splits file_paths into at most num_chunks contiguous slices, preserving order."""
+    chunk_size = max(1, -(-len(file_paths) // max(1, num_chunks)))
+    return [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
+
+def _extraction_signature():
+    """Identifies the extraction logic; cached scan results and Jira references are discarded whenever it changes."""
+    signature_source = repr((SCAN_CACHE_VERSION, PATTERNS, SECTION_PATTERN.pattern, SUBSECTION_PATTERN.pattern))
+    return hashlib.sha1(signature_source.encode('utf-8')).hexdigest()
+
+def open_scan_cache():
+    """Opens the persistent scan cache, or returns None when caching is disabled or unavailable."""
+    if not SCAN_CACHE_FILE:
+        return None
+    try:
+        return ScanCache(SCAN_CACHE_FILE, _extraction_signature())
+    except Exception as e:
+        _log(f"Could not open scan cache at {SCAN_CACHE_FILE}, scanning without it. Error: {e}", level="WARNING")
+        return None
+
+def submit_file_scan(search_dir, file_extension, executor=None, cache=None):
+    """
+    Lists the files under search_dir and starts scanning the ones the cache cannot answer.
+    Files whose size and mtime match the cache are skipped without being read; the rest are
+    hashed and only re-scanned when their content changed. With a process pool executor the
+    work is submitted in contiguous chunks and this returns immediately, so both trees can be
+    submitted before either is collected. Returns a pending scan for collect_file_scan.
+    """
+    _log(f"Scanning for {file_extension} files in {search_dir}...")
+    file_paths = _list_source_files(search_dir, file_extension)
+    cached_files = cache.load(search_dir, file_extension) if cache else {}
+
+    file_jobs, unchanged_paths = [], set()
+    for file_path in file_paths:
+        try:
+            size, mtime_ns = ScanCache.file_state(file_path)
+        except OSError as e:
+            _log(f"Error processing file {file_path}: {e}", level="WARNING")
+            continue
+        cached = cached_files.get(file_path)
+        if cached and cached.size == size and cached.mtime_ns == mtime_ns:
+            unchanged_paths.add(file_path)
+            continue
+        file_jobs.append((file_path, size, mtime_ns, cached.sha1 if cached else None))
+
+    if executor is not None and file_jobs:
+        num_chunks = SCAN_WORKERS * SCAN_CHUNKS_PER_WORKER
+        futures = [executor.submit(_scan_files, chunk, file_extension) for chunk in _chunk_files(file_jobs, num_chunks)]
+    else:
+        futures = [_CompletedScan(_scan_files(file_jobs, file_extension))]
+
+    return {
+        'search_dir': search_dir,
+        'file_extension': file_extension,
+        'file_paths': file_paths,
+        'cached_files': cached_files,
+        'unchanged_paths': unchanged_paths,
+        'futures': futures,
+        'cache': cache,
+    }
+
+class _CompletedScan:
+    """Stands in for a future when a chunk was scanned in-process."""
+    def __init__(self, scanned):
+        self._scanned = scanned
+
+    def result(self):
+        return self._scanned
+
+def collect_file_scan(pending_scan, metrics=None):
+    """
+    Waits for a scan started by submit_file_scan, updates the cache (new results, refreshed
+    mtimes, evicted deleted files) and merges cached and fresh results, in file order, into a
+    ReferenceTable. The scan's counters are added to metrics (a RunMetrics), when given.
+    """
+    file_extension = pending_scan['file_extension']
+    cached_files = pending_scan['cached_files']
+    cache = pending_scan['cache']
+    unchanged_paths = set(pending_scan['unchanged_paths'])
+
+    fresh_results, changed_entries, touched_entries = {}, [], []
+    stats = _new_scan_stats()
+    for future in pending_scan['futures']:
+        scanned, chunk_stats = future.result()
+        for key, value in chunk_stats.items():
+            stats[key] = [a + b for a, b in zip(stats[key], value)] if key == 'pattern_lines' else stats[key] + value
+        for file_path, size, mtime_ns, sha1, hits in scanned:
+            if hits is None:
+                unchanged_paths.add(file_path)
+                touched_entries.append((file_path, size, mtime_ns))
+            else:
+                fresh_results[file_path] = hits
+                changed_entries.append((file_path, size, mtime_ns, sha1, hits))
+
+    current_paths = set(pending_scan['file_paths'])
+    deleted_paths = [file_path for file_path in cached_files if file_path not in current_paths]
+    if cache:
+        cache.store(pending_scan['search_dir'], file_extension, changed_entries)
+        cache.touch(touched_entries)
+        cache.evict(deleted_paths)
+
+    references = ReferenceTable(file_extension)
+    reused = 0
+    for file_path in pending_scan['file_paths']:
+        if file_path in fresh_results:
+            references.add_file(file_path, fresh_results[file_path])
+        elif file_path in unchanged_paths:
+            references.add_file(file_path, ScanCache.decode(cached_files[file_path]))
+            reused += 1
+
+    _log(f"Finished scanning {len(pending_scan['file_paths'])} {file_extension} files "
+         f"({len(fresh_results)} scanned, {reused} unchanged, {len(deleted_paths)} removed).")
+    if metrics is not None:
+        prefix = f"scan{file_extension}"
+        metrics.count(f"{prefix}.files_listed", len(pending_scan['file_paths']))
+        metrics.count(f"{prefix}.files_read", stats['files'])
+        metrics.count(f"{prefix}.files_scanned", len(fresh_results))
+        metrics.count(f"{prefix}.files_unchanged", reused)
+        metrics.count(f"{prefix}.files_removed", len(deleted_paths))
+        metrics.count(f"{prefix}.bytes_read", stats['bytes'])
+        metrics.count(f"{prefix}.lines_scanned", stats['lines'])
+        metrics.count(f"{prefix}.lines_matched", stats['lines_matched'])
+        for name, count in zip(PATTERN_NAMES, stats['pattern_lines']):
+            metrics.count(f"{prefix}.lines_matched.{name}", count)
+        metrics.count(f"{prefix}.references", len(references))
+    return references
+
+def find_references_in_files(search_dir, file_extension, executor=None, cache=None):
+    """
+    Finds CRR references in files with a given extension (.sas or .txt).
+    When a process pool executor is given, the files are scanned in parallel across its workers;
+    when a ScanCache is given, only new or modified files are scanned.
+    Returns the references formatted as the report's Article / Referenced_In_* DataFrame.
+    """
+    return collect_file_scan(submit_file_scan(search_dir, file_extension, executor, cache)).to_frame()
+
+# =====================================================================================
+# --- TOC AND REPORT FILES ---
+# =====================================================================================
+
+def load_toc():
+    """
+    Returns the parsed TOC workbook. The parsed DataFrame is cached in TOC_CACHE_FILE together
+    with the workbook's size, mtime and SHA-1, so the workbook is only parsed again when it changed.
+    """
+    toc_state = ScanCache.file_state(TOC_FILE)
+    if not TOC_CACHE_FILE:
+        return pd.read_excel(TOC_FILE)
+
+    cached = _read_toc_cache()
+    if cached and cached['state'] == toc_state:
+        return cached['toc']
+    with open(TOC_FILE, 'rb') as f:
+        toc_sha1 = hashlib.sha1(f.read()).hexdigest()
+    if cached and cached['sha1'] == toc_sha1:
+        df_toc = cached['toc']
+    else:
+        _log(f"Parsing TOC workbook: {TOC_FILE}")
+        df_toc = pd.read_excel(TOC_FILE)
+    try:
+        with open(TOC_CACHE_FILE, 'wb') as f:
+            pickle.dump({'pandas': pd.__version__, 'state': toc_state, 'sha1': toc_sha1, 'toc': df_toc}, f,
+                        pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        _log(f"Could not write TOC cache at {TOC_CACHE_FILE}. Error: {e}", level="WARNING")
+    return df_toc
+
+def _read_toc_cache():
+    """Returns the cached TOC entry, or None when it is missing, unreadable or from another pandas version."""
+    try:
+        with open(TOC_CACHE_FILE, 'rb') as f:
+            cached = pickle.load(f)
+    except Exception:
+        return None
+    return cached if isinstance(cached, dict) and cached.get('pandas') == pd.__version__ else None
+
+def write_report_db(df, db_path, references=(), article_keys=None, jira_references=(), delta_path=None):
+    """
+    Writes the final report to a SQLite file: a 'report' table holding the rows in report order
+    (row_id) and a 'meta' table with the column order and generation time. The file is written
+    next to the target and moved into place, so readers never see a partial report.
+    The file references are also stored in structured form: the given ReferenceTables (see
+    reference_table.write_reference_tables) and, when article_keys (the merge key of every
+    report row) is given, a 'report_articles' table linking each row to its article and to a hash
+    of its values (pandas' hash_pandas_object), so the next run's delta only reads changed rows.
+    Together with the (issue_type, DataFrame) pairs of jira_references they form the inverted
+    article index (see article_index.write_article_index) behind the server's article lookups.
+    With delta_path, the changes against the report being replaced (see
+    report_delta.compute_report_delta) are written there and returned.
+    """
+    temp_path = db_path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    columns = list(df.columns)
+    conn = sqlite3.connect(temp_path)
+    try:
+        with conn:
+            conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+                ('columns', json.dumps(columns)),
+                ('generated_at', datetime.now(timezone.utc).isoformat()),
+            ])
+            quoted_columns = ', '.join('"' + column.replace('"', '""') + '"' for column in columns)
+            conn.execute(f"CREATE TABLE report (row_id INTEGER PRIMARY KEY, {quoted_columns})")
+            conn.executemany(
+                f"INSERT INTO report VALUES ({', '.join('?' * (len(columns) + 1))})",
+                ((row_id,) + values for row_id, values in enumerate(_report_rows(df)))
+            )
+            write_reference_tables(conn, references)
+            write_article_index(conn, jira_references)
+            if article_keys is not None:
+                row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64).tolist()
+                conn.execute("CREATE TABLE report_articles (row_id INTEGER PRIMARY KEY, article TEXT NOT NULL, row_hash INTEGER NOT NULL)")
+                conn.executemany("INSERT INTO report_articles VALUES (?, ?, ?)",
+                                 ((row_id, article, row_hash) for row_id, (article, row_hash) in enumerate(zip(article_keys, row_hashes))))
+    finally:
+        conn.close()
+    delta = None
+    if delta_path:
+        try:
+            delta = compute_report_delta(db_path, temp_path)
+        except Exception as e:
+            _log(f"Could not compare the report with the previous one. Error: {e}", level="WARNING")
+    os.replace(temp_path, db_path)
+    if delta_path:
+        write_report_delta(delta, delta_path)
+    return delta
+
+def write_excel_report(df, excel_path):
+    """
+    Writes the final report as an Excel workbook with openpyxl's write-only mode, which streams
+    rows to disk instead of building every cell in memory. The header is styled like pandas' to_excel.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    header_font, header_alignment = Font(bold=True), Alignment(horizontal='center', vertical='top')
+    thin = Side(style='thin')
+    header_border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header = []
+    for column in df.columns:
+        cell = WriteOnlyCell(sheet, value=column)
+        cell.font, cell.alignment, cell.border = header_font, header_alignment, header_border
+        header.append(cell)
+    sheet.append(header)
+    for values in _report_rows(df):
+        sheet.append(values)
+
+    temp_path = excel_path + '.tmp'
+    workbook.save(temp_path)
+    os.replace(temp_path, excel_path)
+
+def _report_rows(df):
+    """Yields the report rows as tuples, with missing values as None."""
+    for values in df.itertuples(index=False, name=None):
+        yield tuple(None if value is None or (isinstance(value, float) and np.isnan(value)) else value for value in values)
+
+# =====================================================================================
+# --- REUSABLE PIPELINE SESSION ---
+# =====================================================================================
+
+class PipelineSession:
+    """
+    The connections, caches and inputs a pipeline run needs, opened on first use.
+
+    A one-off run opens a session and closes it at the end. A long-lived process (the server's
+    warm pipeline worker) keeps one session across runs, so the Jira HTTP session, the issue
+    store, the scan cache, the scan process pool and the parsed TOC are only set up once.
+    """
+
+    def __init__(self):
+        self._api_token = None
+        self._jira_fetcher = None
+        self._jira_store = None
+        self._jira_store_opened = False
+        self._scan_cache = None
+        self._scan_cache_opened = False
+        self._scan_executor = None
+        self._toc = None
+        self._toc_state = None
+        # Inputs of the last complete run, updated in place by watch-mode refreshes:
+        # {'.sas' / '.txt': (file_paths, ReferenceTable), 'jira': (df_defects, df_reqts)}.
+        self.last_run = None
+
+    def jira_fetcher(self, api_token):
+        """Returns a verified Jira fetcher, reconnecting only when the token changed."""
+        if self._jira_fetcher is not None and api_token == self._api_token:
+            self._jira_fetcher.server_info()
+            return self._jira_fetcher
+        if self._jira_fetcher is not None:
+            self._jira_fetcher.close()
+            self._jira_fetcher = None
+        self._jira_fetcher = connect_jira_fetcher(api_token)
+        self._api_token = api_token
+        return self._jira_fetcher
+
+    def jira_store(self):
+        if not self._jira_store_opened:
+            self._jira_store = open_jira_store()
+            self._jira_store_opened = True
+        return self._jira_store
+
+    def scan_cache(self):
+        if not self._scan_cache_opened:
+            self._scan_cache = open_scan_cache()
+            self._scan_cache_opened = True
+        return self._scan_cache
+
+    def scan_executor(self):
+        if self._scan_executor is None and SCAN_WORKERS > 1:
+            self._scan_executor = ProcessPoolExecutor(max_workers=SCAN_WORKERS)
+        return self._scan_executor
+
+    def read_toc(self):
+        """Returns a copy of the parsed TOC file, re-reading it only when the file changed on disk."""
+        toc_state = ScanCache.file_state(TOC_FILE)
+        if self._toc is None or toc_state != self._toc_state:
+            self._toc = load_toc()
+            self._toc_state = toc_state
+        return self._toc.copy()
+
+    def close(self):
+        if self._jira_fetcher:
+            self._jira_fetcher.close()
+        if self._jira_store:
+            self._jira_store.close()
+        if self._scan_executor:
+            self._scan_executor.shutdown()
+        if self._scan_cache:
+            self._scan_cache.close()
+        self.__init__()
 
 # =====================================================================================
 # --- MAIN PIPELINE EXECUTION ---
 # =====================================================================================
 
-def main():
-    """Main function to run the entire consolidated data pipeline."""
+def configure(toc_file=None, token_file=None, sas_dir=None, txt_dir=None, output_dir=None, jira_server=None):
+    """
+    Overrides the inputs and outputs of the pipeline for this process; None keeps a setting. With
+    output_dir, the report, its exports, the caches, the Jira store and the run records all move there.
+    """
+    global TOC_FILE, TOKEN_FILE_PATH, SAS_SEARCH_DIRECTORY, TXT_SEARCH_DIRECTORY, OUTPUT_DIR, JIRA_SERVER
+    TOC_FILE = toc_file or TOC_FILE
+    TOKEN_FILE_PATH = token_file or TOKEN_FILE_PATH
+    SAS_SEARCH_DIRECTORY = sas_dir or SAS_SEARCH_DIRECTORY
+    TXT_SEARCH_DIRECTORY = txt_dir or TXT_SEARCH_DIRECTORY
+    JIRA_SERVER = jira_server or JIRA_SERVER
+    if output_dir:
+        OUTPUT_DIR = output_dir
+        for name in ('OUTPUT_REPORT_DB', 'OUTPUT_EXCEL_FILE', 'OUTPUT_DELTA_FILE', 'TOC_CACHE_FILE',
+                     'SCAN_CACHE_FILE', 'RUN_METRICS_DIR', 'JIRA_STORE_FILE'):
+            # Outputs set to None stay disabled.
+            if globals()[name]:
+                globals()[name] = os.path.join(output_dir, os.path.basename(globals()[name]))
+
+def main(session=None, profile_path=None, trace_memory=None, changed_paths=None):
+    """
+    Main function to run the entire consolidated data pipeline.
+    Pass a PipelineSession to reuse its connections, caches and TOC; it is left open for the next run.
+    With changed_paths, only those files are re-scanned into the session's last run (see
+    refresh_changed_files). The run is recorded in RUN_METRICS_DIR; with profile_path (or
+    PROFILE_OUTPUT_FILE) it is also profiled with cProfile and the stats are dumped to that file.
+    trace_memory overrides TRACE_STAGE_MEMORY. A refresh that changed nothing is not recorded.
+    """
+    metrics = RunMetrics(trace_memory=TRACE_STAGE_MEMORY if trace_memory is None else trace_memory)
+    profile_path = profile_path or PROFILE_OUTPUT_FILE
+    profiler = cProfile.Profile() if profile_path else None
+    owns_session = session is None
+    if owns_session:
+        session = PipelineSession()
+    status, error = "failed", None
+    report_written = True
+    try:
+        if profiler:
+            profiler.enable()
+        if changed_paths is None:
+            run_pipeline(session, metrics)
+        else:
+            metrics.count("watch.changed_paths", len(changed_paths))
+            report_written = refresh_changed_files(session, changed_paths, metrics)
+        status = "succeeded"
+    except SystemExit as e:
+        error = f"Exited with status {e.code}"
+        raise
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            metrics.profile = os.path.abspath(profile_path)
+            _log(f"Profile written to {profile_path}")
+        if owns_session:
+            session.close()
+        if report_written or status != "succeeded":
+            metrics.finish(status, error)
+            _record_run(metrics)
+
+def watch(profile_path=None, trace_memory=None):
+    """
+    Runs the pipeline once, then keeps the report up to date as the source files change (see
+    refresh_changed_files) until interrupted with Ctrl+C. The watcher hands the changed paths to
+    this thread, which owns the session's connections.
+    """
+    session = PipelineSession()
+    changes = queue.Queue()
+    watcher = SourceWatcher([SAS_SEARCH_DIRECTORY, TXT_SEARCH_DIRECTORY], (".sas", ".txt"), changes.put,
+                            WATCH_DEBOUNCE_SECONDS, WATCH_MAX_DELAY_SECONDS, WATCH_POLL_SECONDS, WATCH_POLL_MAX_SECONDS)
+    try:
+        # Started first, so changes made during the first run are refreshed right after it.
+        watcher.start()
+        main(session, profile_path, trace_memory)
+        _log(f"Watching {SAS_SEARCH_DIRECTORY} and {TXT_SEARCH_DIRECTORY} for changes ({watcher.mode}). Press Ctrl+C to stop.")
+        while True:
+            try:
+                changed_paths = changes.get(timeout=1)
+            except queue.Empty:
+                continue
+            try:
+                main(session, profile_path, trace_memory, sorted(changed_paths))
+            except (Exception, SystemExit) as e:
+                _log(f"Refresh failed, waiting for the next change. Error: {e!r}", level="ERROR")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        session.close()
+
+def _record_run(metrics):
+    """Logs the stage timings of a finished run and writes its run record."""
+    _log("Stage timings: " + ", ".join(f"{stage['name']} {stage['seconds']:.2f}s" for stage in metrics.stages))
+    if not RUN_METRICS_DIR:
+        return
+    try:
+        _log(f"Run metrics written to {metrics.write(RUN_METRICS_DIR, RUN_METRICS_KEEP)}")
+    except Exception as e:
+        _log(f"Could not write the run metrics to {RUN_METRICS_DIR}. Error: {e}", level="WARNING")
+
+def run_pipeline(session, metrics=None):
+    """
+    Runs the pipeline once using the resources of the given PipelineSession. Its stages, counters
+    and row counts are recorded in metrics (a RunMetrics); a throwaway one is used when none is given.
+    """
+    if metrics is None:
+        metrics = RunMetrics(trace_memory=False)
     _log("====== STARTING CONSOLIDATED CRR REPORT GENERATION ======")
 
     # --- Step 1: Connect to Jira ---
+    with metrics.stage("connect_jira"):
+        jira_fetcher = _connect_jira(session)
+
+    # --- Step 2: Fetch and Extract from Jira ---
+    # Both source trees are submitted to the scan pool first, so the file scan runs on the worker
+    # processes while the Jira requests below are waiting on the network.
+    with metrics.stage("list_files"):
+        scan_executor = session.scan_executor()
+        scan_cache = session.scan_cache()
+        pending_sas_scan = submit_file_scan(SAS_SEARCH_DIRECTORY, ".sas", scan_executor, scan_cache)
+        pending_txt_scan = submit_file_scan(TXT_SEARCH_DIRECTORY, ".txt", scan_executor, scan_cache)
+
+    with metrics.stage("jira_fetch"):
+        df_defects, df_reqts = fetch_all_jira_references(
+            jira_fetcher, session.jira_store(), [(JQL_DEFECTS, "Defects"), (JQL_REQTS, "Requirements")], metrics
+        )
+
+    # --- Step 3: Find References in Local Files ---
+    with metrics.stage("scan_wait"):
+        sas_references = collect_file_scan(pending_sas_scan, metrics)
+        txt_references = collect_file_scan(pending_txt_scan, metrics)
+
+    _write_report(session, metrics, sas_references, txt_references, df_defects, df_reqts, WRITE_EXCEL_REPORT)
+    session.last_run = {
+        ".sas": (pending_sas_scan['file_paths'], sas_references),
+        ".txt": (pending_txt_scan['file_paths'], txt_references),
+        "jira": (df_defects, df_reqts),
+    }
+    _log("====== SCRIPT FINISHED ======", level="SUCCESS")
+
+def refresh_changed_files(session, changed_paths, metrics=None):
+    """
+    Watch-mode update after files changed on disk: re-scans only the changed .sas / .txt files
+    (changed_paths may also name moved or deleted directories), splices them into the references
+    of the session's last run and rewrites the report from them, reusing that run's Jira
+    references. Runs the full pipeline when the session has no previous run. Returns False when
+    no referenced source file changed and the report was left as it is, True otherwise.
+    """
+    if metrics is None:
+        metrics = RunMetrics(trace_memory=False)
+    if session.last_run is None:
+        _log("No previous run in this session; running the full pipeline.")
+        run_pipeline(session, metrics)
+        return True
+    _log(f"====== REFRESHING THE REPORT FOR {len(changed_paths)} CHANGED PATHS ======")
+    last_run = dict(session.last_run)
+    changed = False
+    with metrics.stage("rescan_files"):
+        for search_dir, file_extension in ((SAS_SEARCH_DIRECTORY, ".sas"), (TXT_SEARCH_DIRECTORY, ".txt")):
+            file_paths, references = last_run[file_extension]
+            updated = _rescan_changed_files(search_dir, file_extension, file_paths, references, changed_paths,
+                                            session.scan_cache(), metrics)
+            if updated is not None:
+                last_run[file_extension] = updated
+                changed = True
+    if not changed:
+        _log("No referenced source file changed; the report is up to date.")
+        return False
+    df_defects, df_reqts = last_run["jira"]
+    _write_report(session, metrics, last_run[".sas"][1], last_run[".txt"][1], df_defects, df_reqts,
+                  WRITE_EXCEL_REPORT and WATCH_WRITE_EXCEL)
+    session.last_run = last_run
+    _log("====== REFRESH FINISHED ======", level="SUCCESS")
+    return True
+
+def _rescan_changed_files(search_dir, file_extension, file_paths, references, changed_paths, cache=None, metrics=None):
+    """
+    Re-scans the files of one tree among changed_paths and returns the tree's updated
+    (file_paths, ReferenceTable), or None when none of its files changed. Files of moved or
+    deleted directories are dropped, directories moved in are listed, and the cache is updated.
+    """
+    root = os.path.abspath(search_dir)
+    touched, removed_prefixes = set(), []
+    for path in changed_paths:
+        path = os.path.abspath(path)
+        try:
+            if os.path.commonpath([root, path]) != root or path == root:
+                continue
+        except ValueError:  # Another drive.
+            continue
+        local_path = os.path.join(search_dir, os.path.relpath(path, root))
+        if os.path.isdir(path):
+            touched.update(_list_source_files(local_path, file_extension))
+            removed_prefixes.append(local_path + os.sep)
+        elif local_path.endswith(file_extension):
+            touched.add(local_path)
+        elif not os.path.exists(path):
+            removed_prefixes.append(local_path + os.sep)
+    touched.update(file_path for file_path in file_paths if file_path.startswith(tuple(removed_prefixes)))
+    if not touched:
+        return None
+
+    known_paths = set(file_paths)
+    cached_files = cache.get(touched) if cache else {}
+    file_jobs, removed_paths = [], []
+    for file_path in sorted(touched):
+        try:
+            size, mtime_ns = ScanCache.file_state(file_path)
+        except OSError:
+            if file_path in known_paths:
+                removed_paths.append(file_path)
+            continue
+        cached = cached_files.get(file_path)
+        # Files new to the listing are always scanned: the references hold no rows for them to keep.
+        known_sha1 = cached.sha1 if cached and file_path in known_paths else None
+        file_jobs.append((file_path, size, mtime_ns, known_sha1))
+
+    scanned, _ = _scan_files(file_jobs, file_extension)
+    changed_hits = {file_path: hits for file_path, _, _, _, hits in scanned if hits is not None}
+    if cache:
+        cache.store(search_dir, file_extension, [entry for entry in scanned if entry[4] is not None])
+        cache.touch([(file_path, size, mtime_ns) for file_path, size, mtime_ns, _, hits in scanned if hits is None])
+        cache.evict(removed_paths)
+    if not changed_hits and not removed_paths:
+        return None
+
+    removed = set(removed_paths)
+    new_paths = sorted((known_paths - removed) | set(changed_hits), key=lambda file_path: _walk_order_key(search_dir, file_path))
+    _log(f"Re-scanned {len(changed_hits)} {file_extension} files, {len(removed_paths)} removed.")
+    if metrics is not None:
+        metrics.count(f"scan{file_extension}.files_scanned", len(changed_hits))
+        metrics.count(f"scan{file_extension}.files_removed", len(removed_paths))
+    return new_paths, references.updated(new_paths, changed_hits)
+
+def _walk_order_key(search_dir, file_path):
+    """Sorts paths as _list_source_files walks them: a directory's files by name, then its subdirectories by name."""
+    *directories, file_name = os.path.relpath(file_path, search_dir).split(os.sep)
+    return [(1, directory) for directory in directories] + [(0, file_name)]
+
+def _write_report(session, metrics, sas_references, txt_references, df_defects, df_reqts, write_excel):
+    """Steps 4 to 6: merges the references onto the TOC and writes the report files."""
+    with metrics.stage("format_references"):
+        df_sas_refs = sas_references.to_frame()
+        df_txt_refs = txt_references.to_frame()
+
+    # --- Step 4: Aggregate and Merge All Data ---
+    _log("Aggregating and merging all data sources...")
+    with metrics.stage("load_toc"):
+        df_toc, out_of_scope_col = _load_merge_toc(session)
+    metrics.record_rows("toc", len(df_toc))
+
+    with metrics.stage("merge"):
+        # Aggregate Jira data
+        defects_grouped = group_jira_references(df_defects, 'Referenced_In_Defects')
+        reqts_grouped = group_jira_references(df_reqts, 'Referenced_In_Reqts')
+
+        # Merge all dataframes onto the TOC
+        df_merged = pd.merge(df_toc, defects_grouped, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_d'))
+        metrics.record_rows("merge_defects", len(df_merged))
+        df_merged = pd.merge(df_merged, reqts_grouped, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_r'))
+        metrics.record_rows("merge_reqts", len(df_merged))
+        df_merged = pd.merge(df_merged, df_sas_refs, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_s'))
+        metrics.record_rows("merge_sas", len(df_merged))
+        df_merged = pd.merge(df_merged, df_txt_refs, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_t'))
+        metrics.record_rows("merge_txt", len(df_merged))
+    for name, df in (("defects_articles", defects_grouped), ("reqts_articles", reqts_grouped),
+                     ("sas_articles", df_sas_refs), ("txt_articles", df_txt_refs)):
+        metrics.record_rows(name, len(df))
+
+    # --- Step 5: Finalize and Clean the Report ---
+    with metrics.stage("finalize"):
+        df_final, article_keys = _finalize_report(df_merged, out_of_scope_col)
+    metrics.record_rows("final", len(df_final))
+
+    # --- Step 6: Save the Final Report ---
+    try:
+        _log(f"Saving final report to: {OUTPUT_REPORT_DB}")
+        with metrics.stage("write_report_db"):
+            delta = write_report_db(df_final, OUTPUT_REPORT_DB, [sas_references, txt_references], article_keys,
+                                    [("Defects", df_defects), ("Requirements", df_reqts)], OUTPUT_DELTA_FILE)
+        if delta is not None:
+            _log(f"{len(delta['articles'])} articles changed coverage and {len(delta['rows'])} report rows changed since the previous run.")
+            metrics.record_rows("delta_articles", len(delta['articles']))
+            metrics.record_rows("delta_rows", len(delta['rows']))
+        if write_excel:
+            _log(f"Exporting report to Excel: {OUTPUT_EXCEL_FILE}")
+            with metrics.stage("write_excel"):
+                write_excel_report(df_final, OUTPUT_EXCEL_FILE)
+        _log("Report saved successfully.")
+    except Exception as e:
+        _log(f"Error saving the final report: {e}", level="ERROR")
+
+def _connect_jira(session):
+    """Step 1: reads the API token and returns the session's connected Jira page fetcher; exits on failure."""
     try:
         with open(TOKEN_FILE_PATH, "r") as f:
             api_token = f.read().strip()
         if not api_token:
             _log(f"Jira token file is empty at {TOKEN_FILE_PATH}", level="ERROR")
             sys.exit(1)
-        jira_conn = JIRA(server=JIRA_SERVER, token_auth=api_token)
+        jira_fetcher = session.jira_fetcher(api_token)
         _log("Successfully connected to Jira.")
     except Exception as e:
         _log(f"Fatal: Could not connect to Jira. Error: {e}", level="ERROR")
         sys.exit(1)
+    return jira_fetcher
 
-    # --- Step 2: Fetch and Extract from Jira ---
-    df_defects_raw = fetch_jira_data(jira_conn, JQL_DEFECTS, "Defects")
-    df_reqts_raw = fetch_jira_data(jira_conn, JQL_REQTS, "Requirements")
-    
-    df_defects = extract_from_jira_df(df_defects_raw, "Defects")
-    df_reqts = extract_from_jira_df(df_reqts_raw, "Requirements")
-
-    # --- Step 3: Find References in Local Files ---
-    df_sas_refs = find_references_in_files(SAS_SEARCH_DIRECTORY, ".sas")
-    df_txt_refs = find_references_in_files(TXT_SEARCH_DIRECTORY, ".txt")
-
-    # --- Step 4: Aggregate and Merge All Data ---
-    _log("Aggregating and merging all data sources...")
-    
-    # Aggregate Jira data
-    defects_grouped = df_defects.groupby('Article')['Issue_Info'].apply(lambda x: '; '.join(sorted(set(x)))).reset_index().rename(columns={'Issue_Info': 'Referenced_In_Defects'})
-    reqts_grouped = df_reqts.groupby('Article')['Issue_Info'].apply(lambda x: '; '.join(sorted(set(x)))).reset_index().rename(columns={'Issue_Info': 'Referenced_In_Reqts'})
-
-    # Load base TOC file
+def _load_merge_toc(session):
+    """Step 4: returns the session's TOC with its merge_key column, and its 'Out of scope' column name (or None); exits when missing."""
     try:
-        df_toc = pd.read_excel(TOC_FILE)
+        df_toc = session.read_toc()
         # --- Find the 'Out of scope' column case-insensitively ---
         out_of_scope_col = next((col for col in df_toc.columns if col.strip().lower() == 'out of scope'), None)
         if not out_of_scope_col:
@@ -273,17 +1195,14 @@ def main():
     except FileNotFoundError:
         _log(f"TOC file not found at {TOC_FILE}", level="ERROR")
         sys.exit(1)
+    return df_toc, out_of_scope_col
 
-    # Merge all dataframes onto the TOC
-    df_merged = pd.merge(df_toc, defects_grouped, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_d'))
-    df_merged = pd.merge(df_merged, reqts_grouped, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_r'))
-    df_merged = pd.merge(df_merged, df_sas_refs, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_s'))
-    df_merged = pd.merge(df_merged, df_txt_refs, left_on='merge_key', right_on='Article', how='left', suffixes=('', '_t'))
-
-    # --- Step 5: Finalize and Clean the Report ---
+def _finalize_report(df_merged, out_of_scope_col):
+    """Step 5: returns the final report table and the merge key of each of its rows."""
     _log("Finalizing the report...")
     
-    # Drop redundant 'Article' and 'merge_key' columns from merges
+    # Drop redundant 'Article' and 'merge_key' columns from merges; the merge keys link the rows to the structured references
+    article_keys = df_merged['merge_key'].tolist()
     df_final = df_merged.drop(columns=[col for col in df_merged.columns if '_d' in col or '_r' in col or '_s' in col or '_t' in col or col == 'merge_key'])
     
     # Fill NaN values with appropriate text
@@ -317,18 +1236,24 @@ def main():
 
     # Ensure all columns exist before reordering
     df_final = df_final[[col for col in final_cols_order if col in df_final.columns]]
-
-    # --- Step 6: Save the Final Excel File ---
-    try:
-        _log(f"Saving final report to: {OUTPUT_EXCEL_FILE}")
-        df_final.to_excel(OUTPUT_EXCEL_FILE, index=False, engine='openpyxl')
-        _log("Report saved successfully.")
-    except Exception as e:
-        _log(f"Error saving the final Excel file: {e}", level="ERROR")
-
-    _log("====== SCRIPT FINISHED ======", level="SUCCESS")
+    return df_final, article_keys
 
 if __name__ == "__main__":
     # Before running, ensure you have installed the required packages:
-    # pip install pandas openpyxl jira
-    main()
+    # pip install pandas openpyxl requests
+    parser = argparse.ArgumentParser(description="Generates the consolidated CRR report.")
+    parser.add_argument('--profile', metavar='PATH', help="Profile the run with cProfile and write the stats to PATH.")
+    parser.add_argument('--trace-memory', action='store_true', default=None, help="Record the peak memory of each stage (slower).")
+    parser.add_argument('--watch', action='store_true', help="Keep the report up to date as the source files change.")
+    parser.add_argument('--toc', metavar='PATH', help="TOC workbook (TOC_FILE, CRR_TOC_FILE).")
+    parser.add_argument('--token-file', metavar='PATH', help="File holding the Jira API token (TOKEN_FILE_PATH, CRR_TOKEN_FILE).")
+    parser.add_argument('--sas-dir', metavar='DIR', help="SAS source tree (SAS_SEARCH_DIRECTORY, CRR_SAS_DIR).")
+    parser.add_argument('--txt-dir', metavar='DIR', help="TXT documentation tree (TXT_SEARCH_DIRECTORY, CRR_TXT_DIR).")
+    parser.add_argument('--output-dir', metavar='DIR', help="Directory of the report, caches and run records (OUTPUT_DIR, CRR_OUTPUT_DIR).")
+    parser.add_argument('--jira-server', metavar='URL', help="Jira base URL (JIRA_SERVER, CRR_JIRA_SERVER).")
+    args = parser.parse_args()
+    configure(args.toc, args.token_file, args.sas_dir, args.txt_dir, args.output_dir, args.jira_server)
+    if args.watch:
+        watch(profile_path=args.profile, trace_memory=args.trace_memory)
+    else:
+        main(profile_path=args.profile, trace_memory=args.trace_memory)
@@ -0,0 +1,104 @@
+# jira_fetch.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# HTTP statuses that are worth retrying: rate limiting and transient server-side failures.
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class JiraPageFetcher:
+    """
+    Fetches Jira search results page by page over a pooled HTTP session.
+
+    The first page of a query reveals the total and the page size the server actually honours;
+    the remaining pages are then requested in parallel on a shared pool of worker threads and
+    yielded as soon as each one arrives, so callers can process issues page by page without
+    ever holding the full result set. At most 2 * max_workers pages are in flight per query.
+    Failed requests are retried up to max_retries times with exponential backoff. The duration
+    and attempt number of the latest requests are kept for take_request_timings().
+    """
+
+    def __init__(self, server, token, page_size=100, max_workers=8, max_retries=3, retry_backoff=1.0, timeout=60):
+        self.server = server.rstrip('/')
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({'Authorization': f"Bearer {token}", 'Accept': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jira-page')
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._request_timings = deque(maxlen=100000)
+
+    def server_info(self):
+        """Returns the server's serverInfo; used to verify the connection and token."""
+        return self._get('serverInfo', {})
+
+    def iter_pages(self, jql, fields):
+        """Yields the 'issues' list of every result page of jql, in completion order."""
+        params = {'jql': jql, 'fields': fields}
+        first_page = self._get('search', dict(params, startAt=0, maxResults=self.page_size))
+        yield first_page.get('issues', [])
+
+        total = int(first_page.get('total', 0))
+        page_size = int(first_page.get('maxResults') or self.page_size) or self.page_size
+        pending_starts = iter(range(page_size, total, page_size))
+        in_flight = set()
+        try:
+            while True:
+                for start_at in pending_starts:
+                    in_flight.add(self.executor.submit(self._get, 'search', dict(params, startAt=start_at, maxResults=page_size)))
+                    if len(in_flight) >= 2 * self.max_workers:
+                        break
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result().get('issues', [])
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def take_request_timings(self):
+        """Returns and clears the (seconds, attempt) of the requests made since the last call."""
+        with self._count_lock:
+            timings = list(self._request_timings)
+            self._request_timings.clear()
+        return timings
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _get(self, resource, params):
+        """GETs /rest/api/2/<resource>, retrying transient failures with exponential backoff."""
+        url = f"{self.server}/rest/api/2/{resource}"
+        for attempt in range(self.max_retries + 1):
+            with self._count_lock:
+                self.request_count += 1
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self._request_timings.append((time.perf_counter() - start, attempt))
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self.retry_backoff * 2 ** attempt)
+                continue
+            self._request_timings.append((time.perf_counter() - start, attempt))
+            if response.status_code in RETRYABLE_STATUSES and attempt < self.max_retries:
+                retry_after = response.headers.get('Retry-After', '')
+                time.sleep(float(retry_after) if retry_after.isdigit() else self.retry_backoff * 2 ** attempt)
+                continue
+            response.raise_for_status()
+            return response.json()
@@ -0,0 +1,115 @@
+# jira_store.py
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class JiraIssueStore:
+    """
+    Local SQLite store of Jira issues, kept in sync per JQL query.
+
+    For every query it holds the issues currently in the result set (summary, description and
+    flattened comments), the revision each issue was stored at, and the raw CRR article
+    references extracted from that revision. A sync only needs to fetch issues updated since
+    the last successful sync. When the extraction signature changes the stored references are
+    cleared, so they are re-extracted from the stored text without downloading anything.
+    The store may be shared by the threads syncing different queries; access is serialized.
+    """
+
+    def __init__(self, db_path, signature):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS syncs (
+                jql TEXT PRIMARY KEY,
+                last_sync TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS issues (
+                jql TEXT NOT NULL,
+                issue_key TEXT NOT NULL,
+                summary TEXT,
+                description TEXT,
+                comments TEXT,
+                revision TEXT NOT NULL,
+                articles TEXT,
+                PRIMARY KEY (jql, issue_key)
+            );
+        """)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        if row is None or row[0] != signature:
+            with self.conn:
+                self.conn.execute("UPDATE issues SET articles = NULL")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)", (signature,))
+
+    def last_sync(self, jql):
+        """Returns the (timezone-aware) start time of the last successful sync of jql, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT last_sync FROM syncs WHERE jql = ?", (jql,)).fetchone()
+            return datetime.fromisoformat(row[0]) if row else None
+
+    def set_last_sync(self, jql, moment):
+        with self.lock:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO syncs (jql, last_sync) VALUES (?, ?)", (jql, moment.isoformat()))
+
+    def revisions(self, jql):
+        """Returns {issue_key: revision} for the issues stored for jql."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT issue_key, revision FROM issues WHERE jql = ?", (jql,)))
+
+    def upsert(self, jql, issues):
+        """
+        Inserts or replaces issues given as dicts with Issue_key, Summary, Description, Comments,
+        Revision and Articles (the list of raw article references extracted from that revision).
+        """
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO issues (jql, issue_key, summary, description, comments, revision, articles) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(jql, issue['Issue_key'], issue['Summary'], issue['Description'], issue['Comments'],
+                      issue['Revision'], json.dumps(issue['Articles'])) for issue in issues]
+                )
+
+    def remove(self, jql, issue_keys):
+        """Removes issues that have left the result set of jql."""
+        with self.lock:
+            with self.conn:
+                self.conn.executemany("DELETE FROM issues WHERE jql = ? AND issue_key = ?", [(jql, key) for key in issue_keys])
+
+    def unextracted(self, jql):
+        """Returns the stored issues whose article references need to be (re-)extracted."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT issue_key, summary, description, comments FROM issues WHERE jql = ? AND articles IS NULL", (jql,)
+            )
+            return [{'Issue_key': key, 'Summary': summary, 'Description': description, 'Comments': comments}
+                    for key, summary, description, comments in rows]
+
+    def set_articles(self, jql, articles_by_key):
+        """Stores re-extracted raw article references, given as {issue_key: [raw_article, ...]}."""
+        with self.lock:
+            with self.conn:
+                self.conn.executemany(
+                    "UPDATE issues SET articles = ? WHERE jql = ? AND issue_key = ?",
+                    [(json.dumps(articles), jql, key) for key, articles in articles_by_key.items()]
+                )
+
+    def article_references(self, jql):
+        """Returns (issue_key, summary, [raw_article, ...]) for every stored issue of jql."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT issue_key, summary, articles FROM issues WHERE jql = ? ORDER BY issue_key", (jql,)
+            )
+            return [(key, summary, json.loads(articles) if articles else []) for key, summary, articles in rows]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
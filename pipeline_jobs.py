@@ -0,0 +1,145 @@
+# pipeline_jobs.py
+import os
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pipeline_worker import PipelineWorkerError
+
+# Job states. A job is 'running' from submission until its process exits.
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+
+class PipelineJob:
+    """
+    One run of the pipeline, in the warm worker or as a subprocess. Output lines are collected
+    as they are printed and can be read incrementally (by index) while the job is still running.
+    """
+
+    def __init__(self, command, cwd, worker=None):
+        self.id = uuid.uuid4().hex
+        self.command = command
+        self.cwd = cwd
+        self.worker = worker
+        self.status = RUNNING
+        self.returncode = None
+        self.error = None
+        self.lines = []
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.condition = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status != RUNNING
+
+    def run(self):
+        """
+        Runs the pipeline to completion, collecting its output line by line. With a warm worker
+        the run happens there; if the worker is unavailable or dies, the run falls back to a fresh
+        subprocess.
+        """
+        try:
+            if self.worker is not None:
+                try:
+                    returncode = self.worker.run(self._append_line)
+                    self._finish(SUCCEEDED if returncode == 0 else FAILED, returncode=returncode)
+                    return
+                except PipelineWorkerError as e:
+                    self._append_line(f"[WARNING] {e} Running the pipeline in a separate process instead.")
+            self._run_subprocess()
+        except Exception as e:
+            self._finish(FAILED, error=str(e))
+
+    def _run_subprocess(self):
+        # Unbuffered, so the pipeline's progress lines arrive while it runs rather than at exit.
+        env = dict(os.environ, PYTHONUNBUFFERED='1', PYTHONIOENCODING='utf-8')
+        process = subprocess.Popen(
+            self.command, cwd=self.cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', bufsize=1
+        )
+        for line in process.stdout:
+            self._append_line(line.rstrip('\r\n'))
+        returncode = process.wait()
+        self._finish(SUCCEEDED if returncode == 0 else FAILED, returncode=returncode)
+
+    def _append_line(self, line):
+        with self.condition:
+            self.lines.append(line)
+            self.condition.notify_all()
+
+    def _finish(self, status, returncode=None, error=None):
+        with self.condition:
+            self.status = status
+            self.returncode = returncode
+            self.error = error
+            self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def wait_for_lines(self, since, timeout):
+        """
+        Blocks until there are output lines after index `since`, the job finishes, or the timeout
+        expires. Returns (new_lines, finished).
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.lines) > since or self.finished, timeout)
+            return self.lines[since:], self.finished
+
+    def snapshot(self, since=0):
+        """Returns the job's state, plus the output lines from index `since` on, as a JSON-able dict."""
+        with self.condition:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'returncode': self.returncode,
+                'error': self.error,
+                'submitted_at': self.submitted_at,
+                'finished_at': self.finished_at,
+                'line_count': len(self.lines),
+                'lines': self.lines[since:],
+            }
+
+
+class PipelineJobRunner:
+    """
+    Runs the pipeline as background jobs, at most one at a time.
+
+    Submitting while a job is running returns that job instead of starting another pipeline,
+    so repeated clicks on "Refresh Data" coalesce into one run. Finished jobs are kept (up to
+    max_history) so their status and output can still be requested. When a PipelineWorker is
+    given, jobs run in it and `command` is only used as the fallback.
+    """
+
+    def __init__(self, command, cwd, worker=None, max_history=20):
+        self.command = command
+        self.cwd = cwd
+        self.worker = worker
+        self.max_history = max_history
+        self.jobs = OrderedDict()
+        self.current = None
+        self._lock = threading.Lock()
+
+    def submit(self):
+        """Starts a new job unless one is running. Returns (job, created)."""
+        with self._lock:
+            if self.current and not self.current.finished:
+                return self.current, False
+            job = PipelineJob(self.command, self.cwd, self.worker)
+            self.jobs[job.id] = job
+            while len(self.jobs) > self.max_history:
+                self.jobs.popitem(last=False)
+            self.current = job
+        threading.Thread(target=job.run, name=f"pipeline-job-{job.id[:8]}", daemon=True).start()
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def latest(self):
+        """Returns the most recently submitted job, or None."""
+        with self._lock:
+            return self.current
@@ -0,0 +1,222 @@
+# pipeline_worker.py
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+
+# Local modules imported by the pipeline script (next to it); a change to any of them restarts the worker.
+PIPELINE_MODULES = ('jira_fetch', 'jira_store', 'scan_cache', 'reference_table', 'article_index',
+                    'report_delta', 'run_metrics', 'source_watcher')
+
+
+class PipelineWorkerError(Exception):
+    """Raised when the warm pipeline worker cannot be started or dies during a run."""
+
+
+class PipelineWorker:
+    """
+    A long-lived process that imports the pipeline once and runs it on request.
+
+    Run requests are sent over a queue; the worker runs generate_crr_report.main() with a
+    PipelineSession it keeps across runs (Jira session and issue store, scan cache and pool,
+    parsed TOC), and sends every line the run prints back over a second queue. The process is
+    started on first use and restarted when it has died or when the pipeline script, or one of
+    the local modules it imports (PIPELINE_MODULES), changed on disk since it was started.
+
+    With watch_sources, the worker also watches the pipeline's source trees and, between runs,
+    refreshes the report from the changed files (generate_crr_report.refresh_changed_files);
+    the output of those refreshes goes to the worker's own console.
+    """
+
+    def __init__(self, script_path, cwd, start_timeout=120, watch_sources=False):
+        self.script_path = script_path
+        self.cwd = cwd
+        self.start_timeout = start_timeout
+        self.watch_sources = watch_sources
+        self.process = None
+        self._context = multiprocessing.get_context('spawn')
+        self._requests = None
+        self._events = None
+        module_dir = os.path.dirname(os.path.abspath(script_path))
+        self._source_paths = [script_path] + [os.path.join(module_dir, f"{name}.py") for name in PIPELINE_MODULES]
+        self._sources_mtime = None
+        self._run_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """Starts the worker (if needed) and waits until the pipeline module is imported."""
+        with self._lock:
+            self._ensure_started()
+
+    def run(self, on_line):
+        """
+        Runs the pipeline once in the worker, calling on_line(text) for every printed line.
+        Returns the run's exit code. Raises PipelineWorkerError if the worker is unavailable or dies.
+        """
+        with self._lock:
+            self._ensure_started()
+            self._run_count += 1
+            run_id = self._run_count
+            self._requests.put(('run', run_id))
+            while True:
+                try:
+                    event = self._events.get(timeout=1)
+                except queue.Empty:
+                    if not self.process.is_alive():
+                        exitcode = self.process.exitcode
+                        self.process = None
+                        raise PipelineWorkerError(f"Pipeline worker exited with code {exitcode} during the run.")
+                    continue
+                kind, event_run_id, payload = event
+                if event_run_id != run_id:
+                    continue
+                if kind == 'line':
+                    on_line(payload)
+                elif kind == 'done':
+                    return payload
+
+    def stop(self):
+        with self._lock:
+            self._stop()
+
+    def _ensure_started(self):
+        sources_mtime = _max_mtime(self._source_paths)
+        if self.alive and sources_mtime == self._sources_mtime:
+            return
+        self._stop()
+        self._requests = self._context.Queue()
+        self._events = self._context.Queue()
+        self.process = self._context.Process(
+            target=_worker_main, args=(self.script_path, self.cwd, self._requests, self._events, self.watch_sources),
+            name='crr-pipeline-worker', daemon=True
+        )
+        self.process.start()
+        self._sources_mtime = sources_mtime
+        deadline = time.monotonic() + self.start_timeout
+        while True:
+            try:
+                kind, _, payload = self._events.get(timeout=1)
+                break
+            except queue.Empty:
+                if not self.process.is_alive() or time.monotonic() > deadline:
+                    self._stop()
+                    raise PipelineWorkerError("Pipeline worker did not start.")
+        if kind != 'ready':
+            self._stop()
+            raise PipelineWorkerError(f"Pipeline worker failed to start: {payload}")
+
+    def _stop(self):
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self._requests.put(('stop', None))
+            self.process.join(timeout=10)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        self.process = None
+
+
+class _QueueWriter:
+    """
+    A text stream that sends each complete line to the parent as a ('line', run_id, text) event.
+    Without a run_id (a watch-mode refresh) the lines go to the process's original stdout.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self.run_id = None
+        self._buffer = ''
+
+    def write(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self._emit(line.rstrip('\r'))
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            self._emit(self._buffer)
+            self._buffer = ''
+
+    def _emit(self, line):
+        if self.run_id is None:
+            print(line, file=sys.__stdout__, flush=True)
+        else:
+            self.events.put(('line', self.run_id, line))
+
+
+def _worker_main(script_path, cwd, requests, events, watch_sources=False):
+    """
+    Entry point of the worker process: imports the pipeline once, then serves run requests
+    ('run', run_id) and, with watch_sources, the watcher's ('refresh', changed_paths) requests.
+    """
+    try:
+        os.chdir(cwd)
+        sys.path.insert(0, os.path.dirname(script_path))
+        import generate_crr_report
+        session = generate_crr_report.PipelineSession()
+        watcher = None
+        if watch_sources:
+            crr = generate_crr_report
+            watcher = crr.SourceWatcher(
+                [crr.SAS_SEARCH_DIRECTORY, crr.TXT_SEARCH_DIRECTORY], (".sas", ".txt"),
+                lambda changed_paths: requests.put(('refresh', sorted(changed_paths))),
+                crr.WATCH_DEBOUNCE_SECONDS, crr.WATCH_MAX_DELAY_SECONDS, crr.WATCH_POLL_SECONDS, crr.WATCH_POLL_MAX_SECONDS
+            ).start()
+    except BaseException:
+        events.put(('error', None, traceback.format_exc()))
+        return
+    events.put(('ready', None, os.getpid()))
+
+    writer = _QueueWriter(events)
+    sys.stdout = sys.stderr = writer
+    while True:
+        kind, payload = requests.get()
+        if kind == 'stop':
+            break
+        if kind == 'refresh':
+            writer.run_id = None
+            try:
+                generate_crr_report.main(session, changed_paths=payload)
+            except BaseException:
+                traceback.print_exc()
+                session.close()
+            writer.flush()
+            continue
+        run_id = payload
+        writer.run_id = run_id
+        exit_code = 0
+        try:
+            generate_crr_report.main(session)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+            # The failure may have left a connection or the scan pool broken; start afresh next run.
+            session.close()
+        writer.flush()
+        events.put(('done', run_id, exit_code))
+    if watcher is not None:
+        watcher.stop()
+    session.close()
+
+
+def _max_mtime(paths):
+    """The latest modification time (ns) of the existing files among paths, or None."""
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            pass
+    return max(mtimes, default=None)
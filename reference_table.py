@@ -0,0 +1,304 @@
+# reference_table.py
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Separator between the line texts of one file in a Referenced_In_TXT entry.
+LINE_TEXT_SEPARATOR = '[NL]'
+
+
+class ReferenceTable:
+    """
+    The CRR references found in one source tree (.sas or .txt files), in compact long format.
+
+    Every hit -- an article referenced on a line of a file -- is one row of the parallel integer
+    columns article_ids, file_ids, lines, text_ids, section_ids and subsection_ids. Articles,
+    file paths and strings (line texts, section and subsection titles) are each stored once, in
+    the articles, files and strings lists, and referred to by their position; -1 means "none".
+    Rows are in scan order: by file (in walk order), then by line. The paragraph forms of the
+    references ('92(1)' for a hit on article '92') are kept in the sparse point_rows / point_ids
+    columns, pointing into the hit rows and the points list.
+
+    The delimited Referenced_In_SAS / Referenced_In_TXT strings are only built by to_frame(),
+    when the report is exported; consumers that need the structure use file_references().
+    """
+
+    def __init__(self, file_extension):
+        self.file_extension = file_extension
+        self.articles, self._article_ids = [], {}
+        self.files, self._file_ids = [], {}
+        self.strings, self._string_ids = [], {}
+        self.article_ids = array('i')
+        self.file_ids = array('i')
+        self.lines = array('i')
+        self.text_ids = array('i')
+        self.section_ids = array('i')
+        self.subsection_ids = array('i')
+        self.points, self._point_ids = [], {}
+        self.point_rows = array('i')
+        self.point_ids = array('i')
+
+    def __len__(self):
+        return len(self.lines)
+
+    @property
+    def column_name(self):
+        return f"Referenced_In_{self.file_extension.upper()[1:]}"
+
+    def add_file(self, file_path, hits):
+        """
+        Appends the hits of one file, given in line order as (article, line_num, line_text,
+        section, subsection, points) tuples; the strings are None when not recorded (.sas files)
+        and points is a sequence of paragraph forms.
+        """
+        if not hits:
+            return
+        file_id = self._file_ids.get(file_path)
+        if file_id is None:
+            file_id = self._file_ids[file_path] = len(self.files)
+            self.files.append(file_path)
+        for article, line_num, line_text, section, subsection, points in hits:
+            for point in points:
+                point_id = self._point_ids.get(point)
+                if point_id is None:
+                    point_id = self._point_ids[point] = len(self.points)
+                    self.points.append(point)
+                self.point_rows.append(len(self.lines))
+                self.point_ids.append(point_id)
+            article_id = self._article_ids.get(article)
+            if article_id is None:
+                article_id = self._article_ids[article] = len(self.articles)
+                self.articles.append(article)
+            self.article_ids.append(article_id)
+            self.file_ids.append(file_id)
+            self.lines.append(line_num)
+            self.text_ids.append(self._intern(line_text))
+            self.section_ids.append(self._intern(section))
+            self.subsection_ids.append(self._intern(subsection))
+
+    def updated(self, file_paths, changed_hits):
+        """
+        Returns a new table holding the files of file_paths, in that order: the hits of the files
+        in changed_hits ({file_path: hits}) are taken from there, those of the other files are
+        copied from this table. Used to apply a few re-scanned files without rebuilding the rest.
+        The result equals a table built from scratch from the same hits: articles, files, strings
+        and points no longer referenced (those of deleted files) are dropped and the ids are
+        renumbered in order of first use.
+        """
+        table = ReferenceTable(self.file_extension)
+        table.articles, table._article_ids = list(self.articles), dict(self._article_ids)
+        table.files, table._file_ids = list(self.files), dict(self._file_ids)
+        table.strings, table._string_ids = list(self.strings), dict(self._string_ids)
+        table.points, table._point_ids = list(self.points), dict(self._point_ids)
+        file_rows = self._file_rows()
+        point_rows = np.frombuffer(self.point_rows, dtype=np.int32)
+        for file_path in file_paths:
+            if file_path in changed_hits:
+                table.add_file(file_path, changed_hits[file_path])
+                continue
+            rows = file_rows.get(self._file_ids.get(file_path))
+            if rows is None:
+                continue
+            start, end = rows
+            first_point, last_point = np.searchsorted(point_rows, (start, end)).tolist()
+            offset = len(table.lines) - start
+            table.point_rows.extend(row + offset for row in self.point_rows[first_point:last_point])
+            table.point_ids.extend(self.point_ids[first_point:last_point])
+            for column in ('article_ids', 'file_ids', 'lines', 'text_ids', 'section_ids', 'subsection_ids'):
+                getattr(table, column).extend(getattr(self, column)[start:end])
+        table._compact()
+        return table
+
+    def _compact(self):
+        """Drops the interned values no row refers to and renumbers the ids in order of first use, as add_file assigns them."""
+        for values_name, ids_name, columns in (('articles', '_article_ids', ('article_ids',)),
+                                               ('files', '_file_ids', ('file_ids',)),
+                                               ('strings', '_string_ids', ('text_ids', 'section_ids', 'subsection_ids')),
+                                               ('points', '_point_ids', ('point_ids',))):
+            values = getattr(self, values_name)
+            ids = [np.frombuffer(getattr(self, column), dtype=np.int32) for column in columns]
+            # add_file interns the strings of a hit in column order: text, section, subsection.
+            uses = np.column_stack(ids).ravel() if ids[0].size else np.empty(0, dtype=np.int32)
+            uses = uses[uses >= 0]
+            unique, first_use = np.unique(uses, return_index=True)
+            used = unique[np.argsort(first_use, kind='stable')]
+            if len(used) == len(values) and np.array_equal(used, np.arange(len(values))):
+                continue
+            # One slot past the values, so that -1 ("none") maps to -1.
+            new_ids = np.full(len(values) + 1, -1, dtype=np.int32)
+            new_ids[used] = np.arange(len(used), dtype=np.int32)
+            new_values = [values[i] for i in used.tolist()]
+            setattr(self, values_name, new_values)
+            setattr(self, ids_name, {value: i for i, value in enumerate(new_values)})
+            for column, column_ids in zip(columns, ids):
+                renumbered = array('i')
+                renumbered.frombytes(new_ids[column_ids].tobytes())
+                setattr(self, column, renumbered)
+
+    def _file_rows(self):
+        """Returns {file_id: (first_row, end_row)}; the hits of a file are contiguous rows."""
+        file_ids = np.frombuffer(self.file_ids, dtype=np.int32)
+        if not len(file_ids):
+            return {}
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(file_ids)) + 1))
+        ends = np.concatenate((starts[1:], [len(file_ids)]))
+        return {file_id: (start, end) for file_id, start, end in zip(file_ids[starts].tolist(), starts.tolist(), ends.tolist())}
+
+    def _intern(self, value):
+        if value is None:
+            return -1
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+    def file_references(self):
+        """
+        Yields (article, file_path, lines, line_texts, section, subsection) for every article and
+        file, articles in order of first appearance and files in scan order. lines is sorted;
+        line_texts holds the text of each line ('' when not recorded); section and subsection are
+        those in effect at the file's last reference to the article.
+        """
+        if not len(self):
+            return
+        article_ids = np.frombuffer(self.article_ids, dtype=np.int32)
+        file_ids = np.frombuffer(self.file_ids, dtype=np.int32)
+        lines = np.frombuffer(self.lines, dtype=np.int32)
+        # Articles and files are ordered by their first row (scan order), not by id.
+        rows = np.arange(len(article_ids))
+        first_article_rows = np.full(len(self.articles), len(article_ids), dtype=np.int64)
+        np.minimum.at(first_article_rows, article_ids, rows)
+        first_file_rows = np.full(len(self.files), len(file_ids), dtype=np.int64)
+        np.minimum.at(first_file_rows, file_ids, rows)
+        order = np.lexsort((lines, first_file_rows[file_ids], first_article_rows[article_ids]))
+        sorted_articles, sorted_files = article_ids[order], file_ids[order]
+        boundaries = np.flatnonzero((np.diff(sorted_articles) != 0) | (np.diff(sorted_files) != 0)) + 1
+        starts = np.concatenate(([0], boundaries)).tolist()
+        ends = np.concatenate((boundaries, [len(order)])).tolist()
+        sorted_lines = lines[order].tolist()
+        sorted_texts = np.frombuffer(self.text_ids, dtype=np.int32)[order].tolist()
+        last_rows = order[np.asarray(ends) - 1].tolist()
+        # Index -1 ("none") picks the trailing '' of the lookup list.
+        strings = self.strings + ['']
+        for start, end, last in zip(starts, ends, last_rows):
+            yield (
+                self.articles[self.article_ids[last]],
+                self.files[self.file_ids[last]],
+                sorted_lines[start:end],
+                [strings[text_id] for text_id in sorted_texts[start:end]],
+                strings[self.section_ids[last]],
+                strings[self.subsection_ids[last]],
+            )
+
+    def structured(self):
+        """
+        Returns the references as {article: [entry, ...]} with one JSON-able entry per file:
+        {'file', 'lines'}, plus 'section', 'subsection' and 'texts' (one per line) for .txt files.
+        """
+        references = {}
+        for article, file_path, lines, line_texts, section, subsection in self.file_references():
+            entry = {'file': file_path, 'lines': lines}
+            if self.file_extension == ".txt":
+                entry.update(section=section, subsection=subsection, texts=line_texts)
+            references.setdefault(article, []).append(entry)
+        return references
+
+    def to_frame(self):
+        """
+        Formats the references into the report's (Article, Referenced_In_SAS / _TXT) DataFrame:
+            .sas: filepath|line1, line2
+            .txt: filepath|section|subsection|line1, line2|linetext1[NL]linetext2
+        with the entries of different files joined by '; '.
+        """
+        entries = {}
+        for article, file_path, lines, line_texts, section, subsection in self.file_references():
+            line_numbers = ', '.join(map(str, lines))
+            if self.file_extension == ".txt":
+                entry = f"{file_path}|{section}|{subsection}|{line_numbers}|{LINE_TEXT_SEPARATOR.join(line_texts)}"
+            else:
+                entry = f"{file_path}|{line_numbers}"
+            entries.setdefault(article, []).append(entry)
+        return pd.DataFrame(
+            [(article, '; '.join(parts)) for article, parts in entries.items()],
+            columns=['Article', self.column_name]
+        )
+
+
+def write_reference_tables(conn, tables):
+    """
+    Writes ReferenceTables into an open SQLite connection, in the same long format:
+        ref_files   (file_id, extension, path)
+        ref_strings (string_id, text)        line texts, section and subsection titles
+        ref_hits    (hit_id, article, file_id, line, text_id, section_id, subsection_id)
+        ref_points  (hit_id, point)          paragraph forms of the hits
+    Ids are renumbered so that the tables of several extensions share one id space; hits keep
+    their scan order (hit_id) and missing strings are NULL.
+    """
+    conn.executescript("""
+        CREATE TABLE ref_files (file_id INTEGER PRIMARY KEY, extension TEXT NOT NULL, path TEXT NOT NULL);
+        CREATE TABLE ref_strings (string_id INTEGER PRIMARY KEY, text TEXT NOT NULL);
+        CREATE TABLE ref_hits (
+            hit_id INTEGER PRIMARY KEY,
+            article TEXT NOT NULL,
+            file_id INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            text_id INTEGER,
+            section_id INTEGER,
+            subsection_id INTEGER
+        );
+        CREATE TABLE ref_points (hit_id INTEGER NOT NULL, point TEXT NOT NULL);
+    """)
+    file_offset = string_offset = hit_offset = 0
+    for table in tables:
+        conn.executemany("INSERT INTO ref_files VALUES (?, ?, ?)",
+                         ((file_offset + file_id, table.file_extension, path) for file_id, path in enumerate(table.files)))
+        conn.executemany("INSERT INTO ref_strings VALUES (?, ?)",
+                         ((string_offset + string_id, text) for string_id, text in enumerate(table.strings)))
+
+        def string_ref(string_id, offset=string_offset):
+            return offset + string_id if string_id >= 0 else None
+
+        conn.executemany(
+            "INSERT INTO ref_hits VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((hit_offset + row, table.articles[article_id], file_offset + file_id, line,
+              string_ref(text_id), string_ref(section_id), string_ref(subsection_id))
+             for row, (article_id, file_id, line, text_id, section_id, subsection_id) in enumerate(zip(
+                table.article_ids, table.file_ids, table.lines, table.text_ids, table.section_ids, table.subsection_ids)))
+        )
+        conn.executemany("INSERT INTO ref_points VALUES (?, ?)",
+                         ((hit_offset + row, table.points[point_id]) for row, point_id in zip(table.point_rows, table.point_ids)))
+        file_offset += len(table.files)
+        string_offset += len(table.strings)
+        hit_offset += len(table)
+    conn.execute("CREATE INDEX ref_hits_by_article ON ref_hits (article)")
+
+
+def read_reference_tables(conn):
+    """Reads the tables written by write_reference_tables back as {extension: ReferenceTable}."""
+    files = {file_id: (extension, path) for file_id, extension, path in conn.execute("SELECT * FROM ref_files")}
+    strings = dict(conn.execute("SELECT * FROM ref_strings"))
+    points = {}
+    for hit_id, point in conn.execute("SELECT hit_id, point FROM ref_points ORDER BY rowid"):
+        points.setdefault(hit_id, []).append(point)
+    tables = {}
+    current_file, hits = None, []
+    for hit_id, article, file_id, line, text_id, section_id, subsection_id in conn.execute("SELECT * FROM ref_hits ORDER BY hit_id"):
+        if file_id != current_file:
+            _add_file_hits(tables, files.get(current_file), hits)
+            current_file, hits = file_id, []
+        hits.append((article, line, strings.get(text_id), strings.get(section_id), strings.get(subsection_id),
+                     points.get(hit_id, ())))
+    _add_file_hits(tables, files.get(current_file), hits)
+    return tables
+
+
+def _add_file_hits(tables, file_entry, hits):
+    if file_entry is None or not hits:
+        return
+    extension, path = file_entry
+    table = tables.get(extension)
+    if table is None:
+        table = tables[extension] = ReferenceTable(extension)
+    table.add_file(path, hits)
@@ -0,0 +1,177 @@
+# report_delta.py
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+from report_store import HIERARCHY_COLUMNS
+
+# Delta keys of the file references of each source file extension.
+FILE_KINDS = {'.sas': 'sas', '.txt': 'txt'}
+
+
+def compute_report_delta(previous_db, new_db):
+    """
+    Compares two SQLite reports of generate_crr_report.write_report_db and returns what changed:
+
+        {'base', 'generated_at'}   the generation times of the previous and the new report
+        'compatible'               True when both have the same columns and the same article in
+                                   every row, so that 'rows' can be applied to the previous report
+        'hierarchy_changed'        True when a changed row moved in the Part / Title / Chapter /
+                                   Section hierarchy (the dropdown options must be reloaded)
+        'articles'                 one entry per article whose coverage changed:
+                                   {'article', 'row_id', 'sas': {'added', 'removed'},
+                                    'txt': {'added', 'removed'}, 'issues': {type: {'new', 'closed'}}}
+                                   listing referencing files and Jira issue keys ('closed' issues
+                                   left the query or no longer reference the article); row_id
+                                   is None for an article that is no longer in the report
+        'columns', 'rows'          the report columns and {row_id: values} of every changed row
+
+    Only report_articles, the article and value hash of every row, is read in full. Coverage
+    shows in the rows (their file and issue columns), so it is only compared, on the normalized
+    tables (ref_hits, ref_files, article_index, jira_issues), for the articles whose rows changed
+    hash, and only the rows that changed hash are loaded from both reports. Returns None when
+    there is no previous report, or it predates these tables.
+    """
+    if not os.path.exists(previous_db):
+        return None
+    with closing(sqlite3.connect(f"file:{previous_db}?mode=ro", uri=True)) as conn:
+        if not _has_coverage_tables(conn):
+            return None
+    with closing(sqlite3.connect(f"file:{new_db}?mode=ro", uri=True)) as conn:
+        conn.execute("ATTACH DATABASE ? AS prev", (f"file:{previous_db}?mode=ro",))
+        previous, current = _read_row_hashes(conn, 'prev'), _read_row_hashes(conn, 'main')
+        changed_articles = sorted(_changed_articles(previous, current))
+        previous_coverage = _read_coverage(conn, 'prev', changed_articles, set(previous['articles']))
+        current_coverage = _read_coverage(conn, 'main', changed_articles, set(current['articles']))
+
+        compatible = previous['columns'] == current['columns'] and previous['articles'] == current['articles']
+        articles = []
+        for row_id, article in enumerate(current['articles']):
+            if article in previous_coverage or article in current_coverage:
+                entry = _coverage_change(article, previous_coverage.get(article, {}), current_coverage.get(article, {}))
+                if entry:
+                    articles.append(dict(entry, row_id=row_id))
+        removed_articles = set(previous['articles']) - set(current['articles'])
+        for article in sorted(removed_articles & set(previous_coverage)):
+            articles.append(dict(_coverage_change(article, previous_coverage[article], {}), row_id=None))
+
+        rows, hierarchy_changed = {}, False
+        if compatible:
+            changed_row_ids = [row_id for row_id, (old_hash, new_hash) in enumerate(zip(previous['hashes'], current['hashes']))
+                               if old_hash != new_hash]
+            old_rows, new_rows = _read_rows(conn, 'prev', changed_row_ids), _read_rows(conn, 'main', changed_row_ids)
+            hierarchy_positions = [i for i, column in enumerate(current['columns']) if column in HIERARCHY_COLUMNS]
+            for row_id in changed_row_ids:
+                old_values, new_values = old_rows[row_id], new_rows[row_id]
+                if old_values != new_values:
+                    rows[row_id] = list(new_values)
+                    hierarchy_changed = hierarchy_changed or any(old_values[i] != new_values[i] for i in hierarchy_positions)
+    return {
+        'base': previous['generated_at'],
+        'generated_at': current['generated_at'],
+        'compatible': compatible,
+        'hierarchy_changed': hierarchy_changed,
+        'articles': articles,
+        'columns': current['columns'],
+        'rows': rows,
+    }
+
+
+def write_report_delta(delta, delta_path):
+    """Writes a delta as JSON next to the report (through a temporary file), or removes a stale one when delta is None."""
+    if delta is None:
+        if os.path.exists(delta_path):
+            os.remove(delta_path)
+        return
+    with open(delta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(delta, f, separators=(',', ':'))
+    os.replace(delta_path + '.tmp', delta_path)
+
+
+def load_report_delta(delta_path):
+    """Returns the delta written by write_report_delta, or None when there is none."""
+    try:
+        with open(delta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _has_coverage_tables(conn):
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {'ref_hits', 'ref_files', 'article_index', 'jira_issues', 'report_articles'} <= tables:
+        return False
+    return 'row_hash' in {name for _, name, *_ in conn.execute("PRAGMA table_info(report_articles)")}
+
+
+def _read_row_hashes(conn, schema):
+    """Reads the generation time, columns and the article and hash of every row of a report."""
+    meta = dict(conn.execute(f"SELECT key, value FROM {schema}.meta"))
+    articles, hashes = [], []
+    for article, row_hash in conn.execute(f"SELECT article, row_hash FROM {schema}.report_articles ORDER BY row_id"):
+        articles.append(article)
+        hashes.append(row_hash)
+    return {
+        'generated_at': meta.get('generated_at'),
+        'columns': json.loads(meta['columns']),
+        'articles': articles,
+        'hashes': hashes,
+    }
+
+
+def _changed_articles(previous, current):
+    """The articles whose rows were added, removed or changed hash between two reports."""
+    row_hashes = [{}, {}]
+    for hashes_by_article, report in zip(row_hashes, (previous, current)):
+        for article, row_hash in zip(report['articles'], report['hashes']):
+            hashes_by_article.setdefault(article, []).append(row_hash)
+    previous_hashes, current_hashes = row_hashes
+    return {article for article in previous_hashes.keys() | current_hashes.keys()
+            if previous_hashes.get(article) != current_hashes.get(article)}
+
+
+def _read_rows(conn, schema, row_ids):
+    """Returns {row_id: values} of the given report rows."""
+    return {row[0]: row[1:] for row in conn.execute(
+        f"SELECT * FROM {schema}.report WHERE row_id IN (SELECT value FROM json_each(?))", (json.dumps(row_ids),))}
+
+
+def _read_coverage(conn, schema, articles, report_articles):
+    """Reads the coverage {article: {kind: set}} of the given articles, where they are report articles."""
+    articles_json = json.dumps(articles)
+    coverage = {}
+    for article, extension, path in conn.execute(f"""
+        SELECT DISTINCT h.article, f.extension, f.path
+        FROM {schema}.ref_hits h JOIN {schema}.ref_files f ON f.file_id = h.file_id
+        WHERE h.article IN (SELECT value FROM json_each(?))
+    """, (articles_json,)):
+        kind = FILE_KINDS.get(extension)
+        if kind and article in report_articles:
+            coverage.setdefault(article, {}).setdefault(kind, set()).add(path)
+    for article, issue_type, issue_key in conn.execute(f"""
+        SELECT DISTINCT a.article, i.issue_type, i.issue_key
+        FROM {schema}.article_index a JOIN {schema}.jira_issues i ON i.issue_id = a.issue_id
+        WHERE a.article COLLATE BINARY IN (SELECT value FROM json_each(?))
+    """, (articles_json,)):
+        if article in report_articles:
+            coverage.setdefault(article, {}).setdefault(issue_type, set()).add(issue_key)
+    return coverage
+
+
+def _coverage_change(article, previous, current):
+    """Returns the delta entry of one article, or None when its coverage is unchanged."""
+    if previous == current:
+        return None
+    entry = {'article': article}
+    for kind in FILE_KINDS.values():
+        old, new = previous.get(kind, set()), current.get(kind, set())
+        entry[kind] = {'added': sorted(new - old), 'removed': sorted(old - new)}
+    issue_types = sorted((set(previous) | set(current)) - set(FILE_KINDS.values()))
+    entry['issues'] = {
+        issue_type: {'new': sorted(current.get(issue_type, set()) - previous.get(issue_type, set())),
+                     'closed': sorted(previous.get(issue_type, set()) - current.get(issue_type, set()))}
+        for issue_type in issue_types
+        if current.get(issue_type, set()) != previous.get(issue_type, set())
+    }
+    return entry
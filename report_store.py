@@ -0,0 +1,279 @@
+# report_store.py
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+import pandas as pd
+
+from reference_table import read_reference_tables
+
+# Columns of the hierarchy filters, outermost first.
+HIERARCHY_COLUMNS = ['Part Name', 'Title Name', 'Chapter Name', 'Section Name']
+# Text filters: query parameter -> report columns whose (lower-cased) text it is matched against.
+TEXT_FILTER_COLUMNS = {
+    'article': ['Article'],
+    'sas': ['Referenced_In_SAS'],
+    'issue': ['Referenced_In_Defects', 'Referenced_In_Reqts'],
+}
+# Length of the n-grams in the text indexes; shorter search terms are answered by a scan.
+NGRAM_LENGTH = 3
+# Report column of the file references of each source file extension.
+REFERENCE_COLUMNS = {'.sas': 'Referenced_In_SAS', '.txt': 'Referenced_In_TXT'}
+
+
+def has_references(value):
+    """True unless a Referenced_In_* cell holds a 'Not found' / 'Out of Scope' note (as the viewer has always treated it)."""
+    value = value.lower()
+    return not value.startswith('not found') and not value.startswith('out of scope')
+
+
+class ReportIndex:
+    """
+    The combined report held in memory with indexes for the viewer's queries.
+
+    Rows keep the report's order and are addressed by position. The hierarchy columns have
+    value -> row set indexes, the defect / requirement flags are precomputed, and the article,
+    SAS and issue text filters have trigram indexes, so a query only verifies the rows that can
+    possibly match. references optionally holds the structured file references of the rows, as
+    {row_id: {column: [entry, ...]}} (see ReferenceTable.structured). generated_at identifies
+    the pipeline run of a SQLite report (None for a workbook).
+    """
+
+    def __init__(self, df, references=None, generated_at=None):
+        self.references = references or {}
+        self.generated_at = generated_at
+        df = df.fillna('').astype(str)
+        self.columns = list(df.columns)
+        self.rows = df.to_dict('records')
+        self.row_count = len(self.rows)
+
+        self.hierarchy = {column: {} for column in HIERARCHY_COLUMNS if column in df.columns}
+        for column, index in self.hierarchy.items():
+            for row_id, value in enumerate(df[column]):
+                index.setdefault(value, set()).add(row_id)
+
+        self.flags = {
+            'defects': {row_id for row_id, row in enumerate(self.rows) if has_references(row.get('Referenced_In_Defects', ''))},
+            'requirements': {row_id for row_id, row in enumerate(self.rows) if has_references(row.get('Referenced_In_Reqts', ''))},
+        }
+
+        # Lower-cased search texts per filter; several columns are joined with a separator that
+        # cannot occur in a search term taken from a single input box.
+        self.search_texts = {
+            name: ['\n'.join(row.get(column, '') for column in columns).lower() for row in self.rows]
+            for name, columns in TEXT_FILTER_COLUMNS.items()
+        }
+        self.ngram_index = {name: _build_ngram_index(texts) for name, texts in self.search_texts.items()}
+        # The free-text search over all columns is answered by scanning the rows left by the other
+        # filters: indexing the full article contents would cost far more than the scan saves.
+        self.search_texts['q'] = ['\n'.join(row.values()).lower() for row in self.rows]
+
+    @classmethod
+    def from_sqlite(cls, db_path):
+        """Builds the index from the pipeline's SQLite report (see generate_crr_report.write_report_db)."""
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            rows = conn.execute("SELECT * FROM report ORDER BY row_id").fetchall()
+            references = _read_row_references(conn)
+        finally:
+            conn.close()
+        return cls(pd.DataFrame([row[1:] for row in rows], columns=json.loads(meta['columns']), dtype=object),
+                   references, meta.get('generated_at'))
+
+    @classmethod
+    def from_excel(cls, source):
+        """Builds the index from the combined report workbook (a path or a file-like object)."""
+        return cls(pd.read_excel(source, dtype=str, engine='openpyxl'))
+
+    def matching_rows(self, filters):
+        """
+        Returns the sorted row ids matching all filters. Supported filter keys are the hierarchy
+        columns' 'part', 'title', 'chapter' and 'section' (exact match), the TEXT_FILTER_COLUMNS
+        keys and 'q' (case-insensitive substring match), and 'only' ('defects' or 'requirements').
+        """
+        candidates = None
+        for key, column in zip(('part', 'title', 'chapter', 'section'), HIERARCHY_COLUMNS):
+            if filters.get(key):
+                candidates = _intersect(candidates, self.hierarchy.get(column, {}).get(filters[key], set()))
+        if filters.get('only') in self.flags:
+            candidates = _intersect(candidates, self.flags[filters['only']])
+
+        for name in self.search_texts:
+            term = (filters.get(name) or '').lower()
+            if not term:
+                continue
+            if len(term) >= NGRAM_LENGTH and name in self.ngram_index:
+                index = self.ngram_index[name]
+                for gram in {term[i:i + NGRAM_LENGTH] for i in range(len(term) - NGRAM_LENGTH + 1)}:
+                    candidates = _intersect(candidates, index.get(gram, set()))
+                    if not candidates:
+                        return []
+            texts = self.search_texts[name]
+            row_ids = range(self.row_count) if candidates is None else candidates
+            candidates = {row_id for row_id in row_ids if term in texts[row_id]}
+
+        return list(range(self.row_count)) if candidates is None else sorted(candidates)
+
+    def query(self, filters, offset=0, limit=50, columns=None, structured=False):
+        """
+        Returns one page of matching rows as {'total', 'offset', 'columns', 'rows', 'row_ids'}, with
+        each row given as a list of values in 'columns' order and row_ids holding the rows' positions
+        in the report. A limit of 0 returns every matching row.
+        With structured, the file reference columns hold lists of reference entries instead of
+        the delimited strings wherever the report has them in structured form.
+        """
+        row_ids = self.matching_rows(filters)
+        columns = [column for column in columns if column in self.columns] if columns else self.columns
+        page = row_ids[offset:offset + limit] if limit else row_ids[offset:]
+        return {
+            'total': len(row_ids),
+            'offset': offset,
+            'columns': columns,
+            'rows': [[self.value(row_id, column, structured) for column in columns] for row_id in page],
+            'row_ids': page,
+        }
+
+    def value(self, row_id, column, structured=False):
+        """Returns a cell of the report; with structured, the reference entries when the cell has them."""
+        if structured:
+            entries = self.references.get(row_id, {}).get(column)
+            if entries is not None:
+                return entries
+        return self.rows[row_id][column]
+
+    def facets(self, part='', title='', chapter=''):
+        """Returns the options of the hierarchy dropdowns below the given selection."""
+        levels = list(zip(('part', 'title', 'chapter'), (part, title, chapter)))
+        facets = {}
+        rows = None
+        for depth, column in enumerate(HIERARCHY_COLUMNS):
+            if column not in self.hierarchy:
+                break
+            index = self.hierarchy[column]
+            values = index.keys() if rows is None else {self.rows[row_id][column] for row_id in rows}
+            facets[column] = sorted(value for value in values if value)
+            if depth == len(levels) or not levels[depth][1]:
+                break
+            rows = _intersect(rows, index.get(levels[depth][1], set()))
+        return facets
+
+    def summary(self, filters, top_files=5):
+        """Returns the dashboard figures (support status, top SAS files, issue coverage) for the matching rows."""
+        row_ids = self.matching_rows(filters)
+        out_of_scope_column = next((column for column in self.columns if column.strip().lower() == 'out of scope'), None)
+        support = Counter()
+        sas_files = Counter()
+        with_issues = 0
+        for row_id in row_ids:
+            row = self.rows[row_id]
+            sas, txt = row.get('Referenced_In_SAS', '').lower(), row.get('Referenced_In_TXT', '').lower()
+            if ((out_of_scope_column and row[out_of_scope_column].lower() == 'out of scope')
+                    or sas == 'out of scope' or txt == 'out of scope'):
+                support['out_of_scope'] += 1
+            elif not sas.startswith('not found') or not txt.startswith('not found'):
+                support['supported'] += 1
+            else:
+                support['not_supported'] += 1
+
+            if not sas.startswith('not found') and sas != 'out of scope':
+                for file_path in self._sas_file_paths(row_id):
+                    file_name = file_path[max(file_path.rfind('\\'), file_path.rfind('/')) + 1:]
+                    if file_name.lower().endswith('.sas'):
+                        sas_files[file_name] += 1
+
+            if row_id in self.flags['defects'] or row_id in self.flags['requirements']:
+                with_issues += 1
+
+        return {
+            'total': len(row_ids),
+            'support': {key: support[key] for key in ('supported', 'not_supported', 'out_of_scope')},
+            'top_sas_files': sas_files.most_common(top_files),
+            'issue_coverage': {'with_issues': with_issues, 'without_issues': len(row_ids) - with_issues},
+        }
+
+    def _sas_file_paths(self, row_id):
+        entries = self.references.get(row_id, {}).get('Referenced_In_SAS')
+        if entries is not None:
+            return [entry['file'] for entry in entries]
+        parts = (entry.split('|') for entry in self.rows[row_id].get('Referenced_In_SAS', '').split('; '))
+        return [entry_parts[0] for entry_parts in parts if len(entry_parts) == 2]
+
+
+class ReportStore:
+    """
+    Holds the ReportIndex of the current report. The first of report_paths that exists (the
+    pipeline's SQLite report, then its Excel export) is (re)loaded whenever it changes on disk;
+    an uploaded workbook replaces it until then. version identifies the loaded report (its file
+    state, or the hash of an upload), e.g. for the ETags of responses derived from it.
+    """
+
+    def __init__(self, report_paths):
+        self.report_paths = list(report_paths)
+        self.source = None
+        self.version = None
+        self._index = None
+        self._file_state = None
+        self._lock = threading.Lock()
+
+    def index(self):
+        """Returns the current ReportIndex, or None when no report is available."""
+        return self.current()[0]
+
+    def current(self):
+        """Returns (index, version) of the current report, or (None, None) when no report is available."""
+        with self._lock:
+            for path in self.report_paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                file_state = (path, stat.st_size, stat.st_mtime_ns)
+                if file_state != self._file_state:
+                    self._index = ReportIndex.from_sqlite(path) if path.endswith('.sqlite') else ReportIndex.from_excel(path)
+                    self._file_state = file_state
+                    self.source = os.path.basename(path)
+                    self.version = f"{self.source}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+                break
+            return self._index, self.version
+
+    def load_upload(self, stream, filename):
+        """Replaces the current report with an uploaded workbook."""
+        data = stream.read()
+        index = ReportIndex.from_excel(io.BytesIO(data))
+        with self._lock:
+            self._index = index
+            self.source = filename
+            self.version = f"upload-{hashlib.sha1(data).hexdigest()[:16]}"
+        return index
+
+
+def _read_row_references(conn):
+    """Returns {row_id: {column: entries}} from the structured references of a SQLite report, if it has them."""
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {'ref_hits', 'report_articles'} <= tables:
+        return {}
+    by_column = {REFERENCE_COLUMNS[extension]: table.structured()
+                 for extension, table in read_reference_tables(conn).items() if extension in REFERENCE_COLUMNS}
+    references = {}
+    for row_id, article in conn.execute("SELECT row_id, article FROM report_articles"):
+        row_references = {column: entries[article] for column, entries in by_column.items() if article in entries}
+        if row_references:
+            references[row_id] = row_references
+    return references
+
+
+def _intersect(candidates, row_ids):
+    return set(row_ids) if candidates is None else candidates & row_ids
+
+
+def _build_ngram_index(texts):
+    index = {}
+    for row_id, text in enumerate(texts):
+        for gram in {text[i:i + NGRAM_LENGTH] for i in range(len(text) - NGRAM_LENGTH + 1)}:
+            index.setdefault(gram, set()).add(row_id)
+    return index
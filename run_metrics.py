@@ -0,0 +1,159 @@
+# run_metrics.py
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; the peak RSS of the stages is then not recorded.
+    resource = None
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is unbounded.
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RunMetrics:
+    """
+    Instrumentation of one pipeline run, written as a JSON run record when the run ends.
+
+    Stages are timed with stage(name), and the peak RSS of the process at the end of each stage
+    (a high-water mark: it only grows when a stage exceeds the stages before it) is recorded where
+    the platform reports it; with trace_memory, the peak of Python allocations (tracemalloc)
+    during each stage is recorded as well. Counters (files, bytes, lines, matches,
+    requests) and histograms (request latencies) can be updated from any thread; rows records the
+    row count of a table at a point of the run.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.run_id = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:6]}"
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = None
+        self.status = None
+        self.error = None
+        self.stages = []
+        self.counters = {}
+        self.histograms = {}
+        self.rows = {}
+        self.profile = None
+        self.trace_memory = trace_memory
+        self._started_tracing = False
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block (and its peak traced memory) as the stage `name`."""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {'name': name, 'seconds': round(time.perf_counter() - start, 4)}
+            if self.trace_memory:
+                entry['peak_memory_mb'] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            if resource is not None:
+                entry['max_rss_mb'] = _max_rss_mb()
+            self.stages.append(entry)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, value):
+        """Adds a value (in seconds) to the latency histogram `name`."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = {
+                    'buckets': list(LATENCY_BUCKETS) + ['inf'], 'counts': [0] * (len(LATENCY_BUCKETS) + 1),
+                    'count': 0, 'sum': 0.0, 'max': 0.0,
+                }
+            bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if value <= bound), len(LATENCY_BUCKETS))
+            histogram['counts'][bucket] += 1
+            histogram['count'] += 1
+            histogram['sum'] += value
+            histogram['max'] = max(histogram['max'], value)
+
+    def record_rows(self, name, count):
+        self.rows[name] = int(count)
+
+    def finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished_at = datetime.now(timezone.utc)
+        self.duration = time.perf_counter() - self._start
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_dict(self):
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_seconds': round(self.duration, 4) if self.finished_at else None,
+            'status': self.status,
+            'error': self.error,
+            'stages': self.stages,
+            'counters': dict(sorted(self.counters.items())),
+            'histograms': {name: dict(histogram, sum=round(histogram['sum'], 4), max=round(histogram['max'], 4))
+                           for name, histogram in self.histograms.items()},
+            'rows': self.rows,
+            'profile': self.profile,
+        }
+
+    def write(self, directory, keep=50):
+        """Writes the run record to <directory>/<run_id>.json and removes all but the newest `keep` records."""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{self.run_id}.json")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(path + '.tmp', path)
+        for old_record in _record_files(directory)[keep:]:
+            os.remove(os.path.join(directory, old_record))
+        return path
+
+
+def load_run_records(directory, limit=20):
+    """Returns the newest `limit` run records in directory, newest first."""
+    records = []
+    for file_name in _record_files(directory)[:limit]:
+        record = load_run_record(directory, file_name[:-len('.json')])
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def load_run_record(directory, run_id):
+    """Returns one run record, or None when it does not exist or cannot be read."""
+    if os.path.basename(run_id) != run_id:
+        return None
+    try:
+        with open(os.path.join(directory, f"{run_id}.json"), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _max_rss_mb():
+    """Peak resident set size of this process so far, in MB (ru_maxrss is in bytes on macOS, KB elsewhere)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1e6 if sys.platform == 'darwin' else peak * 1024 / 1e6, 1)
+
+
+def _record_files(directory):
+    """Run record file names, newest first (run ids start with their UTC start time)."""
+    try:
+        return sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+    except OSError:
+        return []
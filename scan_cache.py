@@ -0,0 +1,99 @@
+# scan_cache.py
+import os
+import pickle
+import sqlite3
+from collections import namedtuple
+
+# A cached file entry. 'results' is the pickled per-file extraction, the hits in line order:
+# [(article, line_num, line_text, section, subsection, points), ...]
+CachedFile = namedtuple('CachedFile', ['size', 'mtime_ns', 'sha1', 'results'])
+
+
+class ScanCache:
+    """
+    On-disk cache of per-file CRR extraction results, stored in a local SQLite file.
+
+    Entries are keyed by file path and validated against the file's size, mtime and SHA-1
+    content hash, so unchanged files are never re-read and touched-but-identical files are
+    never re-scanned. The whole cache is discarded when the extraction signature changes
+    (for example when PATTERNS are edited).
+    """
+
+    def __init__(self, db_path, signature):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                root TEXT NOT NULL,
+                extension TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha1 TEXT NOT NULL,
+                results BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS files_by_root ON files (root, extension);
+        """)
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        if row is None or row[0] != signature:
+            with self.conn:
+                self.conn.execute("DELETE FROM files")
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)", (signature,))
+
+    def load(self, root, extension):
+        """Returns {path: CachedFile} for every cached file of the given tree and extension."""
+        rows = self.conn.execute(
+            "SELECT path, size, mtime_ns, sha1, results FROM files WHERE root = ? AND extension = ?",
+            (root, extension)
+        )
+        return {path: CachedFile(size, mtime_ns, sha1, results) for path, size, mtime_ns, sha1, results in rows}
+
+    def get(self, paths):
+        """Returns {path: CachedFile} for the cached files among paths."""
+        found = {}
+        for path in paths:
+            row = self.conn.execute("SELECT size, mtime_ns, sha1, results FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                found[path] = CachedFile(*row)
+        return found
+
+    def store(self, root, extension, entries):
+        """Inserts or replaces entries given as (path, size, mtime_ns, sha1, results) tuples."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, root, extension, size, mtime_ns, sha1, results) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(path, root, extension, size, mtime_ns, sha1, pickle.dumps(results, pickle.HIGHEST_PROTOCOL))
+                 for path, size, mtime_ns, sha1, results in entries]
+            )
+
+    def touch(self, entries):
+        """Refreshes size and mtime for files whose content hash did not change. Entries are (path, size, mtime_ns)."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                [(size, mtime_ns, path) for path, size, mtime_ns in entries]
+            )
+
+    def evict(self, paths):
+        """Removes cached entries for files that no longer exist."""
+        with self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in paths])
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def decode(cached_file):
+        """Returns the per-file extraction results stored in a CachedFile."""
+        return pickle.loads(cached_file.results)
+
+    @staticmethod
+    def file_state(file_path):
+        """Returns (size, mtime_ns) for a file, as compared against the cache."""
+        stat = os.stat(file_path)
+        return stat.st_size, stat.st_mtime_ns
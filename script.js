@@ -15,9 +15,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const sasFileFilter = document.getElementById('sas-file-filter');
     const articleNoFilter = document.getElementById('article-no-filter');
     const issueIdFilter = document.getElementById('issue-id-filter');
+    const textSearchFilter = document.getElementById('text-search-filter');
     const allFilters = [
         partNameFilter, titleNameFilter, chapterNameFilter,
-        sectionNameFilter, sasFileFilter, articleNoFilter, issueIdFilter
+        sectionNameFilter, sasFileFilter, articleNoFilter, issueIdFilter, textSearchFilter
     ];
 
     // Buttons
@@ -30,6 +31,9 @@ document.addEventListener('DOMContentLoaded', () => {
     const columnToggleDropdown = document.getElementById('column-toggle-dropdown');
     const filterDefectsBtn = document.getElementById('filter-defects-btn');
     const filterReqtsBtn = document.getElementById('filter-reqts-btn');
+    const prevPageBtn = document.getElementById('prev-page-btn');
+    const nextPageBtn = document.getElementById('next-page-btn');
+    const pageInfo = document.getElementById('page-info');
 
     // Dashboard / Modal
     const dashboardModal = document.getElementById('dashboard-modal');
@@ -40,7 +44,19 @@ document.addEventListener('DOMContentLoaded', () => {
 
     const dashboardContainer = document.getElementById('dashboard-container');
 
-    let fullData = [];
+    // --- Server ---
+    // The report lives on the server; the table only ever fetches the page it displays.
+    const SERVER_URL = 'http://127.0.0.1:5000';
+    const REPORT_PAGE_SIZE = 50;
+    const TEXT_FILTER_DELAY_MS = 250;
+
+    let currentPage = 0;
+    let totalRows = 0;
+    let onlyFilter = ''; // '', 'defects' or 'requirements'
+    let pageRequestId = 0;
+    let reportVersion = null; // generated_at of the loaded report, the base of /report/delta
+    let displayedRowIds = []; // report row ids of the table rows, in display order
+    let textFilterTimer = null;
     let supportChart, topFilesChart, issueCoverageChart;
 
     // --- Column Configuration ---
@@ -70,10 +86,17 @@ document.addEventListener('DOMContentLoaded', () => {
     partNameFilter.addEventListener('change', handlePartChange);
     titleNameFilter.addEventListener('change', handleTitleChange);
     chapterNameFilter.addEventListener('change', handleChapterChange);
-    [articleNoFilter, sasFileFilter, issueIdFilter].forEach(input => {
-        input.addEventListener('input', applyFiltersAndDisplay);
+    [articleNoFilter, sasFileFilter, issueIdFilter, textSearchFilter].forEach(input => {
+        input.addEventListener('input', () => {
+            clearTimeout(textFilterTimer);
+            textFilterTimer = setTimeout(applyFiltersAndDisplay, TEXT_FILTER_DELAY_MS);
+        });
     });
 
+    // Pagination
+    prevPageBtn.addEventListener('click', () => showPage(currentPage - 1));
+    nextPageBtn.addEventListener('click', () => showPage(currentPage + 1));
+
     // Column Toggle Dropdown
     columnToggleBtn.addEventListener('click', (e) => {
         e.stopPropagation();
@@ -99,23 +122,26 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     // --- Pipeline Refresh Logic ---
+    const JOB_POLL_INTERVAL_MS = 2000;
+
     async function handleRefreshData() {
         refreshBtn.disabled = true;
         refreshStatus.textContent = 'Processing... The data pipeline is running. This may take a few minutes.';
         refreshStatus.className = 'status-message loading';
         try {
-            const response = await fetch('http://127.0.0.1:5000/run-pipeline', {
+            const response = await fetch(`${SERVER_URL}/run-pipeline`, {
                 method: 'POST',
             });
             const result = await response.json();
-            if (response.ok) {
-                refreshStatus.textContent = 'Success! The pipeline has completed. You can now upload the new "CRR_Full_Combined_Report.xlsx" file.';
-                refreshStatus.className = 'status-message success';
-            } else {
-                refreshStatus.textContent = `Error: ${result.message || 'An unknown error occurred.'}`;
-                refreshStatus.className = 'status-message error';
-                console.error('Pipeline Error:', result.error_details);
+            if (!response.ok) {
+                showPipelineError(result);
+                return;
+            }
+            if (result.coalesced) {
+                refreshStatus.textContent = 'The data pipeline is already running; following its progress...';
             }
+            const job = await followPipelineJob(result.job_id);
+            await showPipelineResult(job.job_id);
         } catch (error) {
             refreshStatus.textContent = 'Failed to connect to the local server. Is it running? (Run "python server.py")';
             refreshStatus.className = 'status-message error';
@@ -125,106 +151,245 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    // --- File Handling ---
-    function handleFileUpload(event) {
-        const file = event.target.files[0];
-        if (!file) return;
-        const reader = new FileReader();
-        reader.onload = (e) => {
-            try {
-                const data = new Uint8Array(e.target.result);
-                const workbook = XLSX.read(data, { type: 'array' });
-                const firstSheetName = workbook.SheetNames[0];
-                const worksheet = workbook.Sheets[firstSheetName];
-                fullData = XLSX.utils.sheet_to_json(worksheet);
-                resetUI(true);
-                populateBaseFilters();
-                applyFiltersAndDisplay();
-            } catch (error) {
-                console.error("Error processing Excel file:", error);
-                alert("There was an error processing your Excel file.");
+    // Resolves with the final job state. Streams the log over server-sent events, and falls
+    // back to polling the status endpoint if the stream is unavailable.
+    function followPipelineJob(jobId) {
+        if (!window.EventSource) return pollPipelineJob(jobId, 0);
+        return new Promise((resolve, reject) => {
+            const events = new EventSource(`${SERVER_URL}/jobs/${jobId}/events`);
+            let lineCount = 0;
+            events.addEventListener('log', (e) => {
+                lineCount = Number(e.lastEventId) || lineCount + 1;
+                showPipelineProgress(e.data);
+            });
+            events.addEventListener('status', (e) => {
+                events.close();
+                resolve(JSON.parse(e.data));
+            });
+            events.onerror = () => {
+                // EventSource reconnects on its own while the stream is open; once it gives up, poll instead.
+                if (events.readyState === EventSource.CLOSED) {
+                    pollPipelineJob(jobId, lineCount).then(resolve, reject);
+                }
+            };
+        });
+    }
+
+    async function pollPipelineJob(jobId, since) {
+        while (true) {
+            const response = await fetch(`${SERVER_URL}/jobs/${jobId}?since=${since}`);
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.message);
+            if (job.lines.length) showPipelineProgress(job.lines[job.lines.length - 1]);
+            since = job.line_count;
+            if (job.status !== 'running') return job;
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        }
+    }
+
+    function showPipelineProgress(line) {
+        if (!line.trim()) return;
+        refreshStatus.textContent = `Processing... ${line}`;
+    }
+
+    async function showPipelineResult(jobId) {
+        const response = await fetch(`${SERVER_URL}/jobs/${jobId}/result`);
+        const result = await response.json();
+        if (response.ok) {
+            const delta = await applyReportDelta();
+            refreshStatus.textContent = delta
+                ? `Success! The pipeline has completed. ${describeReportDelta(delta)}`
+                : 'Success! The pipeline has completed and the new report has been loaded.';
+            refreshStatus.className = 'status-message success';
+        } else {
+            showPipelineError(result);
+        }
+    }
+
+    function showPipelineError(result) {
+        refreshStatus.textContent = `Error: ${result.message || 'An unknown error occurred.'}`;
+        refreshStatus.className = 'status-message error';
+        console.error('Pipeline Error:', result.error_details, result.output);
+    }
+
+    // --- Report Loading ---
+    async function loadReport() {
+        try {
+            const response = await fetch(`${SERVER_URL}/report/facets`);
+            if (!response.ok) {
                 resetUI(false);
+                return;
             }
-        };
-        reader.readAsArrayBuffer(file);
+            const report = await response.json();
+            reportVersion = report.generated_at || null;
+            resetUI(true);
+            updateDropdown(partNameFilter, report.facets['Part Name'] || [], 'Part Name');
+            applyFiltersAndDisplay();
+        } catch (error) {
+            console.error('Network Error:', error);
+            resetUI(false);
+        }
+    }
+
+    // Applies the changes of the latest pipeline run to the loaded report: only the changed rows
+    // on the current page are re-rendered. Falls back to loadReport() when the server has no delta
+    // for the loaded report, and re-queries the current page when filters may select other rows.
+    // Resolves with the delta, or null when the report was reloaded as a whole.
+    async function applyReportDelta() {
+        try {
+            if (!reportVersion) throw new Error('No report version to apply a delta to.');
+            const response = await fetch(`${SERVER_URL}/report/delta?since=${encodeURIComponent(reportVersion)}`);
+            const delta = await response.json();
+            if (!response.ok || delta.full_reload || delta.hierarchy_changed) throw new Error('The delta does not apply.');
+            reportVersion = delta.generated_at;
+            const changedRowIds = Object.keys(delta.rows).map(Number);
+            if (changedRowIds.length > 0) {
+                const filtered = onlyFilter || Object.values(getFilters()).some(value => value);
+                if (filtered) {
+                    await showPage(currentPage);
+                } else {
+                    patchDisplayedRows(delta);
+                }
+            }
+            return delta;
+        } catch (error) {
+            await loadReport();
+            return null;
+        }
+    }
+
+    function patchDisplayedRows(delta) {
+        const visibleColumns = columnConfig.filter(c => c.visible);
+        displayedRowIds.forEach((rowId, position) => {
+            const values = delta.rows[rowId];
+            if (!values) return;
+            const rowData = Object.fromEntries(delta.columns.map((column, i) => [column, values[i]]));
+            const row = tableBody.rows[position];
+            row.innerHTML = '';
+            renderTableRow(row, visibleColumns, rowData);
+            row.classList.add('row-changed');
+        });
+    }
+
+    function describeReportDelta(delta) {
+        if (delta.articles.length === 0) return 'No article changed coverage since the previous run.';
+        const names = delta.articles.slice(0, 5).map(entry => entry.article).join(', ');
+        const more = delta.articles.length > 5 ? ', ...' : '';
+        return `${delta.articles.length} article(s) changed coverage since the previous run (${names}${more}).`;
+    }
+
+    async function handleFileUpload(event) {
+        const file = event.target.files[0];
+        if (!file) return;
+        const formData = new FormData();
+        formData.append('file', file);
+        try {
+            const response = await fetch(`${SERVER_URL}/report/upload`, { method: 'POST', body: formData });
+            const result = await response.json();
+            if (!response.ok) throw new Error(result.error_details || result.message);
+            await loadReport();
+        } catch (error) {
+            console.error("Error processing Excel file:", error);
+            alert("There was an error processing your Excel file.");
+        } finally {
+            fileUpload.value = '';
+        }
     }
 
     // --- Filter Logic ---
-    function applyFiltersAndDisplay() {
-        const filters = {
+    function getFilters() {
+        return {
             part: partNameFilter.value,
             title: titleNameFilter.value,
             chapter: chapterNameFilter.value,
             section: sectionNameFilter.value,
-            article: articleNoFilter.value.toLowerCase(),
-            sas: sasFileFilter.value.toLowerCase(),
-            issue: issueIdFilter.value.toLowerCase(),
+            article: articleNoFilter.value,
+            sas: sasFileFilter.value,
+            issue: issueIdFilter.value,
+            q: textSearchFilter.value,
         };
-        const filteredData = fullData.filter(row => {
-            const articleNo = String(row['Article'] || '').toLowerCase();
-            const sasFiles = (row['Referenced_In_SAS'] || '').toLowerCase();
-            const defects = (row['Referenced_In_Defects'] || '').toLowerCase();
-            const reqts = (row['Referenced_In_Reqts'] || '').toLowerCase();
-            return (!filters.part || row['Part Name'] === filters.part) &&
-                   (!filters.title || row['Title Name'] === filters.title) &&
-                   (!filters.chapter || row['Chapter Name'] === filters.chapter) &&
-                   (!filters.section || row['Section Name'] === filters.section) &&
-                   articleNo.includes(filters.article) &&
-                   sasFiles.includes(filters.sas) &&
-                   (defects.includes(filters.issue) || reqts.includes(filters.issue));
+    }
+
+    function reportQuery(filters) {
+        const params = new URLSearchParams();
+        Object.entries(filters).forEach(([key, value]) => {
+            if (value) params.append(key, value);
         });
-        displayData(filteredData);
-        visualsBtn.disabled = filteredData.length === 0;
-        exportPdfBtn.disabled = filteredData.length === 0;
-        exportExcelBtn.disabled = filteredData.length === 0;
+        return params;
+    }
+
+    function applyFiltersAndDisplay() {
+        onlyFilter = '';
+        showPage(0);
     }
 
     function showOnlyWithDefects() {
-        const baseFilteredData = getFilteredData();
-        const defectData = baseFilteredData.filter(row => {
-            const defects = row['Referenced_In_Defects'] || '';
-            return !defects.toLowerCase().startsWith('not found') && !defects.toLowerCase().startsWith('out of scope');
-        });
-        displayData(defectData);
+        onlyFilter = 'defects';
+        showPage(0);
     }
 
     function showOnlyWithRequirements() {
-        const baseFilteredData = getFilteredData();
-        const reqtData = baseFilteredData.filter(row => {
-            const reqts = row['Referenced_In_Reqts'] || '';
-            return !reqts.toLowerCase().startsWith('not found') && !reqts.toLowerCase().startsWith('out of scope');
-        });
-        displayData(reqtData);
+        onlyFilter = 'requirements';
+        showPage(0);
     }
 
-    function getFilteredData() {
-        const filters = {
-            part: partNameFilter.value,
-            title: titleNameFilter.value,
-            chapter: chapterNameFilter.value,
-            section: sectionNameFilter.value,
-            article: articleNoFilter.value.toLowerCase(),
-            sas: sasFileFilter.value.toLowerCase(),
-            issue: issueIdFilter.value.toLowerCase(),
-        };
-        return fullData.filter(row => {
-            const articleNo = String(row['Article'] || '').toLowerCase();
-            const sasFiles = (row['Referenced_In_SAS'] || '').toLowerCase();
-            const defects = (row['Referenced_In_Defects'] || '').toLowerCase();
-            const reqts = (row['Referenced_In_Reqts'] || '').toLowerCase();
-            return (!filters.part || row['Part Name'] === filters.part) &&
-                   (!filters.title || row['Title Name'] === filters.title) &&
-                   (!filters.chapter || row['Chapter Name'] === filters.chapter) &&
-                   (!filters.section || row['Section Name'] === filters.section) &&
-                   articleNo.includes(filters.article) &&
-                   sasFiles.includes(filters.sas) &&
-                   (defects.includes(filters.issue) || reqts.includes(filters.issue));
-        });
+    async function showPage(page) {
+        const requestId = ++pageRequestId;
+        const visibleColumns = columnConfig.filter(c => c.visible);
+        const params = reportQuery({ ...getFilters(), only: onlyFilter });
+        params.append('offset', page * REPORT_PAGE_SIZE);
+        params.append('limit', REPORT_PAGE_SIZE);
+        params.append('structured', 1);
+        visibleColumns.forEach(col => params.append('columns', col.dataKey));
+        try {
+            const response = await fetch(`${SERVER_URL}/report/rows?${params}`);
+            const result = await response.json();
+            if (requestId !== pageRequestId) return; // A newer request has been made meanwhile.
+            if (!response.ok) throw new Error(result.message);
+            currentPage = page;
+            totalRows = result.total;
+            displayedRowIds = result.row_ids || [];
+            displayData(rowsToObjects(result));
+            updatePagination();
+            visualsBtn.disabled = totalRows === 0;
+            exportPdfBtn.disabled = totalRows === 0;
+            exportExcelBtn.disabled = totalRows === 0;
+        } catch (error) {
+            if (requestId !== pageRequestId) return;
+            console.error('Error loading report rows:', error);
+            tableBody.innerHTML = `<tr><td colspan="${visibleColumns.length || 1}" style="text-align: center;">Could not load the report from the server.</td></tr>`;
+        }
+    }
+
+    // Fetches every row matching the current filters (for exports), as objects keyed by column.
+    // With structured, the file reference columns hold entry lists as in the table view.
+    async function fetchAllFilteredRows(columns, structured = false) {
+        const params = reportQuery({ ...getFilters(), only: onlyFilter });
+        params.append('limit', 0);
+        if (structured) params.append('structured', 1);
+        columns.forEach(column => params.append('columns', column));
+        const response = await fetch(`${SERVER_URL}/report/rows?${params}`);
+        const result = await response.json();
+        if (!response.ok) throw new Error(result.message);
+        return rowsToObjects(result);
+    }
+
+    function rowsToObjects(result) {
+        return result.rows.map(values => Object.fromEntries(result.columns.map((column, i) => [column, values[i]])));
+    }
+
+    function updatePagination() {
+        const pageCount = Math.max(Math.ceil(totalRows / REPORT_PAGE_SIZE), 1);
+        const first = totalRows === 0 ? 0 : currentPage * REPORT_PAGE_SIZE + 1;
+        const last = Math.min((currentPage + 1) * REPORT_PAGE_SIZE, totalRows);
+        pageInfo.textContent = `Rows ${first}-${last} of ${totalRows} (page ${currentPage + 1} of ${pageCount})`;
+        prevPageBtn.disabled = currentPage === 0;
+        nextPageBtn.disabled = currentPage + 1 >= pageCount;
     }
 
-    function resetAll() {
+    async function resetAll() {
         allFilters.forEach(f => f.value = '');
-        handlePartChange();
+        await handlePartChange();
         applyFiltersAndDisplay();
         dashboardModal.style.display = 'none'; // Hide modal on reset
         if (supportChart) supportChart.destroy();
@@ -233,31 +398,28 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Hierarchical Filter Population ---
-    function populateBaseFilters() {
-        const partNames = [...new Set(fullData.map(row => row['Part Name']).filter(Boolean))];
-        updateDropdown(partNameFilter, partNames, 'Part Name');
+    async function fetchFacets(selection) {
+        const response = await fetch(`${SERVER_URL}/report/facets?${reportQuery(selection)}`);
+        return response.ok ? (await response.json()).facets : {};
     }
 
-    function handlePartChange() {
-        const dependentData = partNameFilter.value ? fullData.filter(row => row['Part Name'] === partNameFilter.value) : [];
-        const titleNames = [...new Set(dependentData.map(row => row['Title Name']).filter(Boolean))];
-        updateDropdown(titleNameFilter, titleNames, 'Title Name');
+    async function handlePartChange() {
+        const facets = partNameFilter.value ? await fetchFacets({ part: partNameFilter.value }) : {};
+        updateDropdown(titleNameFilter, facets['Title Name'] || [], 'Title Name');
         titleNameFilter.disabled = !partNameFilter.value;
-        handleTitleChange();
+        await handleTitleChange();
     }
 
-    function handleTitleChange() {
-        const dependentData = titleNameFilter.value ? fullData.filter(row => row['Part Name'] === partNameFilter.value && row['Title Name'] === titleNameFilter.value) : [];
-        const chapterNames = [...new Set(dependentData.map(row => row['Chapter Name']).filter(Boolean))];
-        updateDropdown(chapterNameFilter, chapterNames, 'Chapter Name');
+    async function handleTitleChange() {
+        const facets = titleNameFilter.value ? await fetchFacets({ part: partNameFilter.value, title: titleNameFilter.value }) : {};
+        updateDropdown(chapterNameFilter, facets['Chapter Name'] || [], 'Chapter Name');
         chapterNameFilter.disabled = !titleNameFilter.value;
-        handleChapterChange();
+        await handleChapterChange();
     }
 
-    function handleChapterChange() {
-        const dependentData = chapterNameFilter.value ? fullData.filter(row => row['Part Name'] === partNameFilter.value && row['Title Name'] === titleNameFilter.value && row['Chapter Name'] === chapterNameFilter.value) : [];
-        const sectionNames = [...new Set(dependentData.map(row => row['Section Name']).filter(Boolean))];
-        updateDropdown(sectionNameFilter, sectionNames, 'Section Name');
+    async function handleChapterChange() {
+        const facets = chapterNameFilter.value ? await fetchFacets({ part: partNameFilter.value, title: titleNameFilter.value, chapter: chapterNameFilter.value }) : {};
+        updateDropdown(sectionNameFilter, facets['Section Name'] || [], 'Section Name');
         sectionNameFilter.disabled = !chapterNameFilter.value;
     }
 
@@ -289,13 +451,14 @@ document.addEventListener('DOMContentLoaded', () => {
             tableBody.innerHTML = `<tr><td colspan="${visibleColumns.length || 1}" style="text-align: center;">No data to display.</td></tr>`;
             return;
         }
-        data.forEach(rowData => {
-            const row = tableBody.insertRow();
-            visibleColumns.forEach(col => {
-                const cell = row.insertCell();
-                const content = rowData[col.dataKey] || '';
-                renderCellContent(cell, col.dataKey, content);
-            });
+        data.forEach(rowData => renderTableRow(tableBody.insertRow(), visibleColumns, rowData));
+    }
+
+    function renderTableRow(row, visibleColumns, rowData) {
+        visibleColumns.forEach(col => {
+            const cell = row.insertCell();
+            const content = rowData[col.dataKey] || '';
+            renderCellContent(cell, col.dataKey, content);
         });
     }
 
@@ -344,89 +507,98 @@ document.addEventListener('DOMContentLoaded', () => {
                 cell.textContent = content;
             }
             cell.appendChild(list);
-        } else if (colName === 'Referenced_In_SAS') {
-            const list = document.createElement('ul');
-            if (content && !String(content).toLowerCase().startsWith('not found')) {
-                String(content).split('; ').forEach(entry => {
-                    const parts = entry.split('|');
-                    if (parts.length !== 2) {
-                        const li = document.createElement('li');
-                        li.textContent = entry;
-                        list.appendChild(li);
-                        return;
-                    }
-                    const [filePath, lineNumbersStr] = parts;
-                    const fileName = filePath.substring(filePath.lastIndexOf('\\') + 1) || filePath.substring(filePath.lastIndexOf('/') + 1);
-                    const lineLinks = lineNumbersStr.split(', ').map(line =>
-                        `<a href="${createGitLabLink(filePath, line)}" target="_blank">${line}</a>`
-                    ).join(' ');
-                    const listItem = document.createElement('li');
-                    listItem.innerHTML = `${fileName} (${lineLinks})`;
-                    list.appendChild(listItem);
-                });
-            } else {
+        } else if (colName === 'Referenced_In_SAS' || colName === 'Referenced_In_TXT') {
+            const entries = Array.isArray(content) ? content : parseFileReferences(colName, content);
+            if (!entries) {
                 cell.textContent = content;
+                return;
             }
-            cell.appendChild(list);
-        } else if (colName === 'Referenced_In_TXT') {
             const list = document.createElement('ul');
-            if (content && !String(content).toLowerCase().startsWith('not found')) {
-                String(content).split('; ').forEach(entry => {
-                    const parts = entry.split('|');
-                    if (parts.length < 5) {
-                        const li = document.createElement('li');
-                        li.textContent = entry;
-                        list.appendChild(li);
-                        return;
-                    }
-                    const filePath = parts[0];
-                    const section = parts[1];
-                    const subsection = parts[2];
-                    const lineNumbers = parts[3];
-                    const lineTexts = parts.slice(4).join('|');
-                    const fileName = filePath.substring(filePath.lastIndexOf('\\') + 1) || filePath.substring(filePath.lastIndexOf('/') + 1);
-                    const lineLinks = lineNumbers.split(', ').map((line, index) => {
-                        const lineText = (lineTexts.split('[NL]')[index] || '').trim();
-                        const infoIcon = `<span class="info-icon" data-text="${encodeURIComponent(lineText)}">i</span>`;
-                        return `<a href="${createGitLabLink(filePath, line)}" target="_blank">${line}</a>${infoIcon}`;
-                    }).join(' ');
-                    const listItem = document.createElement('li');
-                    listItem.innerHTML = `${fileName} (${section}, ${subsection}) (${lineLinks})`;
-                    list.appendChild(listItem);
-                });
-                list.querySelectorAll('.info-icon').forEach(icon => {
-                    icon.addEventListener('mouseover', (event) => {
-                        tooltip.textContent = decodeURIComponent(event.target.getAttribute('data-text'));
-                        tooltip.style.display = 'block';
-                        const rect = event.target.getBoundingClientRect();
-                        tooltip.style.left = `${rect.left + window.scrollX + rect.width / 2 - tooltip.offsetWidth / 2}px`;
-                        tooltip.style.top = `${rect.top + window.scrollY - tooltip.offsetHeight - 5}px`;
-                    });
-                    icon.addEventListener('mouseout', () => {
-                        tooltip.style.display = 'none';
-                    });
-                });
-            } else {
-                cell.textContent = content;
-            }
+            entries.forEach(entry => list.appendChild(renderFileReference(colName, entry)));
             cell.appendChild(list);
         } else {
             cell.textContent = content;
         }
     }
 
+    // Splits a delimited Referenced_In_SAS / Referenced_In_TXT string (an uploaded workbook) into
+    // the structured entries the server returns: {file, lines[, section, subsection, texts]}.
+    // Entries that do not have the expected format are kept as {text}. Returns null for notes.
+    function parseFileReferences(colName, content) {
+        if (!content || String(content).toLowerCase().startsWith('not found')) return null;
+        return String(content).split('; ').map(entry => {
+            const parts = entry.split('|');
+            if (colName === 'Referenced_In_SAS') {
+                return parts.length === 2 ? { file: parts[0], lines: parts[1].split(', ') } : { text: entry };
+            }
+            if (parts.length < 5) return { text: entry };
+            return {
+                file: parts[0], section: parts[1], subsection: parts[2], lines: parts[3].split(', '),
+                texts: parts.slice(4).join('|').split('[NL]'),
+            };
+        });
+    }
+
+    function renderFileReference(colName, entry) {
+        const listItem = document.createElement('li');
+        if (entry.file === undefined) {
+            listItem.textContent = entry.text;
+            return listItem;
+        }
+        const filePath = entry.file;
+        const fileName = filePath.substring(filePath.lastIndexOf('\\') + 1) || filePath.substring(filePath.lastIndexOf('/') + 1);
+        listItem.appendChild(document.createTextNode(colName === 'Referenced_In_TXT'
+            ? `${fileName} (${entry.section}, ${entry.subsection}) (` : `${fileName} (`));
+        entry.lines.forEach((line, index) => {
+            if (index > 0) listItem.appendChild(document.createTextNode(' '));
+            const link = document.createElement('a');
+            link.href = createGitLabLink(filePath, line);
+            link.target = '_blank';
+            link.textContent = line;
+            listItem.appendChild(link);
+            if (colName === 'Referenced_In_TXT') {
+                const infoIcon = document.createElement('span');
+                infoIcon.className = 'info-icon';
+                infoIcon.textContent = 'i';
+                const lineText = ((entry.texts || [])[index] || '').trim();
+                infoIcon.addEventListener('mouseover', (event) => {
+                    tooltip.textContent = lineText;
+                    tooltip.style.display = 'block';
+                    const rect = event.target.getBoundingClientRect();
+                    tooltip.style.left = `${rect.left + window.scrollX + rect.width / 2 - tooltip.offsetWidth / 2}px`;
+                    tooltip.style.top = `${rect.top + window.scrollY - tooltip.offsetHeight - 5}px`;
+                });
+                infoIcon.addEventListener('mouseout', () => {
+                    tooltip.style.display = 'none';
+                });
+                listItem.appendChild(infoIcon);
+            }
+        });
+        listItem.appendChild(document.createTextNode(')'));
+        return listItem;
+    }
+
     // --- Dashboard & Chart Logic ---
-    function updateDashboard() {
-        const filteredData = getFilteredData();
-        if (filteredData.length === 0) {
+    async function updateDashboard() {
+        let summary;
+        try {
+            const response = await fetch(`${SERVER_URL}/report/summary?${reportQuery(getFilters())}`);
+            summary = await response.json();
+            if (!response.ok) throw new Error(summary.message);
+        } catch (error) {
+            console.error('Error loading dashboard data:', error);
+            alert("The dashboard data could not be loaded from the server.");
+            return;
+        }
+        if (summary.total === 0) {
             alert("No data to visualize. Please adjust your filters.");
             return;
         }
         dashboardModal.style.display = 'flex'; // Show modal
-        updateCharts(filteredData);
+        updateCharts(summary);
     }
 
-    function updateCharts(data) {
+    function updateCharts(summary) {
         const style = getComputedStyle(document.body);
         const colors = {
             primary: style.getPropertyValue('--primary-color').trim(),
@@ -437,18 +609,7 @@ document.addEventListener('DOMContentLoaded', () => {
         };
 
         // Chart 1: Article Support Status
-        let supported = 0, notSupported = 0, outOfScope = 0;
-        data.forEach(row => {
-            const sas = row['Referenced_In_SAS'] || '';
-            const txt = row['Referenced_In_TXT'] || '';
-            if (String(row['Out of scope']).toLowerCase() === 'out of scope' || sas.toLowerCase() === 'out of scope' || txt.toLowerCase() === 'out of scope') {
-                outOfScope++;
-            } else if (!sas.toLowerCase().startsWith('not found') || !txt.toLowerCase().startsWith('not found')) {
-                supported++;
-            } else {
-                notSupported++;
-            }
-        });
+        const { supported, not_supported: notSupported, out_of_scope: outOfScope } = summary.support;
         if (supportChart) supportChart.destroy();
         supportChart = new Chart(supportChartCanvas, {
             type: 'doughnut',
@@ -461,25 +622,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
     
-        // Chart 2: Top 5 Referenced SAS Files
-        const sasFileCounts = new Map();
-        data.forEach(row => {
-            const sasFiles = row['Referenced_In_SAS'] || '';
-            if (!sasFiles.toLowerCase().startsWith('not found') && sasFiles.toLowerCase() !== 'out of scope') {
-                sasFiles.split('; ').forEach(entry => {
-                    const parts = entry.split('|');
-                    if (parts.length === 2) {
-                        const filePath = parts[0];
-                        // Extract just the filename from the full path
-                        const fileName = filePath.substring(Math.max(filePath.lastIndexOf('\\'), filePath.lastIndexOf('/')) + 1);
-                        if (fileName.toLowerCase().endsWith('.sas')) {
-                            sasFileCounts.set(fileName, (sasFileCounts.get(fileName) || 0) + 1);
-                        }
-                    }
-                });
-            }
-        });
-        const sortedSasFiles = [...sasFileCounts.entries()].sort((a, b) => b[1] - a[1]).slice(0, 5);
+        // Chart 2: Top 5 Referenced SAS Files (counted on the server, as [fileName, count] pairs)
+        const sortedSasFiles = summary.top_sas_files;
         console.log('SAS file counts:', sortedSasFiles); // Debug log
 
         // Destroy previous chart instance if it exists
@@ -547,13 +691,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
 
         // Chart 3: Issue Coverage
-        const withIssues = data.filter(row => {
-            const defects = row['Referenced_In_Defects'] || '';
-            const reqts = row['Referenced_In_Reqts'] || '';
-            return (!defects.toLowerCase().startsWith('not found') && !defects.toLowerCase().startsWith('out of scope')) ||
-                   (!reqts.toLowerCase().startsWith('not found') && !reqts.toLowerCase().startsWith('out of scope'));
-        }).length;
-        const withoutIssues = data.length - withIssues;
+        const { with_issues: withIssues, without_issues: withoutIssues } = summary.issue_coverage;
         if (issueCoverageChart) issueCoverageChart.destroy();
         issueCoverageChart = new Chart(issueCoverageChartCanvas, {
             type: 'doughnut',
@@ -566,14 +704,32 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     // --- Export and Utility Functions ---
-    function exportToPDF() {
+    async function exportToPDF() {
         const { jsPDF } = window.jspdf;
         const doc = new jsPDF({ orientation: 'landscape', unit: 'pt', format: 'a4' });
         const visibleColumns = columnConfig.filter(c => c.visible);
         const head = [visibleColumns.map(c => c.header)];
-        const body = Array.from(tableBody.querySelectorAll('tr')).map(row =>
-            Array.from(row.querySelectorAll('td')).map(cell => cell.innerText.replace(/\s\s+/g, ' ').trim())
-        );
+        let rows;
+        try {
+            rows = await fetchAllFilteredRows(visibleColumns.map(c => c.dataKey), true);
+        } catch (error) {
+            console.error('Error exporting report:', error);
+            alert("The report could not be exported.");
+            return;
+        }
+        // Render the cells the same way as the table, off screen, to export the displayed text.
+        const scratch = document.createElement('table');
+        scratch.style.cssText = 'position: absolute; left: -100000px; top: 0;';
+        document.body.appendChild(scratch);
+        const body = rows.map(rowData => {
+            const row = scratch.insertRow();
+            return visibleColumns.map(col => {
+                const cell = row.insertCell();
+                renderCellContent(cell, col.dataKey, rowData[col.dataKey] || '');
+                return cell.innerText.replace(/\s\s+/g, ' ').trim();
+            });
+        });
+        scratch.remove();
         doc.autoTable({
             head: head, body: body, styles: { fontSize: 5, cellPadding: 2, overflow: 'linebreak' },
             margin: { top: 40 }, didDrawPage: data => doc.setFontSize(20).text("Consolidated CRR Report", data.settings.margin.left, 30)
@@ -581,20 +737,18 @@ document.addEventListener('DOMContentLoaded', () => {
         doc.save('crr_full_report.pdf');
     }
 
-    function exportToExcel() {
+    async function exportToExcel() {
         const visibleKeys = columnConfig.filter(c => c.visible).map(c => c.dataKey);
-        const dataToExport = Array.from(tableBody.querySelectorAll('tr')).map(row => {
-            const article = row.cells[0]?.textContent;
-            if (!article) return null;
-            const originalRow = fullData.find(d => String(d.Article) === article) || {};
-            const exportRow = {};
-            visibleKeys.forEach(key => {
-                exportRow[key] = originalRow[key];
-            });
-            return exportRow;
-        }).filter(Boolean);
+        let dataToExport;
+        try {
+            dataToExport = await fetchAllFilteredRows(visibleKeys);
+        } catch (error) {
+            console.error('Error exporting report:', error);
+            alert("The report could not be exported.");
+            return;
+        }
         if (dataToExport.length === 0) return;
-        const worksheet = XLSX.utils.json_to_sheet(dataToExport);
+        const worksheet = XLSX.utils.json_to_sheet(dataToExport, { header: visibleKeys });
         const workbook = XLSX.utils.book_new();
         XLSX.utils.book_append_sheet(workbook, worksheet, 'Filtered Report');
         XLSX.writeFile(workbook, 'crr_full_report_filtered.xlsx');
@@ -621,7 +775,12 @@ document.addEventListener('DOMContentLoaded', () => {
         });
         [filterBtn, resetBtn, exportPdfBtn, exportExcelBtn, visualsBtn, columnToggleBtn, filterDefectsBtn, filterReqtsBtn].forEach(btn => btn.disabled = !enable);
         if (!enable) {
-            tableBody.innerHTML = `<tr><td colspan="${columnConfig.length}" style="text-align: center;">Please upload the 'CRR_Full_Combined_Report.xlsx' file.</td></tr>`;
+            tableBody.innerHTML = `<tr><td colspan="${columnConfig.length}" style="text-align: center;">No report is available yet. Run the pipeline or upload a 'CRR_Full_Combined_Report.xlsx' file.</td></tr>`;
+            totalRows = 0;
+            currentPage = 0;
+            pageInfo.textContent = '';
+            prevPageBtn.disabled = true;
+            nextPageBtn.disabled = true;
         }
     }
 
@@ -635,7 +794,7 @@ document.addEventListener('DOMContentLoaded', () => {
             checkbox.dataset.columnIndex = index;
             checkbox.addEventListener('change', (e) => {
                 columnConfig[index].visible = e.target.checked;
-                applyFiltersAndDisplay();
+                showPage(currentPage);
             });
             label.appendChild(checkbox);
             label.appendChild(document.createTextNode(col.header));
@@ -646,4 +805,5 @@ document.addEventListener('DOMContentLoaded', () => {
     // --- Initial State ---
     initializeColumnToggles();
     resetUI(false);
+    loadReport();
 });
\ No newline at end of file
@@ -1,25 +1,135 @@
 # server.py
-import subprocess
+import argparse
+import json
 import sys
 import os
-from flask import Flask, jsonify, send_from_directory
+import threading
+from flask import Flask, Response, abort, g, jsonify, request, send_from_directory, stream_with_context
 from flask_cors import CORS
+from werkzeug.serving import is_running_from_reloader, run_simple
+from pipeline_jobs import SUCCEEDED, PipelineJobRunner
+from pipeline_worker import PipelineWorker, PipelineWorkerError
+from report_store import ReportStore
+from article_index import ArticleIndex, ArticleIndexUnavailable, normalize_article
+from report_delta import load_report_delta
+from run_metrics import load_run_record, load_run_records
+from static_cache import ResponseCache, StaticAssets, compress_response, response_etag
+
+try:
+    import waitress
+except ImportError:  # Optional; without it the production mode uses Werkzeug's threaded server.
+    waitress = None
 
 # --- Configuration ---
 # Get the absolute path of the directory where the server script is located
 # This ensures that file paths are correct regardless of where the script is called from
 SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+PIPELINE_SCRIPT_PATH = os.path.join(SERVER_DIR, 'generate_crr_report.py')
+# The pipeline's output directory (generate_crr_report.OUTPUT_DIR, set with CRR_OUTPUT_DIR).
+REPORT_DIR = os.environ.get('CRR_OUTPUT_DIR', SERVER_DIR)
+# The pipeline's output, served to the viewer through the /report endpoints. The SQLite report is
+# the primary output; the Excel export is only read when there is no SQLite report.
+REPORT_DB = os.path.join(REPORT_DIR, 'CRR_Full_Combined_Report.sqlite')
+REPORT_EXCEL_FILE = os.path.join(REPORT_DIR, 'CRR_Full_Combined_Report.xlsx')
+# Changes of the latest pipeline run against the previous report (see report_delta.py).
+REPORT_DELTA_FILE = os.path.join(REPORT_DIR, 'CRR_Full_Combined_Report.delta.json')
+# Default and maximum number of rows per /report/rows page (limit=0 returns all rows, for exports).
+REPORT_PAGE_SIZE = 50
+REPORT_MAX_PAGE_SIZE = 1000
+# Seconds between keep-alive comments on an idle server-sent event stream.
+SSE_HEARTBEAT_SECONDS = 15
+# Default and maximum number of matches returned by the /articles prefix search.
+ARTICLE_SEARCH_LIMIT = 20
+ARTICLE_SEARCH_MAX_LIMIT = 200
+# Run records written by the pipeline (generate_crr_report.RUN_METRICS_DIR), served on /metrics.
+RUN_METRICS_DIR = os.path.join(REPORT_DIR, 'run_metrics')
+# Default and maximum number of run records returned by /metrics.
+RUN_METRICS_LIMIT = 20
+RUN_METRICS_MAX_LIMIT = 200
+
+# --- Serving ---
+# Address of the server; 127.0.0.1 only accepts viewers on this machine.
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 5000
+# Request threads of the production server (waitress). A viewer loads several endpoints at once,
+# and every followed /jobs/<job_id>/events stream holds a thread until the job ends.
+SERVER_THREADS = 16
+# HTTP caching and compression (see static_cache.py): content-hash ETags and precompressed
+# variants of the static files, ETags and a response cache for the report endpoints, and gzip for
+# other JSON responses. Set to False to serve every request in full.
+HTTP_CACHING = True
+# Report endpoints whose responses are cached per report version and request URL.
+CACHED_REPORT_PATHS = ('/report/facets', '/report/rows', '/report/summary')
+# Memory for cached report responses (plain and gzipped bodies), in megabytes.
+REPORT_RESPONSE_CACHE_MB = 64
 
 # --- Flask App Initialization ---
-app = Flask(__name__, static_folder=SERVER_DIR, static_url_path='')
+# Static files are served by serve_static_files (with HTTP caching), not by Flask's static route.
+app = Flask(__name__, static_folder=None)
 CORS(app) # Enable Cross-Origin Resource Sharing for all routes
 
+# --- Pipeline Jobs ---
+# We use sys.executable to ensure the script runs with the same Python interpreter
+# that is running the Flask server. This avoids issues with virtual environments.
+# Runs are served by a warm worker process that keeps the pipeline imported and its connections,
+# caches and TOC loaded between runs; set USE_WARM_PIPELINE_WORKER to False to always start a
+# fresh process. The fresh-process command is also the fallback if the worker fails.
+USE_WARM_PIPELINE_WORKER = True
+# With WATCH_SOURCE_FILES the warm worker also watches the SAS and TXT trees and refreshes the
+# report from the changed files within seconds of a save (see generate_crr_report.WATCH_*).
+WATCH_SOURCE_FILES = False
+pipeline_worker = (PipelineWorker(PIPELINE_SCRIPT_PATH, cwd=SERVER_DIR, watch_sources=WATCH_SOURCE_FILES)
+                   if USE_WARM_PIPELINE_WORKER else None)
+job_runner = PipelineJobRunner([sys.executable, PIPELINE_SCRIPT_PATH], cwd=SERVER_DIR, worker=pipeline_worker)
+
+# --- Report Queries ---
+# The report is loaded once into an indexed in-memory store and reloaded when its file changes.
+report_store = ReportStore([REPORT_DB, REPORT_EXCEL_FILE])
+# Article lookups are answered from the inverted index the pipeline stores in the SQLite report.
+article_index = ArticleIndex(REPORT_DB)
+
+# --- HTTP Caching ---
+static_assets = StaticAssets(SERVER_DIR)
+report_responses = ResponseCache(REPORT_RESPONSE_CACHE_MB * 1024 * 1024)
+
+@app.before_request
+def _cached_report_response():
+    """
+    Answers a report query from the response cache, or with 304 Not Modified when the viewer
+    already has it: the ETag is derived from the report version and the request URL, so this
+    needs neither the query nor its serialization.
+    """
+    if not HTTP_CACHING or request.method != 'GET' or request.path not in CACHED_REPORT_PATHS:
+        return None
+    try:
+        index, version = report_store.current()
+    except Exception:
+        return None  # The endpoint reports the error.
+    if index is None:
+        return None
+    etag = response_etag(version, request.full_path)
+    cached = report_responses.respond(etag, request)
+    if cached is None:
+        g.report_etag, g.report_version = etag, version
+    return cached
+
+@app.after_request
+def _cache_and_compress_response(response):
+    """Caches a computed report query (unless the report changed meanwhile) and gzips JSON responses."""
+    if not HTTP_CACHING:
+        return response
+    etag = g.pop('report_etag', None)
+    if etag and response.status_code == 200 and report_store.version == g.pop('report_version', None):
+        return report_responses.store(etag, response, request)
+    return compress_response(response, request)
+
 @app.route('/')
 def serve_index():
     """
     Serves the main HTML file of the CRR viewer application.
+    Its scripts and stylesheets are referenced by versioned URLs (see static_cache.StaticAssets).
     """
-    return send_from_directory(SERVER_DIR, 'index.html')
+    return serve_static_files('index.html')
 
 @app.route('/<path:path>')
 def serve_static_files(path):
@@ -27,74 +137,299 @@ def serve_static_files(path):
     Serves static files like CSS and JavaScript.
     This is necessary for the HTML page to load its assets correctly.
     """
-    return send_from_directory(SERVER_DIR, path)
+    if not HTTP_CACHING:
+        return send_from_directory(SERVER_DIR, path)
+    response = static_assets.response(path, request)
+    if response is None:
+        abort(404)
+    return response
 
 @app.route('/run-pipeline', methods=['POST'])
 def run_pipeline_endpoint():
     """
-    An API endpoint that, when called, executes the consolidated data pipeline script.
-    It captures and returns the output or errors from the script.
+    Starts the consolidated data pipeline as a background job and returns its id immediately.
+    If a pipeline job is already running, that job is returned instead of starting a second one.
+    Progress can be followed via /jobs/<job_id> (polling) or /jobs/<job_id>/events (server-sent events).
     """
     print("--- Received request to run the data pipeline ---")
-    
-    pipeline_script_path = os.path.join(SERVER_DIR, 'generate_crr_report.py')
 
     # Check if the pipeline script exists before trying to run it
-    if not os.path.exists(pipeline_script_path):
-        print(f"--- ERROR: Pipeline script not found at {pipeline_script_path} ---")
+    if not os.path.exists(PIPELINE_SCRIPT_PATH):
+        print(f"--- ERROR: Pipeline script not found at {PIPELINE_SCRIPT_PATH} ---")
         return jsonify({
             "message": "Pipeline script not found on the server.",
-            "error_details": f"No such file or directory: {pipeline_script_path}"
+            "error_details": f"No such file or directory: {PIPELINE_SCRIPT_PATH}"
         }), 500
 
+    job, created = job_runner.submit()
+    print(f"--- {'Started' if created else 'Already running'}: pipeline job {job.id} ---")
+    return jsonify({
+        "message": "Data pipeline started." if created else "The data pipeline is already running.",
+        "job_id": job.id,
+        "status": job.status,
+        "coalesced": not created,
+        "status_url": f"/jobs/{job.id}",
+        "events_url": f"/jobs/{job.id}/events",
+        "result_url": f"/jobs/{job.id}/result",
+    }), 202
+
+@app.route('/jobs/latest', methods=['GET'])
+def latest_job_endpoint():
+    """Returns the state of the most recent pipeline job, so a reloaded page can pick it up again."""
+    job = job_runner.latest()
+    if job is None:
+        return jsonify({"message": "No pipeline job has been run yet."}), 404
+    return jsonify(job.snapshot(since=_line_offset(request.args.get('since'))))
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status_endpoint(job_id):
+    """
+    Returns the state of a pipeline job and its output lines. Pass ?since=<line_count> from the
+    previous response to only receive the lines printed since then.
+    """
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"message": f"Unknown pipeline job: {job_id}"}), 404
+    return jsonify(job.snapshot(since=_line_offset(request.args.get('since'))))
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result_endpoint(job_id):
+    """Returns the outcome of a finished pipeline job in the same shape the endpoint used to return synchronously."""
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"message": f"Unknown pipeline job: {job_id}"}), 404
+    if not job.finished:
+        return jsonify({"message": "The data pipeline is still running.", "job_id": job.id, "status": job.status}), 409
+
+    output = "\n".join(job.lines)
+    if job.status == SUCCEEDED:
+        return jsonify({"message": "Data pipeline completed successfully!", "job_id": job.id, "output": output}), 200
+    if job.error:
+        return jsonify({"message": "An unexpected server error occurred.", "job_id": job.id,
+                        "error_details": job.error, "output": output}), 500
+    return jsonify({"message": "The data pipeline script encountered an error.", "job_id": job.id,
+                    "error_details": f"The pipeline script failed with exit code {job.returncode}",
+                    "output": output}), 500
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events_endpoint(job_id):
+    """
+    Streams a pipeline job's output as server-sent events: one 'log' event per output line
+    (its id is the line number, so a reconnecting EventSource resumes where it left off),
+    followed by a single 'status' event with the final job state.
+    """
+    job = job_runner.get(job_id)
+    if job is None:
+        return jsonify({"message": f"Unknown pipeline job: {job_id}"}), 404
+    since = _line_offset(request.headers.get('Last-Event-ID') or request.args.get('since'))
+
+    def stream():
+        next_line = since
+        while True:
+            lines, finished = job.wait_for_lines(next_line, SSE_HEARTBEAT_SECONDS)
+            for line in lines:
+                next_line += 1
+                yield f"id: {next_line}\nevent: log\ndata: {line}\n\n"
+            if finished and not lines:
+                snapshot = job.snapshot(since=len(job.lines))
+                yield f"event: status\ndata: {json.dumps(snapshot)}\n\n"
+                return
+            if not lines:
+                yield ": keep-alive\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/report/facets', methods=['GET'])
+def report_facets_endpoint():
+    """
+    Returns the report's columns and the hierarchy dropdown options. Pass part, title and chapter
+    to get the options of the levels below that selection.
+    """
+    index, error = _current_report()
+    if error:
+        return error
+    return jsonify({
+        "source": report_store.source,
+        "generated_at": index.generated_at,
+        "row_count": index.row_count,
+        "columns": index.columns,
+        "facets": index.facets(request.args.get('part', ''), request.args.get('title', ''), request.args.get('chapter', '')),
+    })
+
+@app.route('/report/rows', methods=['GET'])
+def report_rows_endpoint():
+    """
+    Returns one page of the filtered report: {total, offset, columns, rows, row_ids}, with rows as value lists.
+    Filters: part, title, chapter, section, article, sas, issue, q and only (defects / requirements).
+    Paging: offset and limit (0 for all rows). Repeat columns=<name> to select the returned columns.
+    With structured=1, Referenced_In_SAS / Referenced_In_TXT cells are returned as lists of
+    {file, lines[, section, subsection, texts]} entries when the report has them in structured form.
+    """
+    index, error = _current_report()
+    if error:
+        return error
+    offset = _int_arg('offset', 0)
+    limit = min(_int_arg('limit', REPORT_PAGE_SIZE), REPORT_MAX_PAGE_SIZE) if request.args.get('limit') != '0' else 0
+    structured = request.args.get('structured') in ('1', 'true')
+    return jsonify(index.query(_report_filters(), offset, limit, request.args.getlist('columns'), structured))
+
+@app.route('/report/delta', methods=['GET'])
+def report_delta_endpoint():
+    """
+    Returns the changes of the current report against the previous pipeline run (see
+    report_delta.compute_report_delta), for a viewer showing the report generated at `since`.
+    Answers {"full_reload": true} when the delta does not apply to that report, in which case
+    the viewer reloads the report as a whole, and an empty delta when `since` is the current report.
+    """
+    index, error = _current_report()
+    if error:
+        return error
+    since = request.args.get('since', '')
+    if since and since == index.generated_at:
+        return jsonify({"full_reload": False, "generated_at": since, "articles": [], "rows": {}})
+    delta = load_report_delta(REPORT_DELTA_FILE)
+    if (delta is None or not delta.get('compatible') or delta.get('generated_at') != index.generated_at
+            or (since and delta.get('base') != since)):
+        return jsonify({"full_reload": True, "generated_at": index.generated_at})
+    return jsonify(dict(delta, full_reload=False))
+
+@app.route('/report/summary', methods=['GET'])
+def report_summary_endpoint():
+    """Returns the dashboard figures for the filtered report (same filters as /report/rows)."""
+    index, error = _current_report()
+    if error:
+        return error
+    return jsonify(index.summary(_report_filters()))
+
+@app.route('/report/upload', methods=['POST'])
+def report_upload_endpoint():
+    """Loads an uploaded report workbook (form field 'file') in place of the pipeline's report."""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({"message": "No report file was uploaded."}), 400
     try:
-        # We use sys.executable to ensure the script runs with the same Python interpreter
-        # that is running the Flask server. This avoids issues with virtual environments.
-        process = subprocess.run(
-            [sys.executable, pipeline_script_path],
-            capture_output=True,
-            text=True,
-            check=True, # This will raise a CalledProcessError if the script returns a non-zero exit code
-            cwd=SERVER_DIR # Run the script from its own directory
-        )
-        
-        print("--- Pipeline executed successfully ---")
-        print("Output:", process.stdout)
-        
-        return jsonify({
-            "message": "Data pipeline completed successfully!",
-            "output": process.stdout
-        }), 200
-
-    except subprocess.CalledProcessError as e:
-        # This block catches errors from the script itself (e.g., a Python exception)
-        print(f"--- ERROR: The pipeline script failed with exit code {e.returncode} ---")
-        print("Stdout:", e.stdout)
-        print("Stderr:", e.stderr)
-        
-        return jsonify({
-            "message": "The data pipeline script encountered an error.",
-            "error_details": e.stderr,
-            "output": e.stdout
-        }), 500
-        
+        index = report_store.load_upload(upload.stream, upload.filename)
     except Exception as e:
-        # This block catches other errors, such as problems starting the subprocess
-        print(f"--- ERROR: An unexpected error occurred while trying to run the pipeline ---")
-        print("Error:", str(e))
+        print(f"--- ERROR: Could not read the uploaded report {upload.filename}: {e} ---")
+        return jsonify({"message": "The uploaded file could not be read as a report.", "error_details": str(e)}), 400
+    return jsonify({"source": report_store.source, "row_count": index.row_count, "columns": index.columns})
 
-        return jsonify({
-            "message": "An unexpected server error occurred.",
-            "error_details": str(e)
-        }), 500
+@app.route('/articles', methods=['GET'])
+def article_search_endpoint():
+    """
+    Prefix search over the referenced articles: ?prefix=9 returns {prefix, articles} with up to
+    `limit` matches ('9', '92', '92(1)', ...) and their numbers of referencing files and issues.
+    """
+    prefix = request.args.get('prefix', '')
+    limit = min(_int_arg('limit', ARTICLE_SEARCH_LIMIT), ARTICLE_SEARCH_MAX_LIMIT)
+    try:
+        return jsonify({"prefix": prefix, "articles": article_index.search(prefix, limit)})
+    except ArticleIndexUnavailable as e:
+        return jsonify({"message": str(e)}), 404
+
+@app.route('/articles/<article_id>/references', methods=['GET'])
+def article_references_endpoint(article_id):
+    """
+    Returns where an article ('92', '92(1)', 'Article 92') is referenced: its SAS files and lines,
+    TXT files, sections and lines, and Jira issues, plus the paragraph forms indexed under it.
+    """
+    if not normalize_article(article_id):
+        return jsonify({"message": "No article was given."}), 400
+    try:
+        return jsonify(article_index.references(article_id))
+    except ArticleIndexUnavailable as e:
+        return jsonify({"message": str(e)}), 404
+
+@app.route('/metrics', methods=['GET'])
+def run_metrics_endpoint():
+    """
+    Returns {latest, runs}: the latest pipeline run record in full, and up to `limit` recent runs
+    (newest first) with their status, duration and stage timings.
+    """
+    limit = min(_int_arg('limit', RUN_METRICS_LIMIT), RUN_METRICS_MAX_LIMIT)
+    records = load_run_records(RUN_METRICS_DIR, max(limit, 1))
+    runs = [{key: record.get(key) for key in ('run_id', 'started_at', 'duration_seconds', 'status', 'error', 'stages')}
+            for record in records[:limit]]
+    return jsonify({"latest": records[0] if records else None, "runs": runs})
+
+@app.route('/metrics/<run_id>', methods=['GET'])
+def run_record_endpoint(run_id):
+    """Returns the full run record of one pipeline run."""
+    record = load_run_record(RUN_METRICS_DIR, run_id)
+    if record is None:
+        return jsonify({"message": f"No run record with id {run_id}."}), 404
+    return jsonify(record)
+
+def _current_report():
+    """Returns (index, None), or (None, error response) when no report is available."""
+    try:
+        index = report_store.index()
+    except Exception as e:
+        print(f"--- ERROR: Could not load the report: {e} ---")
+        return None, (jsonify({"message": "The report could not be loaded.", "error_details": str(e)}), 500)
+    if index is None:
+        return None, (jsonify({"message": "No report is available yet. Run the pipeline or upload a report."}), 404)
+    return index, None
+
+def _report_filters():
+    return {key: request.args.get(key, '') for key in
+            ('part', 'title', 'chapter', 'section', 'article', 'sas', 'issue', 'q', 'only')}
+
+def _int_arg(name, default):
+    try:
+        return max(int(request.args.get(name, default)), 0)
+    except ValueError:
+        return default
+
+def _prewarm_pipeline_worker():
+    """Starts the warm pipeline worker in the background, so the first refresh does not pay for it."""
+    try:
+        pipeline_worker.start()
+        print("--- Warm pipeline worker is ready ---")
+    except PipelineWorkerError as e:
+        print(f"--- WARNING: {e} Pipeline runs will start a separate process. ---")
+
+def serve_production(host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS):
+    """
+    Serves the app without the debugger and reloader: with waitress (a multi-threaded production
+    WSGI server) when it is installed, otherwise with Werkzeug's threaded server.
+    The pipeline jobs and the warm worker live in this process, so the app is served by one
+    process with several threads rather than by several worker processes.
+    """
+    if waitress is not None:
+        waitress.serve(app, host=host, port=port, threads=threads)
+    else:
+        run_simple(host, port, app, threaded=True)
+
+def _line_offset(value):
+    """Parses a 'since' line offset from a query parameter or header; invalid values mean 0."""
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
 
 if __name__ == '__main__':
     """
-    Starts the Flask web server.
-    It will be accessible at http://127.0.0.1:5000.
+    Starts the web server, by default in production mode (see serve_production).
+    It will be accessible at http://127.0.0.1:5000. Use --debug for development with Flask's
+    debugger and the reloader.
     """
+    parser = argparse.ArgumentParser(description="Serves the CRR Report Viewer.")
+    parser.add_argument('--debug', action='store_true', help="run Flask's development server with the debugger and reloader")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS, help="request threads of the production server")
+    args = parser.parse_args()
     print("===================================================")
     print("=== Starting CRR Report Viewer Server ===")
-    print("=== Access the application at: http://127.0.0.1:5000 ===")
+    print(f"=== Access the application at: http://{args.host}:{args.port} ===")
     print("===================================================")
-    app.run(debug=True)
+    # With --debug the reloader re-runs this script in a child process that actually serves
+    # requests; only that process needs a worker.
+    if pipeline_worker and (not args.debug or is_running_from_reloader()):
+        threading.Thread(target=_prewarm_pipeline_worker, daemon=True).start()
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        serve_production(args.host, args.port, args.threads)
@@ -0,0 +1,149 @@
+# source_watcher.py
+import os
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Optional; without it the trees are polled.
+    FileSystemEventHandler, Observer = object, None
+
+
+class SourceWatcher:
+    """
+    Watches source trees for created, modified, moved and deleted files with the given extensions
+    and reports them in debounced batches: on_change(paths) is called from the watcher's thread once
+    no event arrived for `debounce` seconds (or `max_delay` seconds after the first event of a
+    burst), with the set of affected paths. A path may name a directory that was moved or deleted.
+
+    File system events come from watchdog (inotify, FSEvents, ReadDirectoryChangesW) when it is
+    installed; otherwise the trees are polled, comparing the size and mtime of every matching file:
+    every poll_interval seconds after a change, backing off (doubling) to max_poll_interval while
+    the trees stay unchanged.
+    """
+
+    def __init__(self, directories, extensions, on_change, debounce=1.0, max_delay=10.0, poll_interval=2.0,
+                 max_poll_interval=30.0, use_events=True):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.extensions = tuple(extensions)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max(poll_interval, max_poll_interval)
+        self.use_events = use_events and Observer is not None
+        self._pending = set()
+        self._first_event = None
+        self._last_event = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._observer = None
+        self._threads = []
+
+    @property
+    def mode(self):
+        return 'events' if self.use_events else 'polling'
+
+    def start(self):
+        if self.use_events:
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self.directories:
+                if os.path.isdir(directory):
+                    self._observer.schedule(handler, directory, recursive=True)
+            self._observer.start()
+        else:
+            self._start_thread(self._poll, 'source-watch-poll')
+        self._start_thread(self._dispatch, 'source-watch-dispatch')
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        for thread in self._threads:
+            thread.join()
+
+    def add_paths(self, paths):
+        """Records changed paths; they are reported once the burst of events is over."""
+        paths = [path for path in paths if path and (path.endswith(self.extensions) or _may_be_directory(path))]
+        if not paths:
+            return
+        with self._condition:
+            now = time.monotonic()
+            self._pending.update(paths)
+            self._first_event = self._first_event or now
+            self._last_event = now
+            self._condition.notify_all()
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _dispatch(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                if not self._pending:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                due = min(self._last_event + self.debounce, self._first_event + self.max_delay)
+                if now < due:
+                    self._condition.wait(due - now)
+                    continue
+                paths, self._pending, self._first_event = self._pending, set(), None
+            self.on_change(paths)
+
+    def _poll(self):
+        states = self._snapshot()
+        interval = self.poll_interval
+        while not self._stopped.wait(interval):
+            current = self._snapshot()
+            changed = ([path for path, state in current.items() if states.get(path) != state] +
+                       [path for path in states if path not in current])
+            self.add_paths(changed)
+            states = current
+            interval = self.poll_interval if changed else min(interval * 2, self.max_poll_interval)
+
+    def _snapshot(self):
+        """Returns {path: (size, mtime_ns)} of every matching file under the watched directories."""
+        states = {}
+        for directory in self.directories:
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    if file.endswith(self.extensions):
+                        path = os.path.join(root, file)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        states[path] = (stat.st_size, stat.st_mtime_ns)
+        return states
+
+
+def _may_be_directory(path):
+    """True for an existing directory, or a removed path without a file extension (a moved or deleted directory)."""
+    return os.path.isdir(path) or (not os.path.exists(path) and not os.path.splitext(path)[1])
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Forwards watchdog events to a SourceWatcher."""
+
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+        paths = [os.fsdecode(event.src_path), os.fsdecode(getattr(event, 'dest_path', '') or '')]
+        if event.is_directory:
+            # Only moves and deletions of whole directories matter; their files' own events cover the rest.
+            if event.event_type not in ('moved', 'deleted'):
+                return
+        self.watcher.add_paths(paths)
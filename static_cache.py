@@ -0,0 +1,255 @@
+# static_cache.py
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:  # Optional; without it only gzip variants are built.
+    brotli = None
+
+# Content types worth compressing; images and .xlsx workbooks are compressed already.
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Bodies smaller than this are sent as they are.
+COMPRESS_MIN_BYTES = 1024
+# Static assets are compressed once per change, at the best (slowest) levels; dynamic responses
+# at a faster gzip level.
+STATIC_GZIP_LEVEL = 9
+STATIC_BROTLI_QUALITY = 11
+DYNAMIC_GZIP_LEVEL = 6
+# Static files larger than this are neither held in memory nor compressed; they are sent from disk.
+STATIC_MEMORY_MAX_BYTES = 8 * 1024 * 1024
+# Cache-Control of a versioned asset URL (?v=<version>): its content never changes.
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Everything else may be cached, but must be revalidated (If-None-Match) before it is reused.
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+# Local script and stylesheet references of an HTML page, which are rewritten to versioned URLs.
+_ASSET_REFERENCE = re.compile(r'''(\s(?:src|href)=")(?!//)([^":?#]+\.(?:js|css))"''')
+
+
+class StaticAssets:
+    """
+    Serves the files under root with content-hash ETags and precompressed variants.
+
+    Each file is read, hashed and compressed (gzip, plus brotli when it is installed) once, when
+    it is first requested after a change of its size or mtime; requests are then answered from
+    memory, with 304 Not Modified when If-None-Match holds the current ETag. HTML pages are served
+    with their local scripts and stylesheets referenced as <path>?v=<version>; such versioned URLs
+    are cached by browsers for a year, everything else is revalidated on every use.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._assets = {}
+        self._lock = threading.RLock()
+
+    def response(self, path, request):
+        """Returns the response for the file at path (relative to root), or None when there is no such file."""
+        asset = self.get(path)
+        return asset.response(request) if asset is not None else None
+
+    def get(self, path):
+        full_path = safe_join(self.root, path)
+        if full_path is None or not os.path.isfile(full_path):
+            return None
+        with self._lock:
+            return self._current(full_path)
+
+    def _current(self, full_path):
+        asset = self._assets.get(full_path)
+        if asset is None or not asset.is_current():
+            asset = self._assets[full_path] = self._build(full_path)
+        return asset
+
+    def _build(self, full_path):
+        # The state is taken before reading, so a file changed meanwhile is rebuilt on the next request.
+        state = _file_state(full_path)
+        mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        if state[0] > STATIC_MEMORY_MAX_BYTES:
+            return _Asset(full_path, state, mimetype, None, digest=_hash_file(full_path))
+        with open(full_path, 'rb') as f:
+            body = f.read()
+        dependencies = {}
+        if mimetype == 'text/html':
+            body, dependencies = self._version_references(full_path, body)
+        return _Asset(full_path, state, mimetype, body, dependencies=dependencies)
+
+    def _version_references(self, page_path, body):
+        """Rewrites the local script and stylesheet references of a page to versioned URLs."""
+        dependencies = {}
+
+        def versioned(match):
+            prefix, reference = match.groups()
+            if reference.startswith('/'):
+                asset_path = safe_join(self.root, reference.lstrip('/'))
+            else:
+                asset_path = safe_join(os.path.dirname(page_path), reference)
+            if asset_path is None or not os.path.isfile(asset_path):
+                return match.group(0)
+            asset = self._current(asset_path)
+            dependencies[asset_path] = asset.state
+            return f'{prefix}{reference}?v={asset.version}"'
+
+        return _ASSET_REFERENCE.sub(versioned, body.decode('utf-8')).encode('utf-8'), dependencies
+
+
+class _Asset:
+    """One static file as served: its body (None when sent from disk), ETag and compressed variants."""
+
+    def __init__(self, path, state, mimetype, body, digest=None, dependencies=None):
+        self.path = path
+        self.state = state
+        self.mimetype = mimetype
+        self.body = body
+        self.dependencies = dependencies or {}
+        self.etag = digest or hashlib.sha1(body).hexdigest()[:20]
+        self.version = self.etag[:12]
+        self.variants = {}
+        if body is not None and _compressible(mimetype) and len(body) >= COMPRESS_MIN_BYTES:
+            variants = {'gzip': gzip.compress(body, STATIC_GZIP_LEVEL, mtime=0)}
+            if brotli is not None:
+                variants['br'] = brotli.compress(body, quality=STATIC_BROTLI_QUALITY)
+            self.variants = {encoding: data for encoding, data in variants.items() if len(data) < len(body)}
+
+    def is_current(self):
+        return all(_file_state(path) == state for path, state in [(self.path, self.state), *self.dependencies.items()])
+
+    def response(self, request):
+        if self.body is None:
+            response = send_file(self.path, request.environ, mimetype=self.mimetype, etag=self.etag, conditional=True)
+        else:
+            encoding = _negotiate(request, self.variants)
+            response = Response(self.variants[encoding] if encoding else self.body, mimetype=self.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            if self.variants:
+                response.vary.add('Accept-Encoding')
+            response.set_etag(f"{self.etag}-{encoding}" if encoding else self.etag)
+            response = response.make_conditional(request)
+        versioned = request.args.get('v') == self.version
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if versioned else REVALIDATE_CACHE_CONTROL
+        return response
+
+
+class ResponseCache:
+    """
+    Keeps the bodies of recent dynamic responses by ETag, plain and gzip-compressed, so that
+    repeated requests for the same version of a resource (every viewer opening the same report
+    page) are answered without computing or compressing them again.
+
+    The ETag is chosen by the caller and must change whenever the content may change; since it
+    does not depend on the body, If-None-Match is answered with 304 even after the body has been
+    evicted. At most max_bytes of bodies are kept, least recently used first out.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def respond(self, etag, request):
+        """Returns a 304 or the cached response for etag, or None when the response must be computed."""
+        if request.if_none_match.contains(etag) or request.if_none_match.contains(f"{etag}-gzip"):
+            return self._tagged(Response(status=304), etag, None)
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is None:
+                return None
+            self._entries.move_to_end(etag)
+        return self._response(etag, entry, request)
+
+    def store(self, etag, response, request):
+        """Caches a freshly computed 200 response under etag; returns it tagged and, if accepted, compressed."""
+        entry = {'mimetype': response.mimetype, 'identity': response.get_data(), 'gzip': None}
+        with self._lock:
+            if etag not in self._entries and len(entry['identity']) <= self.max_bytes:
+                self._entries[etag] = entry
+                self._size += len(entry['identity'])
+                while self._size > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._size -= len(evicted['identity']) + len(evicted['gzip'] or b'')
+        return self._response(etag, entry, request)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _response(self, etag, entry, request):
+        body, encoding = entry['identity'], None
+        compressible = _compressible(entry['mimetype']) and len(body) >= COMPRESS_MIN_BYTES
+        if compressible and request.accept_encodings['gzip']:
+            if entry['gzip'] is None:
+                entry['gzip'] = gzip.compress(body, DYNAMIC_GZIP_LEVEL, mtime=0)
+                with self._lock:
+                    if self._entries.get(etag) is entry:
+                        self._size += len(entry['gzip'])
+            body, encoding = entry['gzip'], 'gzip'
+        response = Response(body, mimetype=entry['mimetype'])
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return self._tagged(response, etag, encoding, vary=compressible)
+
+    @staticmethod
+    def _tagged(response, etag, encoding, vary=True):
+        response.set_etag(f"{etag}-{encoding}" if encoding else etag)
+        response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+        if vary:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+def compress_response(response, request):
+    """Gzips a complete, compressible response body when the client accepts it."""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or not _compressible(response.mimetype)):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES or not request.accept_encodings['gzip']:
+        return response
+    response.set_data(gzip.compress(body, DYNAMIC_GZIP_LEVEL, mtime=0))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def response_etag(*parts):
+    """An ETag for a dynamic response, from what determines its content (a report version, the request URL)."""
+    return hashlib.sha1('|'.join(map(str, parts)).encode('utf-8')).hexdigest()[:20]
+
+
+def _negotiate(request, variants):
+    """Returns the preferred encoding of variants that the client accepts (brotli first), or None."""
+    for encoding in ('br', 'gzip'):
+        if encoding in variants and request.accept_encodings[encoding]:
+            return encoding
+    return None
+
+
+def _compressible(mimetype):
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def _file_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:20]